@@ -60,8 +60,24 @@ INSTALLED_APPS = [
 LEAFLET_CONFIG = {
     'DEFAULT_CENTER': (30.67, 104.07),  # 成都的经纬度
     'DEFAULT_ZOOM': 12,
+    'SPATIAL_EXTENT': (102.9, 30.05, 104.9, 31.45),  # 成都市范围 (minLng, minLat, maxLng, maxLat)
 }
 
+# 景点总数超过该值时 geojson 接口默认使用流式输出
+GEOJSON_STREAM_THRESHOLD = 5000
+
+# 矢量瓦片磁盘缓存目录
+TILE_CACHE_DIR = BASE_DIR / 'tile_cache'
+
+# 爬取的高德 POI 数据目录（地铁站、公交站、停车场、餐饮等，见项目根目录的 爬数据.py）
+POI_DATA_DIR = BASE_DIR.parent / 'data'
+
+# POI 数据的列式缓存目录（由 xlsx 转换，见 tourism/datasets.py）
+POI_CACHE_DIR = BASE_DIR / 'poi_cache'
+
+# 区县边界（GeoJSON FeatureCollection，properties.name 为区县名称），供范围查询和区县统计使用
+DISTRICT_BOUNDARIES_FILE = BASE_DIR.parent / 'data' / 'chengdu_districts.geojson'
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -139,6 +155,20 @@ DATABASES = {
 }
 
 
+# 缓存配置
+# GeoJSON快照和数据版本号保存在缓存中，多进程部署时应改用共享缓存（如Redis），
+# 否则各进程的数据版本互不可见
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chengdu-tourism',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
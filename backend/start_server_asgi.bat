@@ -0,0 +1,14 @@
+@echo off
+echo 正在以ASGI方式启动成都旅游GIS后端服务...
+
+REM 激活虚拟环境
+call ..\venv\Scripts\activate.bat
+
+REM 运行数据库迁移
+python manage.py migrate
+
+REM 启动服务器（异步接口见 tourism/async_views.py）
+REM 各 worker 的内存索引按数据版本重建，多 worker 部署的注意事项见 README 中的“ASGI 部署”
+uvicorn backend.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+pause
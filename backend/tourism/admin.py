@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ScenicSpot
+from .models import POI, ScenicSpot
 
 @admin.register(ScenicSpot)
 class ScenicSpotAdmin(admin.ModelAdmin):
@@ -7,7 +7,9 @@ class ScenicSpotAdmin(admin.ModelAdmin):
     list_filter = ('category',)
     search_fields = ('name', 'description', 'address')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'nearest_metro_name', 'nearest_metro_distance',
+                       'nearest_parking_name', 'nearest_parking_distance', 'nearest_food_name',
+                       'nearest_food_distance', 'food_count_1000', 'facilities_updated_at')
     
     fieldsets = (
         ('基本信息', {
@@ -19,9 +21,22 @@ class ScenicSpotAdmin(admin.ModelAdmin):
         ('其他信息', {
             'fields': ('opening_hours', 'ticket_price', 'images')
         }),
+        ('周边设施', {
+            'fields': ('nearest_metro_name', 'nearest_metro_distance', 'nearest_parking_name',
+                       'nearest_parking_distance', 'nearest_food_name', 'nearest_food_distance',
+                       'food_count_1000', 'facilities_updated_at'),
+            'classes': ('collapse',)
+        }),
         ('时间信息', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(POI)
+class POIAdmin(admin.ModelAdmin):
+    list_display = ('name', 'layer', 'address', 'rating')
+    list_filter = ('layer',)
+    search_fields = ('name', 'address')
 # Register your models here.
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TourismConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tourism'
+
+    def ready(self):
+        # 注册信号（景点空间索引在首次查询时构建）
+        from . import signals  # noqa: F401
@@ -0,0 +1,180 @@
+"""
+景点只读接口的异步实现（ASGI 部署时使用）
+
+同步 DRF 视图在等待数据库时会占住一个工作线程，地图客户端并发较多时线程很快耗尽。
+这里用 Django 的异步 ORM（aiterator、afirst、aaggregate）重新实现访问最频繁的几个接口，
+等待数据库期间事件循环可以继续处理其他请求。返回格式与同步接口一致。
+
+路由见 urls.py 中的 async/ 前缀，部署方式见 README 中的“ASGI 部署”。
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.exceptions import ValidationError
+
+from .facets import aget_summary_facets
+from .favorites import get_favorite_ids
+from .geo import distance_map, parse_bbox, parse_point, snap_bbox
+from .models import ScenicSpot
+from .pagination import DistanceCursorPagination
+from .serializers import ScenicSpotSerializer
+from .snapshots import aget_snapshot, snapshot_response
+from .spatial_index import get_spot_index
+from .streaming import aiter_rows, astreaming_geojson_response
+from .views import ScenicSpotViewSet, requested_fields
+
+# 与 DRF 的 JSONRenderer 输出格式一致
+JSON_OPTIONS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params=JSON_OPTIONS)
+
+
+def _error(message, status):
+    return _json({'error': message}, status=status)
+
+
+@sync_to_async
+def _favorite_ids(request):
+    # 读取会话和用户需要访问数据库，放到线程中执行
+    if request.user.is_authenticated:
+        return get_favorite_ids(request.user)
+    return None
+
+
+async def _serialize(request, spots, fields, distances=None):
+    """序列化景点，距离和收藏id集合预先算好，序列化过程不再访问数据库"""
+    if distances is None:
+        point = parse_point(request.GET)
+        distances = distance_map(spots, *point) if point else {}
+    context = {'request': request, 'fields': fields, 'distances': distances}
+    favorite_ids = await _favorite_ids(request)
+    if favorite_ids is not None:
+        context['favorite_ids'] = favorite_ids
+    return ScenicSpotSerializer(spots, many=True, context=context).data
+
+
+async def nearby(request):
+    """异步版本的 /scenic_spots/nearby/，参数与返回格式相同"""
+    if request.method != 'GET':
+        return _error('只支持GET请求', 405)
+    lat = request.GET.get('lat')
+    lng = request.GET.get('lng')
+    if not lat or not lng:
+        return _error('请提供经纬度参数', 400)
+
+    try:
+        point = float(lat), float(lng)
+        radius = float(request.GET.get('radius', 5000))
+        fields = requested_fields(request.GET, ScenicSpotSerializer.Meta.fields)
+        # 空间索引在内存中查询，首次使用时需要从数据库加载
+        index = await sync_to_async(get_spot_index)()
+        spot_ids, distances = index.within_radius(*point, radius)
+        paginator = DistanceCursorPagination()
+        spot_ids, distances = paginator.paginate_arrays(spot_ids, distances, request)
+
+        spot_ids = spot_ids.tolist()
+        queryset = ScenicSpotViewSet._project(ScenicSpot.objects.filter(id__in=spot_ids), fields)
+        spots_by_id = {spot.id: spot async for spot in queryset.aiterator()}
+        spots = [spots_by_id[spot_id] for spot_id in spot_ids if spot_id in spots_by_id]
+        data = await _serialize(request, spots, fields, distances=dict(zip(spot_ids, distances.tolist())))
+        return _json(paginator.get_paginated_data(data))
+    except ValidationError as e:
+        return _json(e.detail, status=400)
+    except (ValueError, TypeError) as e:
+        return _error(f'无效的经纬度格式: {str(e)}', 400)
+    except Exception as e:
+        return _error(f'查询附近景点时出错: {str(e)}', 500)
+
+
+async def _features(rows, to_feature):
+    async for row in rows:
+        yield to_feature(row)
+
+
+async def geojson(request):
+    """异步版本的 /scenic_spots/geojson/，参数与返回格式相同"""
+    if request.method != 'GET':
+        return _error('只支持GET请求', 405)
+    try:
+        search_query = request.GET.get('search', '')
+        category = request.GET.get('category', '')
+        bbox = request.GET.get('bbox')
+        zoom = request.GET.get('zoom')
+        if bbox:
+            try:
+                bbox = parse_bbox(bbox)
+                if zoom:
+                    bbox = snap_bbox(bbox, int(zoom))
+            except ValueError as e:
+                return _error(f'无效的bbox或zoom参数: {str(e)}', 400)
+
+        requested = requested_fields(request.GET, ScenicSpotViewSet.GEOJSON_PROPERTIES)
+        properties = [name for name in ScenicSpotViewSet.GEOJSON_PROPERTIES if not requested or name in requested]
+        fields = ScenicSpotViewSet._geojson_fields(properties)
+        to_feature = ScenicSpotViewSet._geojson_feature_builder(properties)
+
+        # 非PostgreSQL数据库上的搜索需要先加载进程内倒排索引
+        queryset = await sync_to_async(ScenicSpotViewSet._geojson_queryset)(search_query, category, bbox)
+
+        stream = request.GET.get('stream')
+        if stream is None:
+            threshold = getattr(settings, 'GEOJSON_STREAM_THRESHOLD', 5000)
+            use_stream = len(await sync_to_async(get_spot_index)()) > threshold
+        else:
+            use_stream = stream.lower() in ('1', 'true', 'yes')
+        if use_stream:
+            return astreaming_geojson_response(queryset, fields, to_feature)
+
+        async def build_payload():
+            if ScenicSpotViewSet._needs_python_ranking(search_query):
+                # 按进程内索引的相关度排序，与同步接口生成的快照一致
+                rows = await sync_to_async(ScenicSpotViewSet._ranked_geojson_rows)(queryset, search_query, fields)
+                features = [to_feature(row) for row in rows]
+            else:
+                features = [feature async for feature in _features(aiter_rows(queryset, fields), to_feature)]
+            return {
+                'type': 'FeatureCollection',
+                'features': features
+            }
+
+        # 与同步接口共用快照缓存
+        snapshot = await aget_snapshot(
+            'geojson',
+            {'search': search_query, 'category': category, 'bbox': bbox, 'properties': properties},
+            build_payload
+        )
+        return snapshot_response(request, snapshot)
+    except ValidationError as e:
+        return _json(e.detail, status=400)
+    except Exception as e:
+        return _error(f'获取GeoJSON数据时出错: {str(e)}', 500)
+
+
+async def categories(request):
+    """异步版本的 /scenic_spots/categories/"""
+    if request.method != 'GET':
+        return _error('只支持GET请求', 405)
+    try:
+        facets = await aget_summary_facets()
+        return _json([row['category'] for row in facets['categories']])
+    except Exception as e:
+        return _error(f'获取分类列表时出错: {str(e)}', 500)
+
+
+async def retrieve(request, pk):
+    """异步版本的 /scenic_spots/<id>/"""
+    if request.method != 'GET':
+        return _error('只支持GET请求', 405)
+    try:
+        fields = requested_fields(request.GET, ScenicSpotSerializer.Meta.fields)
+        spot = await ScenicSpotViewSet._project(ScenicSpot.objects.filter(pk=pk), fields).afirst()
+        if spot is None:
+            return _error('找不到指定的景点', 404)
+        data = await _serialize(request, [spot], fields)
+        return _json(data[0])
+    except ValidationError as e:
+        return _json(e.detail, status=400)
+    except Exception as e:
+        return _error(f'获取景点详情时出错: {str(e)}', 500)
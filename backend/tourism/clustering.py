@@ -0,0 +1,206 @@
+"""
+景点分级聚合
+
+参照 supercluster 的做法：把景点投影到 Web 墨卡托平面，从最大缩放级别开始逐级向下，
+把每一级中半径（按屏幕像素换算）内的点合并为一个聚合点，记录数量和各分类数量。
+查询时只需取对应缩放级别、落在视野范围内的聚合点，返回给浏览器的要素数量与景点总数无关。
+
+索引记录构建时的景点数据版本，任一进程写入景点后版本变化，下次查询时全量重建。
+贪心聚合的结果依赖点的处理顺序，单个景点变化也可能改变各级分组，因此不做增量更新；
+重建只在版本变化后的首次查询时发生，连续多次写入只重建一次。
+"""
+import logging
+import threading
+from math import pi
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .snapshots import get_data_version
+
+logger = logging.getLogger('tourism_clustering')
+
+MIN_ZOOM = 0
+MAX_ZOOM = 16
+# 聚合半径（像素）与瓦片像素大小
+CLUSTER_RADIUS = 60
+TILE_SIZE = 512
+# 单次返回的最大要素数，超过时改用更低一级的聚合结果
+MAX_FEATURES = 300
+
+
+def project_x(lng):
+    return np.asarray(lng, dtype=np.float64) / 360.0 + 0.5
+
+
+def project_y(lat):
+    sin_lat = np.sin(np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511)))
+    return 0.5 - 0.25 * np.log((1 + sin_lat) / (1 - sin_lat)) / pi
+
+
+def unproject_lng(x):
+    return (np.asarray(x) - 0.5) * 360.0
+
+
+def unproject_lat(y):
+    y2 = (180 - np.asarray(y) * 360) * pi / 180
+    return 360 * np.arctan(np.exp(y2)) / pi - 90
+
+
+class ClusterLevel:
+    """某一缩放级别的聚合结果"""
+
+    def __init__(self, x, y, counts, category_counts, spot_ids):
+        self.x = x
+        self.y = y
+        self.counts = counts
+        # 形状为 (聚合点数, 分类数) 的矩阵
+        self.category_counts = category_counts
+        # 单个景点时为景点id，聚合点为 -1
+        self.spot_ids = spot_ids
+
+    def __len__(self):
+        return len(self.x)
+
+
+class ClusterIndex:
+
+    def __init__(self, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius=CLUSTER_RADIUS):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.radius = radius
+        self.levels = {}
+        self.categories = []
+        self.names = {}
+        # 构建时的景点数据版本
+        self.version = None
+
+    def build(self, rows):
+        """用 (id, lng, lat, category, name) 序列构建各级聚合"""
+        rows = [row for row in rows if row[1] is not None and row[2] is not None]
+        self.categories = sorted({row[3] for row in rows})
+        category_index = {category: i for i, category in enumerate(self.categories)}
+        self.names = {row[0]: row[4] for row in rows}
+
+        n = len(rows)
+        spot_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=n)
+        category_counts = np.zeros((n, len(self.categories)), dtype=np.int32)
+        if n:
+            category_counts[np.arange(n), [category_index[row[3]] for row in rows]] = 1
+        level = ClusterLevel(
+            project_x([row[1] for row in rows]),
+            project_y([row[2] for row in rows]),
+            np.ones(n, dtype=np.int32),
+            category_counts,
+            spot_ids,
+        )
+
+        # 最大缩放级别之上直接使用原始点
+        self.levels = {self.max_zoom + 1: level}
+        for z in range(self.max_zoom, self.min_zoom - 1, -1):
+            level = self._cluster(level, z)
+            self.levels[z] = level
+
+    def _cluster(self, level, z):
+        """把上一级的点按本级半径合并"""
+        if len(level) == 0:
+            return level
+        r = self.radius / (TILE_SIZE * 2 ** z)
+        points = np.column_stack([level.x, level.y])
+        neighbours = cKDTree(points).query_ball_point(points, r)
+
+        visited = np.zeros(len(level), dtype=bool)
+        groups = []
+        for i in range(len(level)):
+            if visited[i]:
+                continue
+            group = [j for j in neighbours[i] if not visited[j]]
+            visited[group] = True
+            groups.append(group)
+
+        if len(groups) == len(level):
+            return level
+
+        # 按分组求和：数量、加权坐标和分类计数
+        group_of = np.empty(len(level), dtype=np.int64)
+        for g, group in enumerate(groups):
+            group_of[group] = g
+        counts = np.bincount(group_of, weights=level.counts, minlength=len(groups))
+        x = np.bincount(group_of, weights=level.x * level.counts, minlength=len(groups)) / counts
+        y = np.bincount(group_of, weights=level.y * level.counts, minlength=len(groups)) / counts
+        category_counts = np.zeros((len(groups), level.category_counts.shape[1]), dtype=np.int32)
+        np.add.at(category_counts, group_of, level.category_counts)
+        spot_ids = np.array(
+            [level.spot_ids[group[0]] if len(group) == 1 else -1 for group in groups],
+            dtype=np.int64,
+        )
+        return ClusterLevel(x, y, counts.astype(np.int32), category_counts, spot_ids)
+
+    def get_clusters(self, bbox, zoom):
+        """
+        返回视野范围内某一缩放级别的聚合点
+        结果超过 MAX_FEATURES 时逐级降低缩放级别
+        """
+        min_lng, min_lat, max_lng, max_lat = bbox
+        zoom = max(self.min_zoom, min(int(zoom), self.max_zoom + 1))
+        min_x, max_x = project_x(min_lng), project_x(max_lng)
+        min_y, max_y = project_y(max_lat), project_y(min_lat)
+
+        while True:
+            level = self.levels.get(zoom)
+            if level is None or len(level) == 0:
+                return zoom, []
+            mask = (level.x >= min_x) & (level.x <= max_x) & (level.y >= min_y) & (level.y <= max_y)
+            if mask.sum() <= MAX_FEATURES or zoom == self.min_zoom:
+                break
+            zoom -= 1
+
+        indices = np.nonzero(mask)[0][:MAX_FEATURES]
+        lngs = unproject_lng(level.x[indices])
+        lats = unproject_lat(level.y[indices])
+        features = []
+        for i, lng, lat in zip(indices.tolist(), lngs.tolist(), lats.tolist()):
+            spot_id = int(level.spot_ids[i])
+            if spot_id >= 0:
+                row = level.category_counts[i]
+                properties = {
+                    'cluster': False,
+                    'id': spot_id,
+                    'name': self.names.get(spot_id),
+                    'category': self.categories[int(np.argmax(row))],
+                }
+            else:
+                properties = {
+                    'cluster': True,
+                    'count': int(level.counts[i]),
+                    'categories': {
+                        self.categories[c]: int(count)
+                        for c, count in enumerate(level.category_counts[i].tolist()) if count
+                    },
+                }
+            features.append({
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lng, lat]},
+                'properties': properties,
+            })
+        return zoom, features
+
+
+_cluster_index = None
+_cluster_lock = threading.Lock()
+
+
+def get_cluster_index():
+    """获取景点聚合索引，数据版本变化后从数据库重建"""
+    global _cluster_index
+    version = get_data_version()
+    with _cluster_lock:
+        if _cluster_index is None or _cluster_index.version != version:
+            from .models import ScenicSpot
+
+            index = ClusterIndex()
+            index.build(ScenicSpot.objects.values_list('id', 'longitude', 'latitude', 'category', 'name'))
+            index.version = version
+            _cluster_index = index
+            logger.info(f"景点聚合索引构建完成，共 {len(index.names)} 个景点")
+        return _cluster_index
@@ -0,0 +1,218 @@
+"""
+读取爬取的高德 POI 数据（data/*.xlsx，由项目根目录的 爬数据.py 生成）
+
+每个文件一张表，表头为：名称、地址、经度_GCJ02、纬度_GCJ02、经度_WGS84、纬度_WGS84、电话、类型、营业时间、评分。
+景点坐标来自高德地理编码（GCJ-02），这里统一读取 GCJ-02 坐标，与景点坐标一致。
+
+解析 xlsx 需要把整个工作簿解压并逐格读取，很慢。首次读取时把每个数据集转换为列式缓存
+（settings.POI_CACHE_DIR/<名称>/<版本>/），之后直接读取缓存：
+- longitude.npy、latitude.npy、rating.npy：float64 数值列（评分缺失为 NaN），以内存映射方式打开
+- strings.json：文本列（名称、地址、类型、电话、营业时间）
+- meta.json：转换时源文件的修改时间和大小，源文件变化后自动重新转换
+
+每次转换写入一个新的版本目录，写完后原子替换 <名称>/CURRENT 指针文件（内容为版本目录名）发布，
+读取方只看指针指向的目录，不会读到写了一半或新旧混杂的缓存。
+
+读取方有两个：load_pois 命令（read_pois）把数据导入 POI 表，工作进程构建公交/地铁网络（transit.py）时读取站点列。
+POI 图层的空间索引、GeoJSON 和瓦片读取的是 POI 表：它们需要数据库 id 来读取属性，而列式缓存中没有 id。
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+# 数据集（图层）名称 -> 中文名称，文件名为 <名称>.xlsx，与 POI.layer 一致
+DATASETS = {
+    'hotels': '酒店',
+    'homestays': '民宿',
+    'bus_stops': '公交站',
+    'metro_stations': '地铁站',
+    'parking_lots': '停车场',
+    'sichuan_food': '川菜',
+    'hotpot': '火锅',
+    'snacks': '小吃',
+    'western_food': '西餐',
+}
+
+# 列式缓存中的数值列和文本列
+NUMERIC_COLUMNS = ('longitude', 'latitude', 'rating')
+TEXT_COLUMNS = ('name', 'address', 'type', 'phone', 'opening_hours')
+# 指向当前版本目录的指针文件
+CURRENT = 'CURRENT'
+
+
+def dataset_path(name):
+    if name not in DATASETS:
+        raise KeyError(f'未知的数据集: {name}')
+    return Path(settings.POI_DATA_DIR) / f'{name}.xlsx'
+
+
+def cache_path(name):
+    if name not in DATASETS:
+        raise KeyError(f'未知的数据集: {name}')
+    return Path(settings.POI_CACHE_DIR) / name
+
+
+def _text(value):
+    # 高德返回的空字段在表格中保存为 "[]"
+    value = str(value or '').strip()
+    return '' if value == '[]' else value
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_xlsx(name):
+    """
+    解析 xlsx，返回列字典：数值列为 float64 数组，文本列为字符串列表
+    坐标缺失的行被跳过；文件不存在时抛出 FileNotFoundError
+    """
+    from openpyxl import load_workbook
+
+    columns = {column: [] for column in NUMERIC_COLUMNS + TEXT_COLUMNS}
+    workbook = load_workbook(dataset_path(name), read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        index = {title: i for i, title in enumerate(header)}
+        for row in rows:
+            def get(title):
+                i = index.get(title)
+                return row[i] if i is not None and i < len(row) else None
+
+            lng, lat = _float(get('经度_GCJ02')), _float(get('纬度_GCJ02'))
+            if lng is None or lat is None or not get('名称'):
+                continue
+            rating = _float(get('评分'))
+            columns['longitude'].append(lng)
+            columns['latitude'].append(lat)
+            columns['rating'].append(np.nan if rating is None else rating)
+            columns['name'].append(_text(get('名称')))
+            columns['address'].append(_text(get('地址')))
+            columns['type'].append(_text(get('类型')))
+            columns['phone'].append(_text(get('电话')))
+            columns['opening_hours'].append(_text(get('营业时间')))
+    finally:
+        workbook.close()
+    for column in NUMERIC_COLUMNS:
+        columns[column] = np.asarray(columns[column], dtype=np.float64)
+    return columns
+
+
+def _source_meta(name):
+    stat = dataset_path(name).stat()
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def current_cache_dir(name):
+    """指针文件指向的当前版本目录，还没有缓存时返回 None"""
+    directory = cache_path(name)
+    try:
+        version = (directory / CURRENT).read_text(encoding='utf-8').strip()
+    except OSError:
+        return None
+    return directory / version if version else None
+
+
+def build_cache(name):
+    """把数据集转换为列式缓存，返回行数；文件不存在时抛出 FileNotFoundError"""
+    meta = _source_meta(name)
+    columns = parse_xlsx(name)
+    directory = cache_path(name)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # 写入唯一命名的版本目录，多个进程同时转换也互不覆盖
+    version_dir = Path(tempfile.mkdtemp(dir=directory, prefix='v'))
+    try:
+        for column in NUMERIC_COLUMNS:
+            np.save(version_dir / f'{column}.npy', columns[column])
+        with open(version_dir / 'strings.json', 'w', encoding='utf-8') as f:
+            json.dump({column: columns[column] for column in TEXT_COLUMNS}, f, ensure_ascii=False)
+        with open(version_dir / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump({**meta, 'rows': len(columns['name'])}, f)
+
+        # 原子替换指针文件发布新版本
+        previous = current_cache_dir(name)
+        fd, tmp_pointer = tempfile.mkstemp(dir=directory, prefix=f'.{CURRENT}.')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(version_dir.name)
+            os.replace(tmp_pointer, directory / CURRENT)
+        except BaseException:
+            os.unlink(tmp_pointer)
+            raise
+    except BaseException:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+    # 只删除被替换掉的版本；已经以内存映射方式打开旧文件的进程不受影响
+    if previous is not None and previous != version_dir:
+        shutil.rmtree(previous, ignore_errors=True)
+    return len(columns['name'])
+
+
+def cache_is_fresh(name):
+    """缓存存在且与源文件一致（源文件已删除时继续使用缓存）"""
+    directory = current_cache_dir(name)
+    if directory is None:
+        return False
+    try:
+        with open(directory / 'meta.json', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    try:
+        source = _source_meta(name)
+    except FileNotFoundError:
+        return True
+    return meta.get('mtime_ns') == source['mtime_ns'] and meta.get('size') == source['size']
+
+
+def _read_cache(directory):
+    columns = {column: np.load(directory / f'{column}.npy', mmap_mode='r') for column in NUMERIC_COLUMNS}
+    with open(directory / 'strings.json', encoding='utf-8') as f:
+        columns.update(json.load(f))
+    return columns
+
+
+def load_columns(name):
+    """
+    读取数据集的列式缓存，缓存不存在或已过期时先转换
+    返回列字典：数值列为只读内存映射数组，文本列为字符串列表
+    """
+    if not cache_is_fresh(name):
+        build_cache(name)
+    try:
+        return _read_cache(current_cache_dir(name))
+    except FileNotFoundError:
+        # 读取指针后其他进程发布了新版本并删除了旧目录，按新指针重读
+        return _read_cache(current_cache_dir(name))
+
+
+def read_pois(name):
+    """
+    读取一个数据集，返回 [{'name', 'address', 'longitude', 'latitude', 'type', 'phone', 'opening_hours', 'rating'}, ...]
+    坐标缺失的行被跳过；文件不存在时抛出 FileNotFoundError
+    """
+    columns = load_columns(name)
+    ratings = [None if np.isnan(rating) else rating for rating in columns['rating'].tolist()]
+    return [
+        {
+            'name': columns['name'][i],
+            'address': columns['address'][i],
+            'longitude': lng,
+            'latitude': lat,
+            'type': columns['type'][i],
+            'phone': columns['phone'][i],
+            'opening_hours': columns['opening_hours'][i],
+            'rating': ratings[i],
+        }
+        for i, (lng, lat) in enumerate(zip(columns['longitude'].tolist(), columns['latitude'].tolist()))
+    ]
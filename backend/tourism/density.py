@@ -0,0 +1,195 @@
+"""
+六边形网格密度聚合
+
+把景点和各 POI 图层的点投影到平面（以成都市中心纬度为参考的等距圆柱投影），
+按多个分辨率（六边形外接圆半径 4km ~ 250m）统计每个六边形网格内的点数，供热力图使用，
+浏览器只需要拿到非空网格的中心坐标和数量，与点的总数无关。
+
+每个图层一个 HexDensity，保存各点坐标（用于增量更新时找到点原来所在的网格）和各分辨率的网格计数：
+- 本进程内的保存/删除由信号增量更新（见 signals.py），并同步到递增后的数据版本
+- 其他进程发现数据版本变化（批量导入，或其他进程的编辑）后全量重建，
+  全量重建是一次 np.unique，几万个点只需几十毫秒
+"""
+import logging
+import threading
+from collections import Counter
+
+import numpy as np
+
+from .geo import EARTH_RADIUS
+from .pois import POI_VERSION_KEY
+from .snapshots import VERSION_KEY, get_data_version
+
+logger = logging.getLogger('tourism_density')
+
+# 分辨率 -> 六边形外接圆半径（米）
+RESOLUTIONS = (4000, 2000, 1000, 500, 250)
+DEFAULT_RESOLUTION = 2
+# 投影参考纬度（成都市中心），固定取值使网格位置不随数据变化
+REF_LAT = 30.67
+# 网格坐标打包为一个整数：(q + OFFSET) << 32 | (r + OFFSET)
+OFFSET = 1 << 30
+
+SPOTS_LAYER = 'spots'
+
+_SQRT3 = np.sqrt(3.0)
+_SCALE = np.pi / 180 * EARTH_RADIUS
+_SCALE_X = _SCALE * np.cos(np.radians(REF_LAT))
+
+
+def hex_cells(lats, lngs, size):
+    """计算点所在六边形（尖顶朝上，轴向坐标）的打包网格键"""
+    x = np.asarray(lngs, dtype=np.float64) * _SCALE_X / size
+    y = np.asarray(lats, dtype=np.float64) * _SCALE / size
+    # 轴向坐标 -> 立方坐标取整，修正误差最大的一维
+    q = _SQRT3 / 3 * x - y / 3
+    r = 2 / 3 * y
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return ((rq.astype(np.int64) + OFFSET) << 32) | (rr.astype(np.int64) + OFFSET)
+
+
+def cell_centers(keys, size):
+    """打包网格键 -> 六边形中心 (lats, lngs)"""
+    keys = np.asarray(keys, dtype=np.int64)
+    q = (keys >> 32) - OFFSET
+    r = (keys & 0xFFFFFFFF) - OFFSET
+    x = size * _SQRT3 * (q + r / 2)
+    y = size * 1.5 * r
+    return y / _SCALE, x / _SCALE_X
+
+
+class HexDensity:
+    """一个图层各分辨率的六边形网格计数"""
+
+    def __init__(self):
+        self.version = None
+        self._points = {}  # id -> (lat, lng)
+        self._counts = [Counter() for _ in RESOLUTIONS]
+        self._arrays = [None] * len(RESOLUTIONS)  # 分辨率 -> (中心纬度, 中心经度, 数量)
+        self._lock = threading.Lock()
+
+    def build(self, rows, version):
+        """用 (id, lat, lng) 行全量重建"""
+        points = {pk: (lat, lng) for pk, lat, lng in rows}
+        lats = np.fromiter((p[0] for p in points.values()), dtype=np.float64, count=len(points))
+        lngs = np.fromiter((p[1] for p in points.values()), dtype=np.float64, count=len(points))
+        counts = []
+        for size in RESOLUTIONS:
+            keys, numbers = np.unique(hex_cells(lats, lngs, size), return_counts=True)
+            counts.append(Counter(dict(zip(keys.tolist(), numbers.tolist()))))
+        with self._lock:
+            self._points = points
+            self._counts = counts
+            self._arrays = [None] * len(RESOLUTIONS)
+            self.version = version
+
+    def _move(self, pk, point):
+        old = self._points.pop(pk, None)
+        if point is not None:
+            self._points[pk] = point
+        for level, size in enumerate(RESOLUTIONS):
+            counts = self._counts[level]
+            if old is not None:
+                key = int(hex_cells([old[0]], [old[1]], size)[0])
+                counts[key] -= 1
+                if counts[key] <= 0:
+                    del counts[key]
+            if point is not None:
+                counts[int(hex_cells([point[0]], [point[1]], size)[0])] += 1
+            self._arrays[level] = None
+
+    def apply(self, previous, current, pk=None, point=None):
+        """
+        增量更新：id 为 pk 的点移动到 point（point 为 None 表示删除），并把版本从 previous 推进到 current
+        previous 与本地版本不一致（期间有其他改动）时不更新，下次查询时全量重建
+        """
+        with self._lock:
+            if self.version is None or self.version != previous:
+                return False
+            if pk is not None:
+                self._move(pk, point)
+            self.version = current
+            return True
+
+    def cells(self, resolution, bbox=None):
+        """返回 (中心纬度, 中心经度, 数量) 数组；bbox 为 (minLng, minLat, maxLng, maxLat)，按网格中心过滤"""
+        with self._lock:
+            arrays = self._arrays[resolution]
+            if arrays is None:
+                counts = self._counts[resolution]
+                keys = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+                numbers = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+                order = np.argsort(keys)
+                keys, numbers = keys[order], numbers[order]
+                arrays = self._arrays[resolution] = (*cell_centers(keys, RESOLUTIONS[resolution]), numbers)
+        lats, lngs, numbers = arrays
+        if bbox is None:
+            return lats, lngs, numbers
+        # 网格中心落在范围外、但六边形与范围相交的也返回
+        min_lng, min_lat, max_lng, max_lat = bbox
+        margin = RESOLUTIONS[resolution]
+        pad_lat, pad_lng = margin / _SCALE, margin / _SCALE_X
+        mask = (
+            (lngs >= min_lng - pad_lng) & (lngs <= max_lng + pad_lng)
+            & (lats >= min_lat - pad_lat) & (lats <= max_lat + pad_lat)
+        )
+        return lats[mask], lngs[mask], numbers[mask]
+
+    def __len__(self):
+        return len(self._points)
+
+
+def density_layers():
+    from .datasets import DATASETS
+    return (SPOTS_LAYER,) + tuple(DATASETS)
+
+
+def layer_version_key(layer):
+    return VERSION_KEY if layer == SPOTS_LAYER else POI_VERSION_KEY
+
+
+def _layer_rows(layer):
+    from .models import POI, ScenicSpot
+    if layer == SPOTS_LAYER:
+        return ScenicSpot.objects.values_list('id', 'latitude', 'longitude').iterator()
+    return POI.objects.filter(layer=layer).values_list('id', 'latitude', 'longitude').iterator()
+
+
+_densities = {}  # 图层 -> HexDensity
+_densities_lock = threading.Lock()
+
+
+def get_density(layer):
+    """获取图层的网格计数，数据版本变化后重建"""
+    version = get_data_version(layer_version_key(layer))
+    density = _densities.get(layer)
+    if density is None or density.version != version:
+        with _densities_lock:
+            density = _densities.setdefault(layer, HexDensity())
+            if density.version != version:
+                density.build(_layer_rows(layer), version)
+                logger.info(f"密度图层 {layer} 构建完成，共 {len(density)} 个点")
+    return density
+
+
+def apply_change(version_key, previous, current, layer=None, pk=None, point=None):
+    """
+    数据变化后增量更新本进程已构建的网格计数（由信号调用）
+    version_key 下的所有图层都推进到新版本，只有 layer 图层中 id 为 pk 的点变化；
+    版本不是连续递增时说明期间有其他改动，不做增量更新，下次查询时全量重建
+    """
+    if current != previous + 1:
+        return
+    for name, density in list(_densities.items()):
+        if layer_version_key(name) != version_key:
+            continue
+        if name == layer:
+            density.apply(previous, current, pk, point)
+        else:
+            density.apply(previous, current)
@@ -0,0 +1,137 @@
+"""
+景点周边设施（空间连接）
+
+对每个景点计算最近的地铁站、停车场、餐饮（川菜、火锅、小吃、西餐）及其距离，
+以及 500 米、1 公里内各类设施的数量，冗余保存在 ScenicSpot 的 nearest_* / *_count_* 字段，
+列表和详情接口直接读取，不再为每个景点单独查询。
+
+设施坐标取自 POI 表（load_pois 从 data/*.xlsx 导入），每类设施建一棵KD树（等距圆柱投影的平面坐标），
+所有景点一次批量查询。平面距离在城市范围内与球面距离略有差异，候选结果再按球面距离精确计算。
+load_pois 导入设施后、爬虫更新景点后会自动重新计算，也可以用 enrich_spots 命令手动执行。
+"""
+import logging
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+from scipy.spatial import cKDTree
+
+from .geo import haversine, to_planar
+
+logger = logging.getLogger('tourism_enrichment')
+
+# 设施类别 -> POI 图层
+FACILITIES = {
+    'metro': ('metro_stations',),
+    'parking': ('parking_lots',),
+    'food': ('sichuan_food', 'hotpot', 'snacks', 'western_food'),
+}
+# 统计数量的半径（米）
+COUNT_RADII = (500, 1000)
+# 最近设施候选数：平面最近的几个再按球面距离比较
+NEAREST_CANDIDATES = 4
+
+
+def facility_fields(kind):
+    """设施类别对应的 ScenicSpot 字段名"""
+    return [f'nearest_{kind}_poi', f'nearest_{kind}_name', f'nearest_{kind}_distance'] + [
+        f'{kind}_count_{radius}' for radius in COUNT_RADII
+    ]
+
+
+ENRICHMENT_FIELDS = [name for kind in FACILITIES for name in facility_fields(kind)] + ['facilities_updated_at']
+
+
+def spatial_join(spot_lats, spot_lngs, poi_lats, poi_lngs, radii=COUNT_RADII):
+    """
+    景点与设施的空间连接
+    返回 (最近设施下标数组, 距离数组(米), {半径: 数量数组})；没有设施时下标为 -1、距离为 NaN
+    """
+    spot_lats = np.asarray(spot_lats, dtype=np.float64)
+    spot_lngs = np.asarray(spot_lngs, dtype=np.float64)
+    poi_lats = np.asarray(poi_lats, dtype=np.float64)
+    poi_lngs = np.asarray(poi_lngs, dtype=np.float64)
+    count = len(spot_lats)
+    nearest = np.full(count, -1, dtype=np.int64)
+    distances = np.full(count, np.nan)
+    counts = {radius: np.zeros(count, dtype=np.int64) for radius in radii}
+    if not count or not len(poi_lats):
+        return nearest, distances, counts
+
+    ref_lat = float(np.concatenate([spot_lats, poi_lats]).mean())
+    tree = cKDTree(to_planar(poi_lats, poi_lngs, ref_lat))
+    points = to_planar(spot_lats, spot_lngs, ref_lat)
+
+    k = min(NEAREST_CANDIDATES, len(poi_lats))
+    _, candidates = tree.query(points, k=k)
+    candidates = candidates.reshape(count, k)
+    exact = haversine(spot_lats[:, None], spot_lngs[:, None], poi_lats[candidates], poi_lngs[candidates])
+    best = np.argmin(exact, axis=1)
+    rows = np.arange(count)
+    nearest = candidates[rows, best].astype(np.int64)
+    distances = exact[rows, best]
+
+    # 半径内计数：放宽半径取候选，再按球面距离过滤
+    for radius in radii:
+        groups = tree.query_ball_point(points, radius * 1.01)
+        lengths = np.fromiter((len(group) for group in groups), dtype=np.int64, count=count)
+        if not lengths.sum():
+            continue
+        owners = np.repeat(rows, lengths)
+        members = np.fromiter((i for group in groups for i in group), dtype=np.int64, count=lengths.sum())
+        within = haversine(spot_lats[owners], spot_lngs[owners], poi_lats[members], poi_lngs[members]) <= radius
+        counts[radius] = np.bincount(owners[within], minlength=count)
+    return nearest, distances, counts
+
+
+def _write(rows, batch_size):
+    """
+    按景点id批量写入周边设施字段，rows 为 [(ENRICHMENT_FIELDS 顺序的值..., 景点id), ...]
+    bulk_update 为每个字段生成 CASE WHEN 表达式，几千个景点要十几秒，这里直接用 executemany，
+    同样不触发信号，也不修改 updated_at
+    """
+    from .models import ScenicSpot
+
+    quote = connection.ops.quote_name
+    columns = [ScenicSpot._meta.get_field(name).column for name in ENRICHMENT_FIELDS]
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(ScenicSpot._meta.db_table),
+        ', '.join(f'{quote(column)} = %s' for column in columns),
+        quote(ScenicSpot._meta.pk.column),
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+
+
+def enrich_spots(batch_size=500):
+    """重新计算所有景点的周边设施字段，返回更新的景点数"""
+    from .models import POI, ScenicSpot
+
+    spots = list(ScenicSpot.objects.values_list('id', 'latitude', 'longitude'))
+    if not spots:
+        return 0
+    spot_lats = np.array([spot[1] for spot in spots], dtype=np.float64)
+    spot_lngs = np.array([spot[2] for spot in spots], dtype=np.float64)
+
+    columns = []
+    for kind, layers in FACILITIES.items():
+        pois = list(POI.objects.filter(layer__in=layers).order_by('id').values_list('id', 'name', 'latitude', 'longitude'))
+        nearest, distances, counts = spatial_join(
+            spot_lats, spot_lngs, [poi[2] for poi in pois], [poi[3] for poi in pois]
+        )
+        indexes = nearest.tolist()
+        columns.append([pois[i][0] if i >= 0 else None for i in indexes])
+        columns.append([pois[i][1] if i >= 0 else '' for i in indexes])
+        columns.append([round(d, 1) if i >= 0 else None for i, d in zip(indexes, distances.tolist())])
+        columns += [counts[radius].tolist() for radius in COUNT_RADII]
+        logger.info(f"周边设施 {kind}：{len(pois)} 个设施")
+
+    updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    rows = [
+        (*values, updated_at, spot[0])
+        for spot, *values in zip(spots, *columns)
+    ]
+    _write(rows, batch_size)
+    logger.info(f"已更新 {len(rows)} 个景点的周边设施")
+    return len(rows)
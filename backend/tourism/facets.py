@@ -0,0 +1,110 @@
+"""
+景点分面统计
+
+返回各分类的景点数、门票价格分段直方图和免费/收费数量，供侧边栏筛选使用。
+已选中分类或价格范围时，每个分面的计数不应用它自身维度的筛选（分类计数忽略分类筛选，
+价格分面忽略价格筛选），选中一个分类后仍能看到其他分类各有多少景点；total 应用全部筛选。
+无过滤条件的统计结果按数据版本缓存（见 snapshots.py），景点保存/删除后版本递增，
+下一次请求时重新汇总。
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .snapshots import SNAPSHOT_TIMEOUT, aget_data_version, get_data_version
+
+# 收费景点的价格分段（元），最后一段没有上限
+PRICE_BUCKETS = ((0, 50), (50, 100), (100, 200), (200, None))
+
+# 门票价格为空或为0视为免费
+FREE = Q(ticket_price__isnull=True) | Q(ticket_price=0)
+
+
+def _bucket_filter(low, high):
+    condition = Q(ticket_price__gt=0, ticket_price__gte=low)
+    if high is not None:
+        condition &= Q(ticket_price__lt=high)
+    return condition
+
+
+def price_filter(min_price=None, max_price=None):
+    """价格范围筛选条件，与景点列表的 min_price、max_price 参数一致"""
+    condition = Q()
+    if min_price is not None:
+        condition &= Q(ticket_price__gte=min_price)
+    if max_price is not None:
+        condition &= Q(ticket_price__lte=max_price)
+    return condition
+
+
+def _facet_queries(queryset, category=None, price=Q()):
+    """返回 (价格分面查询集, 总数聚合参数, 分类计数查询集)"""
+    # 清除排序和注解带来的影响，只保留过滤条件
+    queryset = queryset.order_by()
+    # 价格分面不应用价格筛选，分类计数不应用分类筛选
+    by_category = queryset.filter(category=category) if category else queryset
+    aggregates = {
+        'total': Count('id', filter=price) if price else Count('id'),
+        'priced': Count('id'),
+        'free': Count('id', filter=FREE),
+    }
+    for i, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f'bucket_{i}'] = Count('id', filter=_bucket_filter(low, high))
+    categories = queryset.filter(price).values('category').annotate(count=Count('id')).order_by('-count', 'category')
+    return by_category, aggregates, categories
+
+
+def _format_facets(totals, categories):
+    return {
+        'total': totals['total'],
+        'categories': [{'category': row['category'], 'count': row['count']} for row in categories],
+        'price': {
+            'free': totals['free'],
+            'paid': totals['priced'] - totals['free'],
+            'histogram': [
+                {'min': low, 'max': high, 'count': totals[f'bucket_{i}']}
+                for i, (low, high) in enumerate(PRICE_BUCKETS)
+            ],
+        },
+    }
+
+
+def compute_facets(queryset, category=None, price=Q()):
+    """
+    对查询集做分面统计（两条聚合查询）
+    category 为选中的分类，price 为价格筛选条件（见 price_filter）
+    """
+    queryset, aggregates, categories = _facet_queries(queryset, category, price)
+    return _format_facets(queryset.aggregate(**aggregates), list(categories))
+
+
+async def acompute_facets(queryset, category=None, price=Q()):
+    """compute_facets 的异步版本"""
+    queryset, aggregates, categories = _facet_queries(queryset, category, price)
+    totals = await queryset.aaggregate(**aggregates)
+    return _format_facets(totals, [row async for row in categories])
+
+
+def _summary_key(version):
+    return f'tourism:facets:{version}'
+
+
+def get_summary_facets():
+    """全部景点的分面统计，按数据版本缓存"""
+    key = _summary_key(get_data_version())
+    facets = cache.get(key)
+    if facets is None:
+        from .models import ScenicSpot
+        facets = compute_facets(ScenicSpot.objects.all())
+        cache.set(key, facets, SNAPSHOT_TIMEOUT)
+    return facets
+
+
+async def aget_summary_facets():
+    """get_summary_facets 的异步版本"""
+    key = _summary_key(await aget_data_version())
+    facets = await cache.aget(key)
+    if facets is None:
+        from .models import ScenicSpot
+        facets = await acompute_facets(ScenicSpot.objects.all())
+        await cache.aset(key, facets, SNAPSHOT_TIMEOUT)
+    return facets
@@ -0,0 +1,103 @@
+"""
+景点收藏
+
+- 用户收藏的景点id集合：序列化景点列表时用一个集合判断 is_favorited，避免每个景点单独查询一次。
+  集合按用户缓存，收藏变化时删除缓存。
+- 景点收藏人数：冗余保存在 ScenicSpot.favorite_count，收藏/取消收藏时用 F() 原子更新，
+  其他途径（后台、m2m 操作）修改收藏后按收藏表重新统计（见 signals.py）。
+"""
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .suggest import suggest_index
+
+FAVORITES_TIMEOUT = 60 * 60
+# 热门景点排行缓存时间（秒），收藏变化较频繁，排行允许短时间滞后
+POPULAR_TIMEOUT = 60
+
+
+def _cache_key(user_id):
+    return f'tourism:favorites:{user_id}'
+
+
+def get_favorite_ids(user):
+    """返回用户收藏的景点id集合（一次查询，之后走缓存）"""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    key = _cache_key(user.id)
+    favorite_ids = cache.get(key)
+    if favorite_ids is None:
+        from .models import ScenicSpot
+        favorite_ids = frozenset(
+            ScenicSpot.favorited_by.through.objects.filter(user_id=user.id).values_list('scenicspot_id', flat=True)
+        )
+        cache.set(key, favorite_ids, FAVORITES_TIMEOUT)
+    return favorite_ids
+
+
+def invalidate_favorite_ids(*user_ids):
+    """删除用户收藏集合的缓存"""
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def refresh_favorite_counts(spot_ids=None):
+    """
+    按收藏表重新统计景点的收藏人数（一条 UPDATE 语句）
+    spot_ids 为空时统计全部景点
+    """
+    from .models import ScenicSpot
+    through = ScenicSpot.favorited_by.through
+    counts = through.objects.filter(scenicspot_id=OuterRef('pk')).order_by().values(
+        'scenicspot_id'
+    ).annotate(count=Count('*')).values('count')
+    queryset = ScenicSpot.objects.all()
+    if spot_ids is not None:
+        queryset = queryset.filter(pk__in=spot_ids)
+    return queryset.update(favorite_count=Coalesce(Subquery(counts), Value(0)))
+
+
+def toggle_favorite(spot, user):
+    """
+    收藏或取消收藏，返回是否已收藏
+    先尝试删除收藏记录：删除成功即为取消收藏，否则插入收藏记录，
+    不需要先查询是否已收藏；收藏人数随之用 F() 原子增减
+    """
+    from .models import ScenicSpot
+    through = ScenicSpot.favorited_by.through
+    with transaction.atomic():
+        deleted, _ = through.objects.filter(scenicspot_id=spot.id, user_id=user.id).delete()
+        if deleted:
+            ScenicSpot.objects.filter(pk=spot.id).update(favorite_count=Greatest(F('favorite_count') - 1, Value(0)))
+            favorited = False
+        else:
+            try:
+                with transaction.atomic():
+                    through.objects.create(scenicspot_id=spot.id, user_id=user.id)
+            except IntegrityError:
+                # 并发请求已经插入了同一条收藏记录（并已增加收藏人数），仍需同步下面的缓存
+                pass
+            else:
+                ScenicSpot.objects.filter(pk=spot.id).update(favorite_count=F('favorite_count') + 1)
+            favorited = True
+    # 直接操作收藏表不会触发 m2m_changed 信号，这里同步缓存和补全索引
+    invalidate_favorite_ids(user.id)
+    # 内存中的 spot.favorite_count 是更新前的值，并发时也可能已过期，重新读取 F() 更新后的结果
+    spot.refresh_from_db(fields=['favorite_count'])
+    if suggest_index.loaded:
+        suggest_index.set_weight(spot.id, spot.favorite_count)
+    return favorited
+
+
+def get_popular_spot_ids(limit):
+    """收藏人数最多的景点id（按收藏人数降序），短时间缓存"""
+    key = f'tourism:popular:{limit}'
+    spot_ids = cache.get(key)
+    if spot_ids is None:
+        from .models import ScenicSpot
+        spot_ids = list(
+            ScenicSpot.objects.order_by('-favorite_count', '-id').values_list('id', flat=True)[:limit]
+        )
+        cache.set(key, spot_ids, POPULAR_TIMEOUT)
+    return spot_ids
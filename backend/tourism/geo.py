@@ -0,0 +1,110 @@
+"""
+批量距离计算
+
+基于 NumPy 的 Haversine 实现，一次调用即可计算一个点到一组坐标的距离，
+供附近景点查询、序列化器距离字段和爬虫去重共用。
+"""
+from math import ceil, floor, isfinite
+
+import numpy as np
+
+# 地球半径（米）
+EARTH_RADIUS = 6371000.0
+
+
+def haversine(lat, lng, lats, lngs):
+    """
+    计算点 (lat, lng) 到坐标数组 (lats, lngs) 的球面距离（米）
+    参数均支持标量或数组，按 NumPy 规则广播
+    """
+    lat1 = np.radians(lat)
+    lng1 = np.radians(lng)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lng2 = np.radians(np.asarray(lngs, dtype=np.float64))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def to_planar(lats, lngs, ref_lat=None):
+    """
+    按参考纬度（默认取 lats 的平均值）做等距圆柱投影，返回以米为单位的平面坐标 (n, 2)
+    城市范围内误差可以忽略，用于KD树按距离查询和行程分组的聚类
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if ref_lat is None:
+        ref_lat = lats.mean()
+    scale = np.pi / 180 * EARTH_RADIUS
+    return np.column_stack([lngs * scale * np.cos(np.radians(ref_lat)), lats * scale])
+
+
+def spot_coordinates(spots):
+    """从景点实例序列中提取 (ids, lats, lngs) 数组"""
+    spots = list(spots)
+    ids = np.fromiter((spot.id for spot in spots), dtype=np.int64, count=len(spots))
+    lats = np.fromiter((spot.latitude for spot in spots), dtype=np.float64, count=len(spots))
+    lngs = np.fromiter((spot.longitude for spot in spots), dtype=np.float64, count=len(spots))
+    return ids, lats, lngs
+
+
+def distance_map(spots, lat, lng):
+    """计算指定坐标到每个景点的距离，返回 {景点id: 距离(米)}"""
+    ids, lats, lngs = spot_coordinates(spots)
+    if not len(ids):
+        return {}
+    distances = haversine(lat, lng, lats, lngs)
+    return dict(zip(ids.tolist(), distances.tolist()))
+
+
+def parse_point(params):
+    """从请求参数中解析 lat/lng，缺失、格式错误或不是有限数值（nan、inf）时返回 None"""
+    lat = params.get('lat')
+    lng = params.get('lng')
+    if not lat or not lng:
+        return None
+    try:
+        lat, lng = float(lat), float(lng)
+    except (ValueError, TypeError):
+        return None
+    if not (isfinite(lat) and isfinite(lng)):
+        return None
+    return lat, lng
+
+
+def parse_bbox(value):
+    """
+    解析 bbox=minLng,minLat,maxLng,maxLat 参数
+    格式错误时抛出 ValueError
+    """
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError('bbox需要4个数值: minLng,minLat,maxLng,maxLat')
+    if not all(isfinite(part) for part in parts):
+        raise ValueError('bbox必须是有限数值')
+    min_lng, min_lat, max_lng, max_lat = parts
+    if min_lng > max_lng or min_lat > max_lat:
+        raise ValueError('bbox最小值不能大于最大值')
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def snap_bbox(bbox, zoom):
+    """
+    按缩放级别把范围向外对齐到网格（网格边长 360/2^zoom 度），
+    小幅平移地图时请求参数保持不变，便于复用缓存，同时预取视野边缘的要素
+    """
+    cell = 360.0 / (2 ** max(0, min(int(zoom), 22)))
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return (
+        floor(min_lng / cell) * cell,
+        floor(min_lat / cell) * cell,
+        ceil(max_lng / cell) * cell,
+        ceil(max_lat / cell) * cell,
+    )
+
+
+def format_distance(distance):
+    """根据距离返回不同格式"""
+    if distance < 1000:
+        return f"{int(distance)}米"
+    return f"{distance/1000:.1f}公里"
@@ -0,0 +1,96 @@
+import asyncio
+import random
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# 同步接口与对应的异步接口（见 tourism/async_views.py）
+ENDPOINTS = {
+    'sync': '/api/tourism/scenic_spots/',
+    'async': '/api/tourism/async/scenic_spots/',
+}
+
+
+def map_client_requests(prefix, count, rng):
+    """模拟一个地图客户端：每次平移地图请求视野内的GeoJSON，并查询地图中心附近的景点"""
+    min_lng, min_lat, max_lng, max_lat = settings.LEAFLET_CONFIG['SPATIAL_EXTENT']
+    paths = []
+    for _ in range(count):
+        lng = rng.uniform(min_lng + 0.05, max_lng - 0.05)
+        lat = rng.uniform(min_lat + 0.05, max_lat - 0.05)
+        bbox = f'{lng - 0.05:.4f},{lat - 0.03:.4f},{lng + 0.05:.4f},{lat + 0.03:.4f}'
+        paths.append(f'{prefix}geojson/?bbox={bbox}&zoom=14&properties=id,name,category')
+        paths.append(f'{prefix}nearby/?lat={lat:.5f}&lng={lng:.5f}&radius=3000')
+    return paths
+
+
+class Command(BaseCommand):
+    help = (
+        '并发压测：模拟大量地图客户端，比较同步WSGI与异步ASGI部署的吞吐量和延迟。'
+        '需先分别启动两个服务（见 README 中的“ASGI 部署”），并安装 httpx'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000', help='同步WSGI服务地址')
+        parser.add_argument('--asgi-url', default='http://127.0.0.1:8001', help='异步ASGI服务地址')
+        parser.add_argument('--clients', type=int, default=200, help='并发客户端数')
+        parser.add_argument('--pans', type=int, default=5, help='每个客户端平移地图的次数（每次2个请求）')
+        parser.add_argument('--seed', type=int, default=1, help='随机种子，两次压测使用相同的请求序列')
+
+    def handle(self, *args, **options):
+        try:
+            import httpx
+        except ImportError:
+            raise CommandError('压测需要 httpx：pip install httpx')
+
+        targets = [
+            ('WSGI 同步视图', options['wsgi_url'], ENDPOINTS['sync']),
+            ('ASGI 异步视图', options['asgi_url'], ENDPOINTS['async']),
+        ]
+        self.stdout.write(
+            f'{options["clients"]} 个并发客户端，每个平移 {options["pans"]} 次\n'
+            f'{"部署":<14} {"请求数":>8} {"失败":>6} {"吞吐(req/s)":>12} {"p50(ms)":>9} {"p95(ms)":>9} {"p99(ms)":>9}'
+        )
+        for label, base_url, prefix in targets:
+            result = asyncio.run(self.run_clients(httpx, base_url, prefix, options))
+            self.stdout.write(
+                f'{label:<14} {result["total"]:>8} {result["errors"]:>6} {result["throughput"]:>12.1f} '
+                f'{result["p50"]:>9.1f} {result["p95"]:>9.1f} {result["p99"]:>9.1f}'
+            )
+
+    async def run_clients(self, httpx, base_url, prefix, options):
+        clients = options['clients']
+        rng = random.Random(options['seed'])
+        plans = [map_client_requests(prefix, options['pans'], rng) for _ in range(clients)]
+        latencies = []
+        errors = 0
+
+        limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+            async def map_client(paths):
+                nonlocal errors
+                for path in paths:
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(path, headers={'Accept-Encoding': 'gzip'})
+                        if response.status_code != 200:
+                            errors += 1
+                    except httpx.HTTPError:
+                        errors += 1
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(map_client(paths) for paths in plans))
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {
+            'total': len(latencies),
+            'errors': errors,
+            'throughput': len(latencies) / elapsed,
+            'p50': quantiles[49],
+            'p95': quantiles[94],
+            'p99': quantiles[98],
+        }
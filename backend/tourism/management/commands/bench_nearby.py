@@ -0,0 +1,67 @@
+import random
+import time
+from math import radians, sin, cos, sqrt, atan2
+from django.core.management.base import BaseCommand
+from tourism.spatial_index import SpatialGridIndex
+
+# 成都市区大致范围
+CHENGDU_BOUNDS = (103.6, 30.4, 104.4, 30.9)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    return 6371000 * 2 * atan2(sqrt(a), sqrt(1-a))
+
+
+class Command(BaseCommand):
+    help = '对比全量扫描与网格索引查询附近景点的耗时（使用随机生成的坐标，不访问数据库）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 50000, 100000],
+            help='测试的数据规模'
+        )
+        parser.add_argument('--radius', type=float, default=5000, help='搜索半径(米)')
+        parser.add_argument('--queries', type=int, default=50, help='每种规模的查询次数')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        min_lng, min_lat, max_lng, max_lat = CHENGDU_BOUNDS
+        radius = options['radius']
+
+        self.stdout.write(f'搜索半径: {radius:.0f}米，每种规模查询 {options["queries"]} 次')
+        self.stdout.write(f'{"数据量":>10} {"全量扫描(ms)":>14} {"网格索引(ms)":>14} {"候选点数":>10} {"加速比":>8}')
+
+        for size in options['sizes']:
+            rows = [
+                (i, rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng))
+                for i in range(size)
+            ]
+            queries = [
+                (rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng))
+                for _ in range(options['queries'])
+            ]
+            index = SpatialGridIndex()
+            index.build(rows)
+
+            start = time.perf_counter()
+            for lat, lng in queries:
+                [pk for pk, plat, plng in rows if haversine(lat, lng, plat, plng) <= radius]
+            scan_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            candidate_count = sum(len(index.query_radius(lat, lng, radius)) for lat, lng in queries)
+            start = time.perf_counter()
+            for lat, lng in queries:
+                index.within_radius(lat, lng, radius)
+            index_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+            self.stdout.write(
+                f'{size:>10} {scan_ms:>14.2f} {index_ms:>14.2f} '
+                f'{candidate_count // len(queries):>10} {scan_ms / index_ms:>7.1f}x'
+            )
@@ -0,0 +1,45 @@
+import gzip
+import statistics
+import time
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+# 默认地图视图使用的请求：完整属性与只含标记所需属性的对比
+CASES = [
+    ('geojson 全部属性', '/api/tourism/scenic_spots/geojson/'),
+    ('geojson 标记属性', '/api/tourism/scenic_spots/geojson/?properties=id,name,category'),
+    ('列表 全部字段', '/api/tourism/scenic_spots/'),
+    ('列表 标记字段', '/api/tourism/scenic_spots/?fields=id,name,category,longitude,latitude'),
+]
+
+
+class Command(BaseCommand):
+    help = '测量默认地图视图在稀疏字段集前后的响应大小和耗时（使用当前数据库中的景点）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='每个请求的测量次数')
+
+    def handle(self, *args, **options):
+        client = Client(SERVER_NAME='localhost')
+        runs = options['runs']
+
+        self.stdout.write(f'{"请求":<16} {"原始大小(B)":>12} {"gzip(B)":>10} {"耗时中位数(ms)":>16}')
+        for label, url in CASES:
+            timings = []
+            body = b''
+            for _ in range(runs):
+                # 清空快照缓存，测量的是每次实际构建响应的耗时
+                cache.clear()
+                start = time.perf_counter()
+                response = client.get(url, HTTP_ACCEPT_ENCODING='identity')
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    self.stdout.write(self.style.ERROR(f'{label} 请求失败: {response.status_code}'))
+                    break
+
+            self.stdout.write(
+                f'{label:<16} {len(body):>12} {len(gzip.compress(body)):>10} '
+                f'{statistics.median(timings):>16.2f}'
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from tourism.models import ScenicSpot
+from tourism.pinyin import fill_pinyin
+
+class Command(BaseCommand):
+    help = '批量生成景点名称的拼音和首字母（用于拼音搜索和自动补全）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='重新生成所有景点，默认只处理缺少拼音的景点')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批更新的景点数')
+
+    def handle(self, *args, **options):
+        queryset = ScenicSpot.objects.only('id', 'name')
+        if not options['all']:
+            queryset = queryset.filter(name_pinyin='')
+
+        batch_size = options['batch_size']
+        batch = []
+        total = 0
+        for spot in queryset.iterator(chunk_size=batch_size):
+            batch.append(fill_pinyin(spot))
+            if len(batch) >= batch_size:
+                ScenicSpot.objects.bulk_update(batch, ['name_pinyin', 'name_initials'])
+                total += len(batch)
+                batch = []
+        if batch:
+            ScenicSpot.objects.bulk_update(batch, ['name_pinyin', 'name_initials'])
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'已为 {total} 个景点生成拼音'))
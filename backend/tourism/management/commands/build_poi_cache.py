@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from tourism.datasets import DATASETS, build_cache, cache_is_fresh, current_cache_dir, dataset_path
+
+class Command(BaseCommand):
+    help = '把 data/*.xlsx 转换为列式缓存（POI_CACHE_DIR），部署后预先执行可避免工作进程首次读取时解析 xlsx'
+
+    def add_arguments(self, parser):
+        parser.add_argument('layers', nargs='*', help=f'要转换的数据集，默认全部：{", ".join(DATASETS)}')
+        parser.add_argument('--force', action='store_true', help='缓存未过期也重新转换')
+
+    def handle(self, *args, **options):
+        layers = options['layers'] or list(DATASETS)
+        unknown = [layer for layer in layers if layer not in DATASETS]
+        if unknown:
+            raise CommandError(f'未知数据集: {", ".join(unknown)}')
+
+        for layer in layers:
+            if not options['force'] and cache_is_fresh(layer):
+                self.stdout.write(f'{DATASETS[layer]}（{layer}）：缓存未过期，跳过')
+                continue
+            start = time.perf_counter()
+            try:
+                rows = build_cache(layer)
+            except FileNotFoundError:
+                self.stdout.write(self.style.WARNING(f'跳过 {layer}：找不到文件 {dataset_path(layer)}'))
+                continue
+            self.stdout.write(
+                f'{DATASETS[layer]}（{layer}）：{rows} 条，耗时 {time.perf_counter() - start:.2f}s -> {current_cache_dir(layer)}'
+            )
+
+        self.stdout.write(self.style.SUCCESS('POI 列式缓存生成完成'))
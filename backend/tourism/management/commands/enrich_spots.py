@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+from tourism.enrichment import enrich_spots
+
+class Command(BaseCommand):
+    help = '计算每个景点最近的地铁站、停车场、餐饮及 500 米/1 公里内的数量（需要先执行 load_pois 导入周边设施）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批更新的景点数')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = enrich_spots(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'已更新 {count} 个景点的周边设施，耗时 {time.perf_counter() - start:.2f}s'
+        ))
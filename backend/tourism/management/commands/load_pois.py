@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tourism.datasets import DATASETS, dataset_path, read_pois
+from tourism.enrichment import enrich_spots
+from tourism.models import POI
+from tourism.pois import POI_VERSION_KEY
+from tourism.signals import poi_signals_muted
+from tourism.snapshots import bump_data_version
+
+class Command(BaseCommand):
+    help = '从 data/*.xlsx（爬数据.py 的输出）导入周边设施，每个图层的已有数据会被替换'
+
+    def add_arguments(self, parser):
+        parser.add_argument('layers', nargs='*', help=f'要导入的图层，默认全部：{", ".join(DATASETS)}')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批插入的记录数')
+
+    def handle(self, *args, **options):
+        layers = options['layers'] or list(DATASETS)
+        unknown = [layer for layer in layers if layer not in DATASETS]
+        if unknown:
+            raise CommandError(f'未知图层: {", ".join(unknown)}')
+
+        # 超长的文本按字段长度截断
+        max_lengths = {
+            field.name: field.max_length for field in POI._meta.concrete_fields if getattr(field, 'max_length', None)
+        }
+
+        def clip(name, value):
+            return value[:max_lengths[name]]
+
+        total = 0
+        for layer in layers:
+            try:
+                pois = read_pois(layer)
+            except FileNotFoundError:
+                self.stdout.write(self.style.WARNING(f'跳过 {layer}：找不到文件 {dataset_path(layer)}'))
+                continue
+
+            objects = [
+                POI(
+                    layer=layer,
+                    name=clip('name', poi['name']),
+                    longitude=poi['longitude'],
+                    latitude=poi['latitude'],
+                    address=clip('address', poi['address']),
+                    poi_type=clip('poi_type', poi['type']),
+                    phone=clip('phone', poi['phone']),
+                    opening_hours=clip('opening_hours', poi['opening_hours']),
+                    rating=poi['rating'],
+                )
+                for poi in pois
+            ]
+            # 有 post_delete 接收者时 QuerySet.delete() 会逐行发送信号（每行递增一次数据版本），
+            # 导入期间断开POI信号，删除退化为一条 DELETE；导入完成后统一递增数据版本
+            with transaction.atomic(), poi_signals_muted():
+                POI.objects.filter(layer=layer).delete()
+                POI.objects.bulk_create(objects, batch_size=options['batch_size'])
+            total += len(objects)
+            self.stdout.write(f'{DATASETS[layer]}（{layer}）：导入 {len(objects)} 条')
+
+        # 数据版本保存在数据库中，服务进程随后发现版本变化，重建图层索引并使快照失效
+        bump_data_version(POI_VERSION_KEY)
+        self.stdout.write(self.style.SUCCESS(f'共导入 {total} 条周边设施数据'))
+
+        # 设施id随导入变化，重新计算景点的周边设施
+        count = enrich_spots()
+        self.stdout.write(self.style.SUCCESS(f'已更新 {count} 个景点的周边设施'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from tourism.favorites import refresh_favorite_counts
+
+class Command(BaseCommand):
+    help = '按收藏表重新统计所有景点的收藏人数（修正冗余的 favorite_count 字段）'
+
+    def handle(self, *args, **options):
+        updated = refresh_favorite_counts()
+        self.stdout.write(self.style.SUCCESS(f'已重新统计 {updated} 个景点的收藏人数'))
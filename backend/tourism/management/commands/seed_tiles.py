@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tourism.datasets import DATASETS
+from tourism.tiles import SPOT_LAYER, get_tile, layer_data_version, purge_stale_tiles, tiles_in_bbox
+
+class Command(BaseCommand):
+    help = '预生成成都范围（LEAFLET_CONFIG 中的 SPATIAL_EXTENT）内的景点及周边设施矢量瓦片缓存'
+
+    def add_arguments(self, parser):
+        parser.add_argument('layers', nargs='*', help=f'要生成的图层，默认只生成景点：{SPOT_LAYER}, {", ".join(DATASETS)}')
+        parser.add_argument('--min-zoom', type=int, default=8, help='最小缩放级别')
+        parser.add_argument('--max-zoom', type=int, default=14, help='最大缩放级别')
+
+    def handle(self, *args, **options):
+        layers = options['layers'] or [SPOT_LAYER]
+        unknown = [layer for layer in layers if layer != SPOT_LAYER and layer not in DATASETS]
+        if unknown:
+            raise CommandError(f'未知图层: {", ".join(unknown)}')
+
+        extent = settings.LEAFLET_CONFIG['SPATIAL_EXTENT']
+        for layer in layers:
+            version = layer_data_version(layer)
+            removed = purge_stale_tiles(version, layer)
+            if removed:
+                self.stdout.write(f'{layer}：已清理 {removed} 个过期的瓦片缓存目录')
+
+            for z in range(options['min_zoom'], options['max_zoom'] + 1):
+                total = 0
+                non_empty = 0
+                for x, y in tiles_in_bbox(extent, z):
+                    if get_tile(layer, z, x, y, version):
+                        non_empty += 1
+                    total += 1
+                self.stdout.write(f'{layer} 缩放级别 {z}: 共 {total} 个瓦片，其中 {non_empty} 个包含数据')
+
+        self.stdout.write(self.style.SUCCESS('瓦片缓存预生成完成'))
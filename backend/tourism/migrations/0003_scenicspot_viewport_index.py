@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-17 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourism', '0002_alter_scenicspot_category'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scenicspot',
+            index=models.Index(fields=['latitude', 'longitude', 'category'], name='spot_lat_lng_category_idx'),
+        ),
+    ]
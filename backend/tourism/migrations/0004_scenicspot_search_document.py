@@ -0,0 +1,72 @@
+# Generated by Django 4.2 on 2026-10-17 21:12
+
+import re
+
+from django.db import migrations, models
+
+# 以下为编写迁移时 search.py 中分词逻辑的副本，之后 search.py 的修改不影响本迁移
+CJK_RUN = re.compile(r'[㐀-䶿一-鿿]+')
+WORD = re.compile(r'[a-z0-9]+')
+DOCUMENT_FIELDS = ('name', 'category', 'address', 'description')
+
+
+def tokenize(text):
+    """汉字单字 + 二元组，英文数字按单词"""
+    if not text:
+        return []
+    text = text.lower()
+    tokens = []
+    for run in CJK_RUN.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(WORD.findall(text))
+    return tokens
+
+
+def build_document(spot):
+    tokens = []
+    for field in DOCUMENT_FIELDS:
+        tokens.extend(tokenize(getattr(spot, field, '')))
+    return ' '.join(tokens)
+
+
+def fill_search_document(apps, schema_editor):
+    """为已有景点生成搜索分词"""
+    ScenicSpot = apps.get_model('tourism', 'ScenicSpot')
+    spots = list(ScenicSpot.objects.only('id', 'name', 'category', 'address', 'description'))
+    for spot in spots:
+        spot.search_document = build_document(spot)
+    ScenicSpot.objects.bulk_update(spots, ['search_document'], batch_size=500)
+
+
+def create_search_index(apps, schema_editor):
+    """PostgreSQL上创建分词文本的GIN全文索引，表达式需与 search.py 中的查询一致"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS spot_search_document_gin ON tourism_scenicspot "
+        "USING gin (to_tsvector('simple'::regconfig, COALESCE(search_document, '')))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS spot_search_document_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourism', '0003_scenicspot_viewport_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scenicspot',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='搜索分词'),
+        ),
+        migrations.RunPython(fill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
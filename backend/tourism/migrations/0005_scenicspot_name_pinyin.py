@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-17 21:30
+
+import re
+
+from django.db import migrations, models
+from pypinyin import Style, lazy_pinyin
+
+# 以下为编写迁移时 pinyin.py 中转换逻辑的副本，之后 pinyin.py 的修改不影响本迁移
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def _join(parts):
+    return NON_ALNUM.sub('', ''.join(parts).lower())
+
+
+def fill_name_pinyin(apps, schema_editor):
+    """为已有景点生成名称拼音和首字母"""
+    ScenicSpot = apps.get_model('tourism', 'ScenicSpot')
+    spots = list(ScenicSpot.objects.only('id', 'name'))
+    for spot in spots:
+        spot.name_pinyin = _join(lazy_pinyin(spot.name or ''))[:300]
+        spot.name_initials = _join(lazy_pinyin(spot.name or '', style=Style.FIRST_LETTER))[:100]
+    ScenicSpot.objects.bulk_update(spots, ['name_pinyin', 'name_initials'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourism', '0004_scenicspot_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scenicspot',
+            name='name_initials',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, verbose_name='名称首字母'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='name_pinyin',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=300, verbose_name='名称拼音'),
+        ),
+        migrations.RunPython(fill_name_pinyin, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 21:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourism', '0005_scenicspot_name_pinyin'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scenicspot',
+            index=models.Index(fields=['name', 'id'], name='spot_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scenicspot',
+            index=models.Index(fields=['created_at', 'id'], name='spot_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scenicspot',
+            index=models.Index(fields=['ticket_price', 'id'], name='spot_ticket_price_id_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-17 21:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_favorite_count(apps, schema_editor):
+    """按收藏表统计已有景点的收藏人数"""
+    ScenicSpot = apps.get_model('tourism', 'ScenicSpot')
+    through = ScenicSpot.favorited_by.through
+    counts = through.objects.filter(scenicspot_id=OuterRef('pk')).order_by().values(
+        'scenicspot_id'
+    ).annotate(count=Count('*')).values('count')
+    ScenicSpot.objects.update(favorite_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourism', '0006_scenicspot_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scenicspot',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='收藏人数'),
+        ),
+        migrations.RunPython(fill_favorite_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='scenicspot',
+            index=models.Index(fields=['favorite_count', 'id'], name='spot_favorite_count_id_idx'),
+        ),
+    ]
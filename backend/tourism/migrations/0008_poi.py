@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-17 21:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourism', '0007_scenicspot_favorite_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='POI',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('layer', models.CharField(choices=[('hotels', '酒店'), ('homestays', '民宿'), ('bus_stops', '公交站'), ('metro_stations', '地铁站'), ('parking_lots', '停车场'), ('sichuan_food', '川菜'), ('hotpot', '火锅'), ('snacks', '小吃'), ('western_food', '西餐')], max_length=30, verbose_name='图层')),
+                ('name', models.CharField(max_length=200, verbose_name='名称')),
+                ('longitude', models.FloatField(verbose_name='经度')),
+                ('latitude', models.FloatField(verbose_name='纬度')),
+                ('address', models.CharField(blank=True, max_length=500, verbose_name='地址')),
+                ('poi_type', models.CharField(blank=True, max_length=200, verbose_name='类型')),
+                ('phone', models.CharField(blank=True, max_length=100, verbose_name='电话')),
+                ('opening_hours', models.CharField(blank=True, max_length=200, verbose_name='营业时间')),
+                ('rating', models.FloatField(blank=True, null=True, verbose_name='评分')),
+            ],
+            options={
+                'verbose_name': '周边设施',
+                'verbose_name_plural': '周边设施',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='poi',
+            index=models.Index(fields=['layer', 'latitude', 'longitude'], name='poi_layer_lat_lng_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2 on 2026-10-17 21:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tourism', '0008_poi'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scenicspot',
+            name='facilities_updated_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='周边设施更新时间'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='food_count_1000',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='1公里内餐饮数'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='food_count_500',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='500米内餐饮数'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='metro_count_1000',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='1公里内地铁站数'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='metro_count_500',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='500米内地铁站数'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_food_distance',
+            field=models.FloatField(editable=False, null=True, verbose_name='最近餐饮距离(米)'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_food_name',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='最近餐饮'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_food_poi',
+            field=models.IntegerField(editable=False, null=True, verbose_name='最近餐饮id'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_metro_distance',
+            field=models.FloatField(editable=False, null=True, verbose_name='最近地铁站距离(米)'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_metro_name',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='最近地铁站'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_metro_poi',
+            field=models.IntegerField(editable=False, null=True, verbose_name='最近地铁站id'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_parking_distance',
+            field=models.FloatField(editable=False, null=True, verbose_name='最近停车场距离(米)'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_parking_name',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='最近停车场'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='nearest_parking_poi',
+            field=models.IntegerField(editable=False, null=True, verbose_name='最近停车场id'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='parking_count_1000',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='1公里内停车场数'),
+        ),
+        migrations.AddField(
+            model_name='scenicspot',
+            name='parking_count_500',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='500米内停车场数'),
+        ),
+    ]
@@ -27,6 +27,88 @@ class ScenicSpot(models.Model):
     created_at = models.DateTimeField("创建时间", auto_now_add=True)
     updated_at = models.DateTimeField("更新时间", auto_now=True)
     favorited_by = models.ManyToManyField(User, related_name='favorite_spots', verbose_name='收藏用户', blank=True)
+    # 收藏人数（冗余字段，见 favorites.py）
+    favorite_count = models.PositiveIntegerField("收藏人数", default=0, editable=False)
+    # 名称、分类、地址、描述的分词结果，保存时自动生成（见 search.py）
+    search_document = models.TextField("搜索分词", blank=True, editable=False)
+    # 名称的全拼和首字母，用于拼音搜索和自动补全（见 pinyin.py）
+    name_pinyin = models.CharField("名称拼音", max_length=300, blank=True, editable=False, db_index=True)
+    name_initials = models.CharField("名称首字母", max_length=100, blank=True, editable=False, db_index=True)
+    # 周边设施（冗余字段，由 enrich_spots 命令批量计算，见 enrichment.py）
+    nearest_metro_poi = models.IntegerField("最近地铁站id", null=True, editable=False)
+    nearest_metro_name = models.CharField("最近地铁站", max_length=200, blank=True, editable=False)
+    nearest_metro_distance = models.FloatField("最近地铁站距离(米)", null=True, editable=False)
+    metro_count_500 = models.PositiveIntegerField("500米内地铁站数", default=0, editable=False)
+    metro_count_1000 = models.PositiveIntegerField("1公里内地铁站数", default=0, editable=False)
+    nearest_parking_poi = models.IntegerField("最近停车场id", null=True, editable=False)
+    nearest_parking_name = models.CharField("最近停车场", max_length=200, blank=True, editable=False)
+    nearest_parking_distance = models.FloatField("最近停车场距离(米)", null=True, editable=False)
+    parking_count_500 = models.PositiveIntegerField("500米内停车场数", default=0, editable=False)
+    parking_count_1000 = models.PositiveIntegerField("1公里内停车场数", default=0, editable=False)
+    nearest_food_poi = models.IntegerField("最近餐饮id", null=True, editable=False)
+    nearest_food_name = models.CharField("最近餐饮", max_length=200, blank=True, editable=False)
+    nearest_food_distance = models.FloatField("最近餐饮距离(米)", null=True, editable=False)
+    food_count_500 = models.PositiveIntegerField("500米内餐饮数", default=0, editable=False)
+    food_count_1000 = models.PositiveIntegerField("1公里内餐饮数", default=0, editable=False)
+    facilities_updated_at = models.DateTimeField("周边设施更新时间", null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # 地图视野范围查询（经纬度范围 + 分类过滤）
+            models.Index(fields=['latitude', 'longitude', 'category'], name='spot_lat_lng_category_idx'),
+            # 列表键集分页：(排序字段, id)
+            models.Index(fields=['name', 'id'], name='spot_name_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='spot_created_at_id_idx'),
+            models.Index(fields=['ticket_price', 'id'], name='spot_ticket_price_id_idx'),
+            models.Index(fields=['favorite_count', 'id'], name='spot_favorite_count_id_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class POI(models.Model):
+    """周边设施（酒店、餐饮、交通站点等），由 load_pois 命令从 data/*.xlsx 导入"""
+    LAYER_CHOICES = [
+        ('hotels', '酒店'),
+        ('homestays', '民宿'),
+        ('bus_stops', '公交站'),
+        ('metro_stations', '地铁站'),
+        ('parking_lots', '停车场'),
+        ('sichuan_food', '川菜'),
+        ('hotpot', '火锅'),
+        ('snacks', '小吃'),
+        ('western_food', '西餐'),
+    ]
+
+    layer = models.CharField("图层", max_length=30, choices=LAYER_CHOICES)
+    name = models.CharField("名称", max_length=200)
+    longitude = models.FloatField("经度")
+    latitude = models.FloatField("纬度")
+    address = models.CharField("地址", max_length=500, blank=True)
+    poi_type = models.CharField("类型", max_length=200, blank=True)
+    phone = models.CharField("电话", max_length=100, blank=True)
+    opening_hours = models.CharField("营业时间", max_length=200, blank=True)
+    rating = models.FloatField("评分", blank=True, null=True)
+
+    class Meta:
+        verbose_name = '周边设施'
+        verbose_name_plural = verbose_name
+        indexes = [
+            # 按图层 + 视野范围查询
+            models.Index(fields=['layer', 'latitude', 'longitude'], name='poi_layer_lat_lng_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class DataVersion(models.Model):
+    """数据版本号（见 snapshots.py），保存在数据库中，各工作进程和管理命令看到同一版本"""
+    key = models.CharField("键", max_length=100, unique=True)
+    version = models.BigIntegerField("版本")
+
+    class Meta:
+        verbose_name = '数据版本'
+        verbose_name_plural = verbose_name
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.key
@@ -0,0 +1,348 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .search import rank_ids, uses_postgres_search
+
+
+def encode_cursor(*values):
+    """把游标位置编码为URL安全的字符串"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """解析游标字符串，返回各位置值的列表"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValidationError({'cursor': '无效的游标'})
+    if not isinstance(values, list):
+        raise ValidationError({'cursor': '无效的游标'})
+    return values
+
+
+def is_cursor_int(value):
+    """游标中的整数：不是布尔值，且在数据库 64 位整数范围内"""
+    return isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63
+
+
+class DistanceCursorPagination:
+    """
+    按 (距离, id) 排序的游标分页
+    游标记录上一页最后一条的距离和id，下一页只取排在它之后的记录，
+    因此每页只需从数据库读取当前页的景点
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+        self.next_cursor = None
+        self.request = None
+
+    @staticmethod
+    def _params(request):
+        # 同时支持 DRF 请求和普通 Django 请求（异步视图）
+        return getattr(request, 'query_params', request.GET)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(self._params(request).get(self.page_size_query_param, self.page_size))
+        except (ValueError, TypeError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def paginate_arrays(self, ids, distances, request):
+        """
+        对 (ids, distances) 数组分页，返回当前页的 (ids, distances)
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        cursor = self._params(request).get(self.cursor_query_param)
+        if cursor:
+            try:
+                last_distance, last_id = decode_cursor(cursor)
+                last_distance = float(last_distance)
+            except (ValueError, TypeError):
+                raise ValidationError({'cursor': '无效的游标'})
+            if not (is_cursor_int(last_id) and np.isfinite(last_distance)):
+                raise ValidationError({'cursor': '无效的游标'})
+            after = (distances > last_distance) | ((distances == last_distance) & (ids > last_id))
+            ids, distances = ids[after], distances[after]
+
+        # 只对剩余候选中最近的 page_size+1 个（含同距离的记录）排序
+        if len(ids) > page_size + 1:
+            threshold = np.partition(distances, page_size)[page_size]
+            nearest = distances <= threshold
+            ids, distances = ids[nearest], distances[nearest]
+        order = np.lexsort((ids, distances))
+        ids, distances = ids[order], distances[order]
+
+        if len(ids) > page_size:
+            ids, distances = ids[:page_size], distances[:page_size]
+            self.next_cursor = encode_cursor(float(distances[-1]), int(ids[-1]))
+        return ids, distances
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+
+# 估算行数低于该值时直接精确计数
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimated_count(queryset):
+    """
+    估算查询集的行数，避免大表上的 COUNT(*)
+    - PostgreSQL：无过滤条件时读取 pg_class.reltuples，否则取查询计划的估算行数
+    - 其他数据库，或估算值较小时：精确计数
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    estimate = None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            # 从未 ANALYZE 过的表 reltuples 为 -1
+            if row and row[0] >= 0:
+                estimate = row[0]
+        else:
+            sql, params = queryset.order_by().values('pk').query.sql_with_params()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+
+    if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    """总数使用估算值的分页器（对列表分页时直接取长度）"""
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return len(self.object_list)
+        return estimated_count(self.object_list)
+
+
+class EstimatedCountPageNumberPagination(PageNumberPagination):
+    """页码分页，count 为估算值（大表上可能与实际略有出入）"""
+    django_paginator_class = EstimatedCountPaginator
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class SpotKeysetPagination(BasePagination):
+    """
+    景点列表分页：默认页码分页，带 cursor 参数时使用键集（游标）分页
+    - 默认（不带 cursor 参数）：页码分页，返回格式与原接口相同 {count, next, previous, results}，
+      count 为估算值；同样按 (排序字段, id) 排序，页与页之间的边界稳定
+    - 键集分页（首页传空的 ?cursor=，之后沿 next 翻页）：返回 {next, results}，没有总数和上一页。
+      游标记录上一页最后一条的排序值和id，下一页用 WHERE (字段, id) > (值, id) 直接定位，
+      不需要 OFFSET 和 COUNT(*)，并由 (字段, id) 复合索引支持
+    - 有搜索词且未指定排序时按相关度排序，相关度无法建立索引，始终使用页码分页；
+      非PostgreSQL数据库上先在 Python 中按相关度排序景点id并切出当前页，再只读取这一页的景点
+    """
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    page_size_query_param = 'page_size'
+    ordering_param = 'ordering'
+    max_page_size = 100
+    # 支持键集分页的排序字段，与视图的 ordering_fields 一致
+    keyset_fields = ('name', 'created_at', 'ticket_price', 'favorite_count')
+    # 可为空的排序字段：升序时空值排在最后，降序时排在最前
+    nullable_fields = ('ticket_price',)
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+        self.page_pagination = None
+        self.next_cursor = None
+        self.request = None
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (ValueError, TypeError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering(self, request, view):
+        """返回 (字段, 是否降序)；应按相关度排序时返回 None"""
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            if request.query_params.get('search', '').strip():
+                return None
+            default = getattr(view, 'ordering', None) or ['name']
+            params = default[0]
+        for term in params.split(','):
+            term = term.strip()
+            if term.lstrip('-') in self.keyset_fields:
+                return term.lstrip('-'), term.startswith('-')
+        return 'name', False
+
+    def _order_by(self, field, descending):
+        if field in self.nullable_fields:
+            key = F(field).desc(nulls_first=True) if descending else F(field).asc(nulls_last=True)
+        else:
+            key = F(field).desc() if descending else F(field).asc()
+        return key, '-id' if descending else 'id'
+
+    def _after(self, field, descending, value, last_id):
+        """排在游标 (value, last_id) 之后的记录"""
+        op = 'lt' if descending else 'gt'
+        if value is None:
+            after = Q(**{f'{field}__isnull': True, f'id__{op}': last_id})
+            if descending:
+                # 降序时空值在前，之后是全部非空值
+                after |= Q(**{f'{field}__isnull': False})
+            return after
+        after = Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': last_id})
+        if field in self.nullable_fields and not descending:
+            # 升序时空值在最后
+            after |= Q(**{f'{field}__isnull': True})
+        return after
+
+    def _decode_value(self, field, value):
+        if value is None:
+            return None
+        try:
+            if field == 'created_at':
+                parsed = parse_datetime(value)
+                if parsed is None:
+                    raise ValueError(value)
+                return parsed
+            if field == 'ticket_price':
+                if not isinstance(value, str):
+                    raise TypeError(value)
+                return Decimal(value)
+            if field == 'favorite_count':
+                if not is_cursor_int(value):
+                    raise TypeError(value)
+                return value
+        except (ValueError, TypeError, InvalidOperation):
+            raise ValidationError({'cursor': '无效的游标'})
+        if not isinstance(value, str):
+            raise ValidationError({'cursor': '无效的游标'})
+        return value
+
+    @staticmethod
+    def _validate(model_field, value):
+        """
+        按模型字段的校验器检查游标中的值，不合法时返回400而不是在查询时出错
+        （如 NaN、超出门票价格位数的小数、超出数据库整数范围的id）
+        """
+        try:
+            model_field.run_validators(value)
+        except DjangoValidationError:
+            raise ValidationError({'cursor': '无效的游标'})
+        return value
+
+    @staticmethod
+    def _encode_value(value):
+        if value is None or isinstance(value, (str, int)):
+            return value
+        if isinstance(value, Decimal):
+            return str(value)
+        return value.isoformat()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(request, view)
+        keyset = self.cursor_query_param in request.query_params and not request.query_params.get(self.page_query_param)
+        if ordering is None or not keyset:
+            self.page_pagination = EstimatedCountPageNumberPagination()
+            if ordering is None:
+                if not uses_postgres_search():
+                    return self._paginate_ranked(queryset, request, view)
+            else:
+                queryset = queryset.order_by(*self._order_by(*ordering))
+            return self.page_pagination.paginate_queryset(queryset, request, view)
+
+        field, descending = ordering
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self._order_by(field, descending))
+
+        # 只读取部分字段时，确保排序字段也被读取，生成游标时不会再次查询
+        only_fields, deferred = queryset.query.deferred_loading
+        if only_fields and not deferred:
+            queryset = queryset.only(*only_fields, field)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                value, last_id = decode_cursor(cursor)
+            except (ValueError, TypeError):
+                raise ValidationError({'cursor': '无效的游标'})
+            if not is_cursor_int(last_id):
+                raise ValidationError({'cursor': '无效的游标'})
+            meta = queryset.model._meta
+            value = self._validate(meta.get_field(field), self._decode_value(field, value))
+            last_id = self._validate(meta.pk, last_id)
+            queryset = queryset.filter(self._after(field, descending, value, last_id))
+
+        results = list(queryset[:page_size + 1])
+        if len(results) > page_size:
+            results = results[:page_size]
+            last = results[-1]
+            self.next_cursor = encode_cursor(self._encode_value(getattr(last, field)), last.id)
+        return results
+
+    def _paginate_ranked(self, queryset, request, view):
+        ranked = rank_ids(queryset, request.query_params.get('search', '').strip())
+        page = self.page_pagination.paginate_queryset(ranked, request, view)
+        if page is None:
+            return None
+        spots = queryset.in_bulk([spot_id for spot_id, _ in page])
+        return [spots[spot_id] for spot_id, _ in page if spot_id in spots]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if self.page_pagination is not None:
+            return self.page_pagination.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
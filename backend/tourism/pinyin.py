@@ -0,0 +1,58 @@
+"""
+景点名称的拼音与首字母
+
+用户常直接输入拼音（kuanzhai）或首字母（kzxz）搜索，这里在入库时预先计算名称的
+全拼和首字母并保存到带索引的字段，查询时只做前缀匹配，不再实时转换。
+"""
+import re
+
+from pypinyin import Style, lazy_pinyin
+
+NON_ALNUM = re.compile(r'[^a-z0-9]+')
+# 拼音查询：只含字母（允许空格和隔音符）
+PINYIN_QUERY = re.compile(r"^[a-z][a-z\s']*$")
+
+
+def _join(parts):
+    return NON_ALNUM.sub('', ''.join(parts).lower())
+
+
+def name_pinyin(name):
+    """名称全拼，如 宽窄巷子 -> kuanzhaixiangzi"""
+    return _join(lazy_pinyin(name or ''))[:300]
+
+
+def name_initials(name):
+    """名称首字母，如 宽窄巷子 -> kzxz"""
+    return _join(lazy_pinyin(name or '', style=Style.FIRST_LETTER))[:100]
+
+
+def fill_pinyin(spot):
+    """为景点对象计算拼音字段（不保存）；已按当前名称计算过时跳过（见 fill_pinyin_bulk）"""
+    if getattr(spot, '_pinyin_name', None) != spot.name:
+        spot.name_pinyin = name_pinyin(spot.name)
+        spot.name_initials = name_initials(spot.name)
+        spot._pinyin_name = spot.name
+    return spot
+
+
+def fill_pinyin_bulk(spots):
+    """
+    批量为一组景点对象计算拼音字段（不保存），同名景点只转换一次
+    爬虫入库时按页调用，保存时 pre_save 信号中的 fill_pinyin 不再重复转换
+    """
+    converted = {}
+    for spot in spots:
+        if spot.name not in converted:
+            converted[spot.name] = (name_pinyin(spot.name), name_initials(spot.name))
+        spot.name_pinyin, spot.name_initials = converted[spot.name]
+        spot._pinyin_name = spot.name
+    return spots
+
+
+def normalize_pinyin_query(query):
+    """若查询是拼音/首字母，返回去掉空格后的小写形式，否则返回空字符串"""
+    query = (query or '').strip().lower()
+    if not PINYIN_QUERY.match(query):
+        return ''
+    return NON_ALNUM.sub('', query)
@@ -0,0 +1,69 @@
+"""
+周边设施（POI）图层
+
+每个图层一份网格空间索引（与景点共用 SpatialGridIndex），按视野范围查询时先在索引中取出候选id，
+数据库只按id读取属性。POI 数据版本保存在缓存中，load_pois 导入或后台编辑后递增版本，
+各工作进程在下次查询时发现版本变化并重建索引，GeoJSON 快照也随版本失效。
+"""
+import logging
+import threading
+
+import numpy as np
+
+from .snapshots import get_data_version
+from .spatial_index import SpatialGridIndex
+
+logger = logging.getLogger('tourism_pois')
+
+POI_VERSION_KEY = 'tourism:poi_data_version'
+
+# GeoJSON 可选择输出的属性
+POI_PROPERTIES = ('id', 'layer', 'name', 'address', 'poi_type', 'phone', 'opening_hours', 'rating')
+
+_indexes = {}  # 图层 -> (数据版本, 索引)
+_indexes_lock = threading.Lock()
+
+
+def get_poi_index(layer):
+    """获取图层的空间索引，数据版本变化后重建"""
+    version = get_data_version(POI_VERSION_KEY)
+    entry = _indexes.get(layer)
+    if entry is None or entry[0] != version:
+        with _indexes_lock:
+            entry = _indexes.get(layer)
+            if entry is None or entry[0] != version:
+                from .models import POI
+                index = SpatialGridIndex()
+                index.build(POI.objects.filter(layer=layer).values_list('id', 'latitude', 'longitude').iterator())
+                logger.info(f"POI图层 {layer} 空间索引构建完成，共 {len(index)} 个点")
+                entry = _indexes[layer] = (version, index)
+    return entry[1]
+
+
+def poi_ids_in_bbox(layer, bbox):
+    """返回图层中落在矩形范围内的POI id数组（升序）"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    candidates = get_poi_index(layer).query_bbox(min_lng, min_lat, max_lng, max_lat)
+    ids = [
+        pk for pk, lat, lng in candidates
+        if min_lng <= lng <= max_lng and min_lat <= lat <= max_lat
+    ]
+    return np.sort(np.asarray(ids, dtype=np.int64))
+
+
+def poi_fields(properties):
+    """POI 要素需要从数据库读取的字段：坐标 + 属性"""
+    return ('longitude', 'latitude') + tuple(properties)
+
+
+def poi_feature_builder(properties):
+    """返回把 poi_fields 顺序的一行数据转换为GeoJSON要素的函数"""
+    properties = tuple(properties)
+
+    def to_feature(row):
+        return {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [row[0], row[1]]},
+            'properties': dict(zip(properties, row[2:])),
+        }
+    return to_feature
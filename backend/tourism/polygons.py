@@ -0,0 +1,209 @@
+"""
+多边形范围查询
+
+解析 GeoJSON Polygon/MultiPolygon（地图上绘制的区域或行政区边界），
+先按多边形外包矩形从网格空间索引中取出候选景点，再用 NumPy 向量化的射线法
+判断候选点是否落在多边形内（支持内环）。
+
+区县边界从本地 GeoJSON 文件（settings.DISTRICT_BOUNDARIES_FILE）加载一次，
+可按区县名称查询，也可统计各区县的景点数量。
+"""
+import json
+import logging
+import threading
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger('tourism_polygons')
+
+# 单次查询允许的顶点总数，防止超大多边形占满CPU
+MAX_VERTICES = 20000
+# 射线法按 点数 × 边数 分块广播，控制临时数组大小
+BROADCAST_LIMIT = 1_000_000
+
+
+class Polygon:
+    """多边形：第一个环为外环，其余为内环，每个环是闭合的 (N, 2) 经纬度数组"""
+
+    __slots__ = ('rings', 'bbox')
+
+    def __init__(self, rings):
+        self.rings = rings
+        exterior = rings[0]
+        self.bbox = (
+            float(exterior[:, 0].min()), float(exterior[:, 1].min()),
+            float(exterior[:, 0].max()), float(exterior[:, 1].max()),
+        )
+
+    def contains(self, lngs, lats):
+        """返回每个点是否在多边形内的布尔数组（在外环内且不在任何内环内）"""
+        min_lng, min_lat, max_lng, max_lat = self.bbox
+        inside = (lngs >= min_lng) & (lngs <= max_lng) & (lats >= min_lat) & (lats <= max_lat)
+        if not inside.any():
+            return inside
+        positions = np.flatnonzero(inside)
+        x, y = lngs[positions], lats[positions]
+        result = _in_ring(x, y, self.rings[0])
+        for hole in self.rings[1:]:
+            result &= ~_in_ring(x, y, hole)
+        inside[positions] = result
+        return inside
+
+
+def _in_ring(x, y, ring):
+    """射线法：从点向右发出水平射线，与环的边相交奇数次则在环内"""
+    x0, y0 = ring[:-1, 0], ring[:-1, 1]
+    x1, y1 = ring[1:, 0], ring[1:, 1]
+    # 水平边不会与射线相交，斜率分母置1避免除零（下面的跨越条件已将其排除）
+    dy = np.where(y1 == y0, 1.0, y1 - y0)
+    slope = (x1 - x0) / dy
+
+    inside = np.zeros(len(x), dtype=bool)
+    step = max(BROADCAST_LIMIT // len(x0), 1)
+    for start in range(0, len(x), step):
+        px = x[start:start + step, None]
+        py = y[start:start + step, None]
+        crosses = ((y0 > py) != (y1 > py)) & (px < x0 + (py - y0) * slope)
+        inside[start:start + step] = np.count_nonzero(crosses, axis=1) % 2 == 1
+    return inside
+
+
+def _parse_ring(coordinates):
+    ring = np.asarray(coordinates, dtype=np.float64)
+    if ring.ndim != 2 or ring.shape[1] < 2 or len(ring) < 3:
+        raise ValueError('多边形的每个环至少需要3个[经度, 纬度]坐标')
+    ring = ring[:, :2]
+    if not np.isfinite(ring).all():
+        raise ValueError('坐标必须是有效数值')
+    if not (ring[0] == ring[-1]).all():
+        ring = np.vstack([ring, ring[:1]])
+    return ring
+
+
+def parse_geometry(data):
+    """
+    解析 GeoJSON Polygon/MultiPolygon（也接受 Feature），返回 Polygon 列表
+    格式错误时抛出 ValueError
+    """
+    if not isinstance(data, dict):
+        raise ValueError('geometry必须是GeoJSON对象')
+    if data.get('type') == 'Feature':
+        data = data.get('geometry') or {}
+    geometry_type = data.get('type')
+    coordinates = data.get('coordinates')
+    if geometry_type == 'Polygon':
+        polygons = [coordinates]
+    elif geometry_type == 'MultiPolygon':
+        polygons = coordinates
+    else:
+        raise ValueError('只支持Polygon和MultiPolygon')
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError('coordinates不能为空')
+
+    try:
+        result = [Polygon([_parse_ring(ring) for ring in rings]) for rings in polygons if rings]
+    except (TypeError, IndexError):
+        raise ValueError('coordinates格式错误')
+    if not result:
+        raise ValueError('coordinates不能为空')
+    if sum(len(ring) for polygon in result for ring in polygon.rings) > MAX_VERTICES:
+        raise ValueError(f'多边形顶点数不能超过{MAX_VERTICES}')
+    return result
+
+
+def geometry_bbox(polygons):
+    """多个多边形的总外包矩形 (minLng, minLat, maxLng, maxLat)"""
+    boxes = np.array([polygon.bbox for polygon in polygons])
+    return (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+
+
+def contains_points(polygons, lngs, lats):
+    """返回每个点是否落在任一多边形内的布尔数组"""
+    mask = np.zeros(len(lngs), dtype=bool)
+    for polygon in polygons:
+        mask |= polygon.contains(lngs, lats)
+    return mask
+
+
+def candidate_points(index, bbox):
+    """从网格索引中取出外包矩形内的候选点，返回 (ids, lngs, lats) 数组"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    candidates = [
+        (pk, lat, lng) for pk, lat, lng in index.query_bbox(min_lng, min_lat, max_lng, max_lat)
+        if min_lng <= lng <= max_lng and min_lat <= lat <= max_lat
+    ]
+    if not candidates:
+        empty = np.empty(0, dtype=np.float64)
+        return np.empty(0, dtype=np.int64), empty, empty
+    ids, lats, lngs = zip(*candidates)
+    return (
+        np.asarray(ids, dtype=np.int64),
+        np.asarray(lngs, dtype=np.float64),
+        np.asarray(lats, dtype=np.float64),
+    )
+
+
+def spots_within(index, polygons):
+    """返回落在多边形内的景点 (ids, lngs, lats)，按id升序"""
+    ids, lngs, lats = candidate_points(index, geometry_bbox(polygons))
+    mask = contains_points(polygons, lngs, lats)
+    ids, lngs, lats = ids[mask], lngs[mask], lats[mask]
+    order = np.argsort(ids)
+    return ids[order], lngs[order], lats[order]
+
+
+def district_counts(districts, lngs, lats):
+    """统计各区县内的点数，按数量降序，只返回数量大于0的区县"""
+    counts = []
+    for name, polygons in districts:
+        count = int(np.count_nonzero(contains_points(polygons, lngs, lats)))
+        if count:
+            counts.append({'name': name, 'count': count})
+    counts.sort(key=lambda row: (-row['count'], row['name']))
+    return counts
+
+
+# 区县边界 [(名称, [Polygon, ...]), ...]，首次使用时加载
+_districts = None
+_districts_lock = threading.Lock()
+
+
+def load_districts(path):
+    """从 GeoJSON FeatureCollection 加载区县边界，名称取 properties.name"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    districts = []
+    for feature in data.get('features', []):
+        name = (feature.get('properties') or {}).get('name')
+        if not name or not feature.get('geometry'):
+            continue
+        try:
+            districts.append((name, parse_geometry(feature['geometry'])))
+        except ValueError as e:
+            logger.warning(f"跳过无效的区县边界 {name}: {e}")
+    return districts
+
+
+def get_districts():
+    """获取区县边界，文件不存在时返回空列表"""
+    global _districts
+    if _districts is None:
+        with _districts_lock:
+            if _districts is None:
+                path = getattr(settings, 'DISTRICT_BOUNDARIES_FILE', None)
+                try:
+                    _districts = load_districts(path) if path else []
+                    logger.info(f"区县边界加载完成，共 {len(_districts)} 个区县")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"加载区县边界失败: {e}")
+                    _districts = []
+    return _districts
+
+
+def get_district(name):
+    """按名称查找区县边界，返回 Polygon 列表，找不到时返回 None"""
+    for district_name, polygons in get_districts():
+        if district_name == name:
+            return polygons
+    return None
@@ -0,0 +1,255 @@
+"""
+行程顺序优化（旅行商问题的启发式求解）
+
+先用 NumPy 一次算出所有地点两两之间的球面距离矩阵，再用最近邻法构造初始路线，
+之后交替执行 2-opt（翻转一段路线）和 Or-opt（把1~3个连续地点移到别处）改进，
+直到没有可改进的移动或用完时间预算。每一步对所有候选位置的增益做向量化计算，
+几百个地点也能在一秒内完成。
+
+路线表示为节点序列 [起点, 地点..., 终点]：
+- 起点为出发位置；未提供出发位置时是一个到所有地点距离都为0的虚拟节点，即从任意地点出发
+- 需要返回起点时终点就是起点，否则终点是一个到所有地点距离都为0的虚拟节点
+
+多日行程先用均衡 k-means 把地点按地理位置分组（每天一组，每组数量有上限），再对每组分别排序。
+"""
+import time
+
+import numpy as np
+
+from .geo import haversine, to_planar
+
+# 默认时间预算（秒）
+DEFAULT_TIME_BUDGET = 0.3
+# Or-opt 移动的最大连续地点数
+OR_OPT_MAX_SEGMENT = 3
+# 增益小于该值（米）视为没有改进，避免浮点误差导致死循环
+EPSILON = 1e-6
+
+
+def distance_matrix(lats, lngs):
+    """计算所有点两两之间的球面距离（米），返回 (n, n) 矩阵"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    return haversine(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+
+
+def _route_length(dist, route):
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def nearest_neighbour(dist, start, end, nodes):
+    """最近邻法：从起点出发，每次前往最近的未访问地点，返回节点序列"""
+    route = [start]
+    unvisited = np.zeros(len(dist), dtype=bool)
+    unvisited[nodes] = True
+    current = start
+    for _ in range(len(nodes)):
+        candidates = np.where(unvisited, dist[current], np.inf)
+        current = int(np.argmin(candidates))
+        unvisited[current] = False
+        route.append(current)
+    route.append(end)
+    return np.array(route, dtype=np.int64)
+
+
+def two_opt_pass(dist, route, deadline):
+    """
+    对每个位置 i 找到使路线最短的翻转区间 [i, j]，有改进立即应用
+    返回是否有改进
+    """
+    improved = False
+    n = len(route) - 1  # 可移动的节点位于 1..n-1
+    for i in range(1, n - 1):
+        a, b = route[i - 1], route[i]
+        tail = route[i + 1:n]          # 候选的 j 处节点
+        after = route[i + 2:n + 1]     # j+1 处节点
+        # 翻转 route[i..j]：边 (a,b) 和 (c,d) 换成 (a,c) 和 (b,d)
+        gains = dist[a, b] + dist[tail, after] - dist[a, tail] - dist[b, after]
+        k = int(np.argmax(gains))
+        if gains[k] > EPSILON:
+            j = i + 1 + k
+            route[i:j + 1] = route[i:j + 1][::-1].copy()
+            improved = True
+        if time.perf_counter() > deadline:
+            break
+    return improved
+
+
+def or_opt_pass(dist, route, deadline):
+    """
+    把长度为 1~OR_OPT_MAX_SEGMENT 的连续地点（可反向）移动到增益最大的位置，有改进立即应用
+    返回是否有改进
+    """
+    improved = False
+    for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+        i = 1
+        while i + length < len(route):
+            j = i + length - 1
+            prev, first, last, nxt = route[i - 1], route[i], route[j], route[j + 1]
+            removal = dist[prev, first] + dist[last, nxt] - dist[prev, nxt]
+
+            # 移除该段后剩余路线中每条边 (u, v) 都是候选插入位置
+            rest = np.concatenate([route[:i], route[j + 1:]])
+            u, v = rest[:-1], rest[1:]
+            forward = dist[u, first] + dist[last, v] - dist[u, v]
+            backward = dist[u, last] + dist[first, v] - dist[u, v]
+            # 插回原位置没有意义
+            forward[i - 1] = backward[i - 1] = np.inf
+            k_forward, k_backward = int(np.argmin(forward)), int(np.argmin(backward))
+            if forward[k_forward] <= backward[k_backward]:
+                k, cost, segment = k_forward, forward[k_forward], route[i:j + 1]
+            else:
+                k, cost, segment = k_backward, backward[k_backward], route[i:j + 1][::-1]
+
+            if removal - cost > EPSILON:
+                route[:] = np.concatenate([rest[:k + 1], segment, rest[k + 1:]])
+                improved = True
+            else:
+                i += 1
+            if time.perf_counter() > deadline:
+                return improved
+    return improved
+
+
+def optimize_order(lats, lngs, start=None, return_to_start=False, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    计算访问各地点的顺序
+    参数:
+    - lats, lngs: 地点坐标
+    - start: 出发位置 (lat, lng)，为 None 时从任意地点出发
+    - return_to_start: 是否返回出发位置（需要提供 start）
+    - time_budget: 改进阶段的时间预算（秒）
+    返回 (order, legs, initial_length)：
+    order 为地点下标的访问顺序，legs 为路线上每一段的距离（米，含返回起点的一段），
+    initial_length 为最近邻初始路线的长度
+    """
+    deadline = time.perf_counter() + time_budget
+    count = len(lats)
+    if count == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), 0.0
+
+    # 节点 0..count-1 为地点，count 为起点，count+1 为开放路线的虚拟终点
+    node_lats = np.append(np.asarray(lats, dtype=np.float64), start[0] if start else 0.0)
+    node_lngs = np.append(np.asarray(lngs, dtype=np.float64), start[1] if start else 0.0)
+    dist = np.zeros((count + 2, count + 2))
+    dist[:count + 1, :count + 1] = distance_matrix(node_lats, node_lngs)
+    origin = count
+    if not start:
+        # 虚拟起点到所有地点距离为0
+        dist[origin, :] = dist[:, origin] = 0.0
+    end = origin if start and return_to_start else count + 1
+
+    route = nearest_neighbour(dist, origin, end, np.arange(count))
+    initial_length = _route_length(dist, route)
+    if count > 2:
+        while time.perf_counter() < deadline:
+            improved = two_opt_pass(dist, route, deadline)
+            improved = or_opt_pass(dist, route, deadline) or improved
+            if not improved:
+                break
+
+    legs = dist[route[:-1], route[1:]]
+    if not start:
+        # 去掉虚拟起点出发的一段
+        legs = legs[1:]
+    if end != origin:
+        # 去掉到虚拟终点的一段
+        legs = legs[:-1]
+    return route[1:-1].copy(), legs, initial_length
+
+
+# 多日行程分组：均衡 k-means 的迭代次数和随机重启次数
+PARTITION_ITERATIONS = 50
+PARTITION_RESTARTS = 5
+
+
+def _initial_centers(points, k, rng):
+    """k-means++ 初始化：后续中心按到已选中心距离的平方加权抽取"""
+    centers = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        sq = ((points[:, None, :] - np.array(centers)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = sq.sum()
+        index = rng.choice(len(points), p=sq / total) if total > 0 else rng.integers(len(points))
+        centers.append(points[index])
+    return np.array(centers)
+
+
+def _balanced_assign(sq, capacity):
+    """
+    带容量限制的分配：按“最近中心与次近中心的距离差”从大到小依次分配，
+    差值大的点最先选择，避免被挤到很远的组
+    """
+    n, k = sq.shape
+    labels = np.full(n, -1, dtype=np.int64)
+    remaining = np.full(k, capacity, dtype=np.int64)
+    ranked = np.argsort(sq, axis=1)
+    nearest = np.take_along_axis(sq, ranked[:, :2], axis=1)
+    regret = nearest[:, 1] - nearest[:, 0]
+    for i in np.argsort(-regret, kind='stable'):
+        for center in ranked[i]:
+            if remaining[center]:
+                labels[i] = center
+                remaining[center] -= 1
+                break
+    return labels
+
+
+def partition_days(lats, lngs, days, capacity, seed=0):
+    """
+    把地点分成 days 组，每组不超过 capacity 个，组内地点尽量集中（均衡 k-means）
+    返回每个地点的组号数组
+    """
+    count = len(lats)
+    days = min(days, count)
+    if days <= 1:
+        return np.zeros(count, dtype=np.int64)
+    points = to_planar(lats, lngs)
+    rng = np.random.default_rng(seed)
+
+    best_labels, best_cost = None, np.inf
+    for _ in range(PARTITION_RESTARTS):
+        centers = _initial_centers(points, days, rng)
+        labels = None
+        for _ in range(PARTITION_ITERATIONS):
+            sq = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+            new_labels = _balanced_assign(sq, capacity)
+            if labels is not None and (new_labels == labels).all():
+                break
+            labels = new_labels
+            # 没有分到地点的组保留原中心
+            centers = np.array([
+                points[labels == day].mean(axis=0) if (labels == day).any() else centers[day]
+                for day in range(days)
+            ])
+        cost = ((points - centers[labels]) ** 2).sum()
+        if cost < best_cost:
+            best_labels, best_cost = labels, cost
+    return best_labels
+
+
+def plan_days(lats, lngs, days, start=None, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    多日行程：把地点按地理位置均衡地分成 days 组，每组按最短顺序排列，
+    各组也按最短顺序排列（从出发位置附近的一组开始）
+    返回 [(组内地点下标顺序, 每段距离), ...]
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if not len(lats):
+        return []
+    capacity = -(-len(lats) // days)
+    labels = partition_days(lats, lngs, days, capacity)
+    groups = [np.flatnonzero(labels == day) for day in range(labels.max() + 1)]
+    groups = [group for group in groups if len(group)]
+
+    # 各组中心也排成最短顺序，相邻两天的区域相邻
+    centers_lat = np.array([lats[group].mean() for group in groups])
+    centers_lng = np.array([lngs[group].mean() for group in groups])
+    day_order, _, _ = optimize_order(centers_lat, centers_lng, start=start, time_budget=time_budget / 4)
+
+    plan = []
+    for day in day_order.tolist():
+        group = groups[day]
+        order, legs, _ = optimize_order(lats[group], lngs[group], time_budget=time_budget / 2 / len(groups))
+        plan.append((group[order], legs))
+    return plan
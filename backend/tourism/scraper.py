@@ -10,6 +10,9 @@ from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 from tourism.models import ScenicSpot
+from tourism.geo import haversine
+from tourism.enrichment import enrich_spots
+from tourism.pinyin import fill_pinyin_bulk
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -224,26 +227,13 @@ class SimpleSpotScraper:
     def is_similar_spot(self, spot1, spot2, name_threshold=0.6, distance_threshold=0.5):
         """判断两个景点是否相似"""
         from difflib import SequenceMatcher
-        from math import radians, sin, cos, sqrt, atan2
         
         # 计算名称相似度
         name_similarity = SequenceMatcher(None, spot1[1], spot2[1]).ratio()
         
-        # 计算地理距离（km）
-        def haversine_distance(lat1, lon1, lat2, lon2):
-            R = 6371  # 地球半径（km）
-            
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            return R * c
-        
         # 如果有经纬度信息，计算距离
         if all([spot1[6], spot1[7], spot2[6], spot2[7]]):
-            distance = haversine_distance(spot1[7], spot1[6], spot2[7], spot2[6])
+            distance = haversine(spot1[7], spot1[6], spot2[7], spot2[6]) / 1000  # km
             # 如果名称相似度高且距离近，认为是相似景点
             return name_similarity > name_threshold and distance < distance_threshold
         
@@ -357,43 +347,41 @@ class SimpleSpotScraper:
                     continue
     
                 new_spots = 0  # 记录本页新增的景点数
+                # 跳过本次已处理的景点（同一景点可能出现在多页中）
+                page_attractions = []
                 for attr in attractions:
+                    if attr[0] in processed_ids:
+                        logger.info(f"景点ID {attr[0]} 已处理，跳过")
+                        continue
+                    processed_ids.add(attr[0])
+                    page_attractions.append(attr)
+
+                # 一次查询取出本页已存在的景点，再批量计算本页所有景点名称的拼音
+                existing_spots = ScenicSpot.objects.in_bulk([attr[0] for attr in page_attractions])
+                spots = []
+                for attr in page_attractions:
+                    spot = existing_spots.get(attr[0])
+                    if spot is None:
+                        spot = ScenicSpot(id=attr[0], images=[attr[2]] if attr[2] else [])
+                    elif attr[2]:  # 如果有图片URL
+                        spot.images = [attr[2]]
+                    for key, value in zip(['name', 'address', 'ticket_price', 'category', 'longitude', 'latitude', 'description'], [attr[1], attr[3], attr[4], attr[5], attr[6], attr[7], attr[8]]):
+                        setattr(spot, key, value)
+                    spots.append(spot)
+                fill_pinyin_bulk(spots)
+
+                for spot in spots:
                     try:
-                        spot_id = attr[0]
-                        if spot_id in processed_ids:  # 检查是否已处理
-                            logger.info(f"景点ID {spot_id} 已处理，跳过")
-                            continue
-    
-                        # 添加到已处理集合
-                        processed_ids.add(spot_id)
-    
-                        # 检查是否已存在
-                        existing_spot = ScenicSpot.objects.filter(id=spot_id).first()
-    
-                        if existing_spot:
+                        if spot.id in existing_spots:
                             # 更新现有记录
-                            for key, value in zip(['name', 'address', 'ticket_price', 'category', 'longitude', 'latitude', 'description'], [attr[1], attr[3], attr[4], attr[5], attr[6], attr[7], attr[8]]):
-                                setattr(existing_spot, key, value)
-                            if attr[2]:  # 如果有图片URL
-                                existing_spot.images = [attr[2]]
-                            existing_spot.save()
-                            logger.info(f"更新景点: {attr[1]}")
+                            spot.save()
+                            logger.info(f"更新景点: {spot.name}")
                         else:
                             # 创建新记录
-                            ScenicSpot.objects.create(
-                                id=spot_id,
-                                name=attr[1],
-                                images=[attr[2]] if attr[2] else [],
-                                address=attr[3],
-                                ticket_price=attr[4],
-                                category=attr[5],
-                                longitude=attr[6],
-                                latitude=attr[7],
-                                description=attr[8]
-                            )
+                            spot.save(force_insert=True)
                             new_spots += 1
                             total_spots += 1
-                            logger.info(f"新增景点: {attr[1]}")
+                            logger.info(f"新增景点: {spot.name}")
                     except Exception as e:
                         logger.error(f"保存景点失败: {e}")
                         continue
@@ -409,6 +397,12 @@ class SimpleSpotScraper:
         finally:
             logger.info(f"爬虫结束，共获取 {total_spots} 个景点")
 
+        # 景点新增或坐标变化后重新计算周边设施
+        try:
+            enrich_spots()
+        except Exception as e:
+            logger.error(f"计算景点周边设施失败: {e}")
+
 def update_scenic_spots(page_count=3):
     """更新景点数据的主函数"""
     logger.info("开始更新景点数据")
@@ -0,0 +1,255 @@
+"""
+景点全文搜索
+
+中文没有空格分词，这里把连续的汉字切分为单字和二元组（bigram），英文/数字按单词切分，
+对景点的名称、描述、地址和分类建立倒排索引，按相关度排序返回结果：
+- PostgreSQL：分词结果保存在 search_document 字段，使用 to_tsvector('simple') 表达式上的 GIN 索引
+- 其他数据库（如 SQLite）：使用进程内的倒排索引，由信号增量维护；数据库只按命中的景点id过滤，
+  相关度排序和翻页在 Python 中完成（见 rank_ids），只读取当前页的景点
+拼音/首字母查询另外对预先计算的 name_pinyin、name_initials 字段做前缀匹配（见 pinyin.py）。
+"""
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from rest_framework import filters
+
+from .pinyin import normalize_pinyin_query
+
+# 汉字（含扩展A区）与英文数字
+CJK_RUN = re.compile(r'[㐀-䶿一-鿿]+')
+WORD = re.compile(r'[a-z0-9]+')
+
+# 各字段的权重
+FIELD_WEIGHTS = (
+    ('name', 3.0),
+    ('category', 2.0),
+    ('address', 1.5),
+    ('description', 1.0),
+)
+
+
+def tokenize(text):
+    """把文本切分为用于建立索引的词：汉字单字 + 二元组，英文数字按单词"""
+    if not text:
+        return []
+    text = text.lower()
+    tokens = []
+    for run in CJK_RUN.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(WORD.findall(text))
+    return tokens
+
+
+def query_tokens(query):
+    """
+    把搜索词切分为查询词：长度不小于2的汉字串只用二元组（更精确），单个汉字用单字
+    """
+    if not query:
+        return []
+    query = query.lower()
+    tokens = []
+    for run in CJK_RUN.findall(query):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(WORD.findall(query))
+    # 去重并保持顺序
+    return list(dict.fromkeys(tokens))
+
+
+def build_document(spot):
+    """生成景点的分词文本，保存到 search_document 字段"""
+    tokens = []
+    for field, _ in FIELD_WEIGHTS:
+        tokens.extend(tokenize(getattr(spot, field, '')))
+    return ' '.join(tokens)
+
+
+class InvertedIndex:
+    """进程内倒排索引：词 -> {景点id: 加权词频}"""
+
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._documents = {}  # 景点id -> 该景点的词集合，用于删除
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._documents)
+
+    @staticmethod
+    def _weighted_terms(spot):
+        terms = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(getattr(spot, field, '')):
+                terms[token] += weight
+        return terms
+
+    def build(self, spots):
+        postings = defaultdict(dict)
+        documents = {}
+        for spot in spots:
+            terms = self._weighted_terms(spot)
+            for token, weight in terms.items():
+                postings[token][spot.id] = weight
+            documents[spot.id] = set(terms)
+        with self._lock:
+            self._postings = postings
+            self._documents = documents
+            self.loaded = True
+
+    def add(self, spot):
+        with self._lock:
+            self.remove(spot.id)
+            terms = self._weighted_terms(spot)
+            for token, weight in terms.items():
+                self._postings[token][spot.id] = weight
+            self._documents[spot.id] = set(terms)
+
+    def remove(self, spot_id):
+        with self._lock:
+            for token in self._documents.pop(spot_id, ()):
+                posting = self._postings.get(token)
+                if posting is not None:
+                    posting.pop(spot_id, None)
+                    if not posting:
+                        del self._postings[token]
+
+    def search(self, query, limit=None):
+        """返回按相关度降序排列的 [(景点id, 得分), ...]，要求命中全部查询词；limit 为 None 时返回全部"""
+        tokens = query_tokens(query)
+        if not tokens:
+            return []
+        with self._lock:
+            postings = [self._postings.get(token) for token in tokens]
+            if not all(postings):
+                return []
+            total = max(len(self._documents), 1)
+            # 从最短的倒排表开始求交集
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting.keys()
+                if not candidates:
+                    return []
+            scores = dict.fromkeys(candidates, 0.0)
+            for posting in postings:
+                idf = math.log(1 + total / len(posting))
+                for spot_id in candidates:
+                    scores[spot_id] += posting[spot_id] * idf
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked if limit is None else ranked[:limit]
+
+
+# 景点倒排索引（进程级单例，仅在非PostgreSQL数据库上使用）
+search_index = InvertedIndex()
+
+
+def get_search_index():
+    if not search_index.loaded:
+        with search_index._lock:
+            if not search_index.loaded:
+                from .models import ScenicSpot
+                search_index.build(
+                    ScenicSpot.objects.only('id', 'name', 'category', 'address', 'description').iterator()
+                )
+    return search_index
+
+
+def uses_postgres_search():
+    return connection.vendor == 'postgresql'
+
+
+def pinyin_filter(query):
+    """拼音/首字母查询对应的前缀匹配条件，不是拼音查询时返回 None"""
+    pinyin = normalize_pinyin_query(query)
+    if not pinyin:
+        return None
+    return Q(name_pinyin__startswith=pinyin) | Q(name_initials__startswith=pinyin)
+
+
+def _boost(condition):
+    return Case(When(condition, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+
+
+def search_queryset(queryset, query):
+    """
+    按搜索词过滤查询集
+    PostgreSQL 上结果按相关度降序排列（带 search_rank 注解）；
+    其他数据库只做过滤，相关度排序由 rank_ids 在 Python 中完成
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        # 没有可索引的字符（例如只有标点）时退回名称子串匹配
+        return queryset.filter(name__icontains=query.strip()).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    pinyin_match = pinyin_filter(query)
+
+    if uses_postgres_search():
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        # 与迁移中创建的 GIN 表达式索引保持一致
+        vector = SearchVector('search_document', config='simple')
+        search = SearchQuery(' & '.join(tokens), config='simple', search_type='raw')
+        matched = Q(search_vector=search)
+        rank = SearchRank(vector, search) + _boost(Q(name__icontains=query.strip()))
+        if pinyin_match is not None:
+            matched |= pinyin_match
+            rank = rank + _boost(pinyin_match)
+        return queryset.alias(search_vector=vector).annotate(
+            search_rank=rank
+        ).filter(matched).order_by('-search_rank', 'id')
+
+    # 不截断命中结果，否则后面的页和总数都不完整
+    matched_ids = [spot_id for spot_id, _ in get_search_index().search(query)]
+    if not matched_ids and pinyin_match is None:
+        return queryset.none()
+    matched = Q(id__in=matched_ids)
+    if pinyin_match is not None:
+        matched |= pinyin_match
+    return queryset.filter(matched)
+
+
+def rank_ids(queryset, query):
+    """
+    非PostgreSQL数据库上按相关度排序 search_queryset 过滤后的查询集，返回 [(景点id, 得分), ...]
+    数据库只返回满足过滤条件的景点id（及是否匹配拼音），得分取自进程内索引，
+    调用方按需切片后再读取对应的景点
+    """
+    scores = dict(get_search_index().search(query))
+    pinyin_match = pinyin_filter(query) if query_tokens(query) else None
+    queryset = queryset.order_by()
+    if pinyin_match is None:
+        rows = ((spot_id, 0.0) for spot_id in queryset.values_list('id', flat=True))
+    else:
+        rows = queryset.values_list('id', _boost(pinyin_match))
+    ranked = [(spot_id, scores.get(spot_id, 0.0) + boost) for spot_id, boost in rows]
+    ranked.sort(key=lambda item: (-item[1], item[0]))
+    return ranked
+
+
+class SpotSearchFilter(filters.SearchFilter):
+    """使用全文索引的搜索过滤，结果按相关度排序"""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_queryset(queryset, query)
+
+
+class SpotOrderingFilter(filters.OrderingFilter):
+    """有搜索词且未显式指定排序时保留相关度排序"""
+
+    def get_ordering(self, request, queryset, view):
+        if (request.query_params.get(filters.SearchFilter.search_param, '').strip()
+                and not request.query_params.get(self.ordering_param)):
+            return None
+        return super().get_ordering(request, queryset, view)
@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import ScenicSpot
+from .models import POI, ScenicSpot
+from .geo import distance_map, format_distance, parse_point
+from .favorites import get_favorite_ids
+from .enrichment import FACILITIES, facility_fields
 from django.contrib.auth.models import User
 
 class ScenicSpotSerializer(serializers.ModelSerializer):
@@ -8,62 +11,88 @@ class ScenicSpotSerializer(serializers.ModelSerializer):
     """
     # 添加额外字段
     distance = serializers.SerializerMethodField(read_only=True, required=False)
+    distance_meters = serializers.SerializerMethodField(read_only=True, required=False)
     is_favorited = serializers.SerializerMethodField(read_only=True)
+    nearby_facilities = serializers.SerializerMethodField(read_only=True)
     
     class Meta:
         model = ScenicSpot
         fields = ('id', 'name', 'longitude', 'latitude', 'description', 'category', 
                  'address', 'opening_hours', 'ticket_price', 'images', 'distance',
-                 'created_at', 'updated_at', 'is_favorited')
+                 'distance_meters', 'created_at', 'updated_at', 'favorite_count', 'is_favorited',
+                 'nearby_facilities')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 只输出请求的字段（稀疏字段集），由视图通过上下文中的 fields 传入
+        fields = self.context.get('fields')
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
                  
-    def get_distance(self, obj):
+    def _distance_of(self, obj):
         """
-        如果请求中包含用户位置，计算到景点的距离
+        如果请求中包含用户位置，返回到景点的距离（米）
+        距离由视图批量计算后通过上下文中的 distances 传入
         """
-        request = self.context.get('request')
-        if not request:
-            return None
-            
-        lat = request.query_params.get('lat')
-        lng = request.query_params.get('lng')
-        
-        if not lat or not lng:
+        distances = self.context.get('distances')
+        if distances is None:
+            # 未预先计算时（例如在视图之外使用序列化器）单独计算
+            request = self.context.get('request')
+            point = parse_point(request.query_params) if request else None
+            if not point:
+                return None
+            distances = distance_map([obj], *point)
+        return distances.get(obj.id)
+
+    def get_distance(self, obj):
+        """返回格式化后的距离文本"""
+        distance = self._distance_of(obj)
+        if distance is None:
             return None
-            
-        try:
-            from math import radians, sin, cos, sqrt, atan2
-            
-            # 将经纬度转换为弧度
-            lat1, lon1 = radians(float(lat)), radians(float(lng))
-            lat2, lon2 = radians(obj.latitude), radians(obj.longitude)
-            
-            # 地球半径（米）
-            R = 6371000
-            
-            # 使用Haversine公式计算距离
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            distance = R * c
-            
-            # 根据距离返回不同格式
-            if distance < 1000:
-                return f"{int(distance)}米"
-            else:
-                return f"{distance/1000:.1f}公里"
-        except Exception:
+        return format_distance(distance)
+
+    def get_distance_meters(self, obj):
+        """返回距离数值（米），便于前端排序"""
+        distance = self._distance_of(obj)
+        if distance is None:
             return None
+        return round(distance, 1)
 
     def get_is_favorited(self, obj):
         """
         检查当前用户是否已收藏该景点
+        收藏id集合由视图通过上下文中的 favorite_ids 传入，未传入时加载一次并保存在上下文中
         """
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.favorited_by.filter(id=request.user.id).exists()
-        return False
+        if not request or not request.user.is_authenticated:
+            return False
+        favorite_ids = self.context.get('favorite_ids')
+        if favorite_ids is None:
+            favorite_ids = self.context['favorite_ids'] = get_favorite_ids(request.user)
+        return obj.id in favorite_ids
+
+    def get_nearby_facilities(self, obj):
+        """
+        最近的地铁站、停车场、餐饮及 500 米/1 公里内的数量（冗余字段，见 enrichment.py）
+        尚未计算时返回 None
+        """
+        if obj.facilities_updated_at is None:
+            return None
+        facilities = {}
+        for kind in FACILITIES:
+            poi_field, name_field, distance_field, count_500, count_1000 = facility_fields(kind)
+            poi_id = getattr(obj, poi_field)
+            facilities[kind] = {
+                'nearest': {
+                    'id': poi_id,
+                    'name': getattr(obj, name_field),
+                    'distance': getattr(obj, distance_field),
+                } if poi_id is not None else None,
+                'count_500': getattr(obj, count_500),
+                'count_1000': getattr(obj, count_1000),
+            }
+        return facilities
             
     def validate(self, data):
         """
@@ -85,6 +114,15 @@ class ScenicSpotSerializer(serializers.ModelSerializer):
             
         return data
 
+# 周边设施序列化器
+class POISerializer(serializers.ModelSerializer):
+    """周边设施序列化器"""
+
+    class Meta:
+        model = POI
+        fields = ('id', 'layer', 'name', 'longitude', 'latitude', 'address', 'poi_type',
+                  'phone', 'opening_hours', 'rating')
+
 # 用户注册序列化器
 class UserRegisterSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import POI, ScenicSpot
+from .spatial_index import apply_spot_change
+from .snapshots import VERSION_KEY, bump_data_version, get_data_version
+from .search import build_document, search_index
+from .pinyin import fill_pinyin
+from .favorites import invalidate_favorite_ids, refresh_favorite_counts
+from .suggest import apply_suggest_change, suggest_index
+from .pois import POI_VERSION_KEY
+from .density import SPOTS_LAYER, apply_change
+
+
+# 景点保存前生成搜索分词和名称拼音
+@receiver(pre_save, sender=ScenicSpot)
+def update_search_document(sender, instance, **kwargs):
+    instance.search_document = build_document(instance)
+    fill_pinyin(instance)
+
+
+# 景点保存后递增数据版本（聚合索引和GeoJSON快照随之失效），并同步更新空间索引、搜索索引、补全索引和密度网格
+@receiver(post_save, sender=ScenicSpot)
+def update_spot_index(sender, instance, **kwargs):
+    if search_index.loaded:
+        search_index.add(instance)
+    previous = get_data_version()
+    current = bump_data_version()
+    point = (instance.latitude, instance.longitude)
+    apply_spot_change(previous, current, instance.id, point)
+    apply_suggest_change(previous, current, instance.id, instance)
+    apply_change(VERSION_KEY, previous, current, SPOTS_LAYER, instance.id, point)
+
+
+# 景点删除后递增数据版本（聚合索引和GeoJSON快照随之失效），并从空间索引、搜索索引、补全索引和密度网格中移除
+@receiver(post_delete, sender=ScenicSpot)
+def remove_from_spot_index(sender, instance, **kwargs):
+    if search_index.loaded:
+        search_index.remove(instance.id)
+    previous = get_data_version()
+    current = bump_data_version()
+    apply_spot_change(previous, current, instance.id)
+    apply_suggest_change(previous, current, instance.id)
+    apply_change(VERSION_KEY, previous, current, SPOTS_LAYER, instance.id)
+
+
+# 收藏变化后删除相关用户的收藏id缓存，重新统计相关景点的收藏人数并更新补全索引中的热度
+@receiver(m2m_changed, sender=ScenicSpot.favorited_by.through)
+def update_favorites(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # 清空前记下受影响的用户或景点
+        related = instance.favorite_spots if reverse else instance.favorited_by
+        instance._cleared_favorite_ids = set(related.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_favorite_ids', set())
+
+    if reverse:
+        user_ids, spot_ids = [instance.pk], list(pk_set)
+    else:
+        user_ids, spot_ids = list(pk_set), [instance.pk]
+    invalidate_favorite_ids(*user_ids)
+    if not spot_ids:
+        return
+    refresh_favorite_counts(spot_ids)
+    if suggest_index.loaded:
+        counts = ScenicSpot.objects.filter(pk__in=spot_ids).values_list('pk', 'favorite_count')
+        for spot_id, favorite_count in counts:
+            suggest_index.set_weight(spot_id, favorite_count)
+
+
+# 周边设施变化后递增POI数据版本，各进程的图层索引和GeoJSON快照随之失效，本进程的密度网格增量更新
+@receiver(post_save, sender=POI)
+@receiver(post_delete, sender=POI)
+def bump_poi_version(sender, instance, signal, **kwargs):
+    previous = get_data_version(POI_VERSION_KEY)
+    point = (instance.latitude, instance.longitude) if signal is post_save else None
+    apply_change(POI_VERSION_KEY, previous, bump_data_version(POI_VERSION_KEY), instance.layer, instance.id, point)
+
+
+@contextmanager
+def poi_signals_muted():
+    """
+    批量导入POI时暂时断开上面的POI信号，由调用方在导入完成后统一递增数据版本
+    没有信号接收者时 QuerySet.delete() 直接执行一条 DELETE，不再逐行读取和发送信号
+    """
+    post_save.disconnect(bump_poi_version, sender=POI)
+    post_delete.disconnect(bump_poi_version, sender=POI)
+    try:
+        yield
+    finally:
+        post_save.connect(bump_poi_version, sender=POI)
+        post_delete.connect(bump_poi_version, sender=POI)
@@ -0,0 +1,162 @@
+"""
+GeoJSON 快照缓存
+
+景点数据只在爬虫更新或后台编辑时变化，因此按“数据版本 + 查询参数”缓存序列化后的字节，
+并预先压缩为 gzip 和 brotli 两种格式。请求时直接返回缓存内容：
+- 带 ETag，If-None-Match 命中时返回 304
+- 按 Accept-Encoding 选择已压缩的版本，不再重复压缩
+
+数据版本保存在数据库（DataVersion 表）中，由 ScenicSpot/POI 的保存/删除信号或导入命令递增，
+各工作进程和管理命令看到同一版本；读取时在 Django 缓存中保留几秒，避免每个请求都查询数据库。
+其他进程写入后，本进程最迟 VERSION_CACHE_TIMEOUT 秒后看到新版本。
+"""
+import gzip
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只提供 gzip
+    brotli = None
+
+VERSION_KEY = 'tourism:spot_data_version'
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+# 数据版本在本进程缓存中保留的秒数
+VERSION_CACHE_TIMEOUT = 5
+
+
+def _stored_version(key):
+    """读取数据库中的版本，首次使用时以当前时间初始化，保证不会与旧快照的版本重复"""
+    from .models import DataVersion
+
+    stored, _ = DataVersion.objects.get_or_create(key=key, defaults={'version': time.time_ns()})
+    return stored.version
+
+
+def get_data_version(key=VERSION_KEY):
+    """当前数据版本，默认为景点数据版本"""
+    version = cache.get(key)
+    if version is None:
+        version = _stored_version(key)
+        cache.set(key, version, VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def aget_data_version(key=VERSION_KEY):
+    """get_data_version 的异步版本"""
+    version = await cache.aget(key)
+    if version is None:
+        version = await sync_to_async(get_data_version)(key)
+    return version
+
+
+def bump_data_version(key=VERSION_KEY):
+    """数据变化后在数据库中递增版本，使所有进程的旧快照和内存索引失效，返回新版本"""
+    from .models import DataVersion
+
+    with transaction.atomic():
+        if not DataVersion.objects.filter(key=key).update(version=F('version') + 1):
+            # 首次使用：新建的版本本身就与所有旧版本不同
+            _stored_version(key)
+        version = DataVersion.objects.values_list('version', flat=True).get(key=key)
+    cache.set(key, version, VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def build_snapshot(payload):
+    """序列化并预压缩，返回快照字典"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {
+        # 各压缩版本内容语义相同，使用弱 ETag
+        'etag': 'W/"%s"' % hashlib.md5(body).hexdigest(),
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=6),
+        # brotli 默认的最高压缩级别耗时数百毫秒，级别5的压缩率已接近且快得多
+        'br': brotli.compress(body, quality=5) if brotli else None,
+    }
+
+
+def _snapshot_key(name, version, params):
+    digest = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f'tourism:snapshot:{name}:{version}:{digest}'
+
+
+def get_snapshot(name, params, builder, version_key=VERSION_KEY):
+    """
+    读取快照，不存在时调用 builder() 生成数据并缓存
+    params 为影响结果的查询参数，会被规范化后参与缓存键；version_key 为快照所依赖数据的版本键
+    """
+    key = _snapshot_key(name, get_data_version(version_key), params)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(builder())
+        cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+async def aget_snapshot(name, params, builder):
+    """get_snapshot 的异步版本，builder 为返回数据的协程函数"""
+    key = _snapshot_key(name, await aget_data_version(), params)
+    snapshot = await cache.aget(key)
+    if snapshot is None:
+        snapshot = build_snapshot(await builder())
+        await cache.aset(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def accepted_encodings(request):
+    """解析 Accept-Encoding，返回客户端可接受的编码集合"""
+    encodings = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if name and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            encodings.add(name.lower())
+    return encodings
+
+
+def _opaque_tag(etag):
+    etag = etag.strip()
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(request, etag):
+    """
+    请求的 If-None-Match 是否与 etag 匹配（客户端缓存仍然有效）
+    If-None-Match 使用弱比较，忽略 W/ 前缀（代理可能改写为强 ETag）
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if if_none_match.strip() == '*':
+        return True
+    return _opaque_tag(etag) in [_opaque_tag(tag) for tag in if_none_match.split(',')]
+
+
+def snapshot_response(request, snapshot, content_type='application/json'):
+    """根据条件请求头和可接受编码返回快照"""
+    etag = snapshot['etag']
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    encodings = accepted_encodings(request)
+    if snapshot['br'] is not None and 'br' in encodings:
+        response = HttpResponse(snapshot['br'], content_type=content_type)
+        response['Content-Encoding'] = 'br'
+    elif 'gzip' in encodings:
+        response = HttpResponse(snapshot['gzip'], content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(snapshot['identity'], content_type=content_type)
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,228 @@
+"""
+景点空间索引
+
+按固定经纬度网格把景点分桶，查询附近景点时只检查与搜索圆相交的网格，
+避免每次请求都全表扫描。索引在首次查询时构建，本进程内的修改通过 ScenicSpot 的
+post_save/post_delete 信号增量维护（见 signals.py）。
+
+注意：索引保存在进程内存中，每个工作进程各自维护一份。其他进程（其他 worker、后台、爬虫或管理命令）
+写入后数据版本会变化，本进程在下次查询时发现版本不一致并重建索引。
+"""
+import logging
+import threading
+from collections import defaultdict
+from math import cos, radians, floor
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .geo import EARTH_RADIUS, haversine
+from .snapshots import get_data_version
+
+logger = logging.getLogger('tourism_spatial_index')
+
+# 每度纬度对应的距离（米）
+METERS_PER_DEGREE = 111320.0
+# 默认网格大小（度），约1.1公里
+DEFAULT_CELL_SIZE = 0.01
+
+
+class SpatialGridIndex:
+    """均匀经纬度网格索引，保存 id -> (纬度, 经度)"""
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = defaultdict(dict)  # (行, 列) -> {id: (lat, lng)}
+        self._points = {}  # id -> (lat, lng, (行, 列))
+        self._lock = threading.RLock()
+        self.loaded = False
+        # 每次数据变化递增，供依赖索引的缓存判断是否过期
+        self.version = 0
+        # 构建或最近一次增量更新时对应的数据版本（见 snapshots.get_data_version）
+        self.data_version = None
+        # KD树按需构建，数据变化后在下次查询时重建
+        self._kdtree = None
+        self._kdtree_ids = None
+        self._kdtree_version = -1
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell_of(self, lat, lng):
+        return (floor(lat / self.cell_size), floor(lng / self.cell_size))
+
+    def build(self, rows, data_version=None):
+        """用 (id, lat, lng) 序列重建整个索引"""
+        cells = defaultdict(dict)
+        points = {}
+        for pk, lat, lng in rows:
+            if lat is None or lng is None:
+                continue
+            cell = self._cell_of(lat, lng)
+            cells[cell][pk] = (lat, lng)
+            points[pk] = (lat, lng, cell)
+        with self._lock:
+            self._cells = cells
+            self._points = points
+            self.loaded = True
+            self.version += 1
+            self.data_version = data_version
+
+    def insert(self, pk, lat, lng):
+        """新增或更新一个点"""
+        with self._lock:
+            self._discard(pk)
+            if lat is None or lng is None:
+                self.version += 1
+                return
+            cell = self._cell_of(lat, lng)
+            self._cells[cell][pk] = (lat, lng)
+            self._points[pk] = (lat, lng, cell)
+            self.version += 1
+
+    def remove(self, pk):
+        """删除一个点"""
+        with self._lock:
+            if self._discard(pk):
+                self.version += 1
+
+    def _discard(self, pk):
+        old = self._points.pop(pk, None)
+        if old is None:
+            return False
+        bucket = self._cells.get(old[2])
+        if bucket is not None:
+            bucket.pop(pk, None)
+            if not bucket:
+                del self._cells[old[2]]
+        return True
+
+    def query_radius(self, lat, lng, radius):
+        """
+        返回与搜索圆（半径单位：米）相交的网格中的候选点 [(id, lat, lng), ...]
+        候选点仍需调用方做精确距离判断
+        """
+        dlat = radius / METERS_PER_DEGREE
+        # 靠近极点时经度跨度趋于无穷，限制在整个经度范围内
+        lng_scale = max(cos(radians(lat)), 1e-6)
+        dlng = min(radius / (METERS_PER_DEGREE * lng_scale), 360.0)
+        return self.query_bbox(lng - dlng, lat - dlat, lng + dlng, lat + dlat)
+
+    def within_radius(self, lat, lng, radius):
+        """
+        返回搜索圆内的点及其距离 (ids, distances)，均为 NumPy 数组
+        """
+        candidates = self.query_radius(lat, lng, radius)
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        ids, lats, lngs = (np.asarray(column) for column in zip(*candidates))
+        distances = haversine(lat, lng, lats, lngs)
+        mask = distances <= radius
+        return ids[mask], distances[mask]
+
+    def _get_kdtree(self):
+        """返回与当前数据版本一致的KD树及对应的id数组"""
+        with self._lock:
+            if self._kdtree_version != self.version:
+                if self._points:
+                    ids, lats, lngs = (
+                        np.fromiter(column, dtype=dtype, count=len(self._points))
+                        for column, dtype in (
+                            (self._points.keys(), np.int64),
+                            ((p[0] for p in self._points.values()), np.float64),
+                            ((p[1] for p in self._points.values()), np.float64),
+                        )
+                    )
+                    self._kdtree = cKDTree(to_unit_vectors(lats, lngs))
+                else:
+                    ids = np.empty(0, dtype=np.int64)
+                    self._kdtree = None
+                self._kdtree_ids = ids
+                self._kdtree_version = self.version
+            return self._kdtree, self._kdtree_ids
+
+    def nearest(self, lat, lng, k):
+        """
+        返回距离最近的k个点 (ids, distances)，按距离升序排列
+        KD树建立在单位球面的三维坐标上，弦长与球面距离单调一致
+        """
+        tree, ids = self._get_kdtree()
+        if tree is None or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        k = min(k, len(ids))
+        chords, positions = tree.query(to_unit_vectors(lat, lng), k=k)
+        chords = np.atleast_1d(chords)
+        positions = np.atleast_1d(positions)
+        distances = 2 * EARTH_RADIUS * np.arcsin(np.clip(chords / 2, 0.0, 1.0))
+        return ids[positions], distances
+
+    def query_bbox(self, min_lng, min_lat, max_lng, max_lat):
+        """返回与矩形范围相交的网格中的候选点"""
+        row_min, col_min = self._cell_of(min_lat, min_lng)
+        row_max, col_max = self._cell_of(max_lat, max_lng)
+        candidates = []
+        with self._lock:
+            span = (row_max - row_min + 1) * (col_max - col_min + 1)
+            if span > len(self._cells):
+                # 搜索范围覆盖的网格比已占用网格还多时，直接遍历已占用网格
+                cells = [
+                    bucket for (row, col), bucket in self._cells.items()
+                    if row_min <= row <= row_max and col_min <= col <= col_max
+                ]
+            else:
+                cells = []
+                for row in range(row_min, row_max + 1):
+                    for col in range(col_min, col_max + 1):
+                        bucket = self._cells.get((row, col))
+                        if bucket:
+                            cells.append(bucket)
+            for bucket in cells:
+                candidates.extend((pk, lat, lng) for pk, (lat, lng) in bucket.items())
+        return candidates
+
+
+def to_unit_vectors(lats, lngs):
+    """把经纬度转换为单位球面上的三维坐标"""
+    lats = np.radians(lats)
+    lngs = np.radians(lngs)
+    cos_lats = np.cos(lats)
+    return np.stack([cos_lats * np.cos(lngs), cos_lats * np.sin(lngs), np.sin(lats)], axis=-1)
+
+
+# 景点索引（进程级单例）
+spot_index = SpatialGridIndex()
+
+
+def load_spot_index(version=None):
+    """从数据库加载全部景点坐标构建索引"""
+    from .models import ScenicSpot
+
+    version = version or get_data_version()
+    rows = ScenicSpot.objects.values_list('id', 'latitude', 'longitude')
+    spot_index.build(rows.iterator(), version)
+    logger.info(f"景点空间索引构建完成，共 {len(spot_index)} 个景点")
+
+
+def get_spot_index():
+    """获取景点索引，首次查询或数据版本变化后（重新）构建"""
+    version = get_data_version()
+    if spot_index.data_version != version:
+        with spot_index._lock:
+            if spot_index.data_version != version:
+                load_spot_index(version)
+    return spot_index
+
+
+def apply_spot_change(previous, current, pk, point=None):
+    """
+    景点保存/删除后增量更新本进程已构建的索引（由信号调用），point 为 None 表示删除
+    索引不是基于 previous 版本构建的，或版本不是连续递增（期间有其他改动）时不做增量更新，下次查询时全量重建
+    """
+    with spot_index._lock:
+        if spot_index.data_version != previous or current != previous + 1:
+            return
+        if point is None:
+            spot_index.remove(pk)
+        else:
+            spot_index.insert(pk, *point)
+        spot_index.data_version = current
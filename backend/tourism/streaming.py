@@ -0,0 +1,83 @@
+"""
+流式输出 GeoJSON
+
+逐批读取数据库行并逐段写出要素，不在内存中构建完整的要素列表，
+无论数据量多大，内存占用都保持平稳。
+"""
+import json
+
+from django.http import StreamingHttpResponse
+
+# 每次从数据库读取的行数
+CHUNK_SIZE = 2000
+# 累积多少个要素后写出一段
+FEATURES_PER_WRITE = 500
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def iter_feature_collection(rows, to_feature):
+    """
+    把数据库行迭代器转换为 GeoJSON FeatureCollection 文本片段
+    rows: 数据库行迭代器（通常来自 values_list().iterator()）
+    to_feature: 把一行转换为 GeoJSON 要素字典的函数
+    """
+    yield '{"type":"FeatureCollection","features":['
+    buffer = []
+    first = True
+    for row in rows:
+        buffer.append(_dumps(to_feature(row)))
+        if len(buffer) >= FEATURES_PER_WRITE:
+            yield ('' if first else ',') + ','.join(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield ('' if first else ',') + ','.join(buffer)
+    yield ']}'
+
+
+async def aiter_rows(queryset, fields):
+    """
+    异步逐批读取 fields 对应的行（元组）
+    Django 4.2.0 中 values_list().aiterator() 会在事件循环线程中执行查询而报错，这里改用 values()
+    """
+    async for row in queryset.values(*fields).aiterator(chunk_size=CHUNK_SIZE):
+        yield tuple(row[field] for field in fields)
+
+
+async def aiter_feature_collection(rows, to_feature):
+    """iter_feature_collection 的异步版本，rows 为异步迭代器"""
+    yield '{"type":"FeatureCollection","features":['
+    buffer = []
+    first = True
+    async for row in rows:
+        buffer.append(_dumps(to_feature(row)))
+        if len(buffer) >= FEATURES_PER_WRITE:
+            yield ('' if first else ',') + ','.join(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield ('' if first else ',') + ','.join(buffer)
+    yield ']}'
+
+
+def streaming_geojson_response(queryset, fields, to_feature):
+    """以流式响应返回查询集中的要素，fields 为 values_list 读取的字段"""
+    rows = queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+    return StreamingHttpResponse(
+        (chunk.encode('utf-8') for chunk in iter_feature_collection(rows, to_feature)),
+        content_type='application/json'
+    )
+
+
+def astreaming_geojson_response(queryset, fields, to_feature):
+    """streaming_geojson_response 的异步版本，使用 aiterator() 逐批读取（用于异步视图）"""
+    rows = aiter_rows(queryset, fields)
+
+    async def chunks():
+        async for chunk in aiter_feature_collection(rows, to_feature):
+            yield chunk.encode('utf-8')
+
+    return StreamingHttpResponse(chunks(), content_type='application/json')
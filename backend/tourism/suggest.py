@@ -0,0 +1,197 @@
+"""
+景点名称/地址自动补全
+
+在内存中对景点名称、地址以及名称的拼音和首字母建立前缀树，每个节点保存其子树中热度最高的若干景点，
+查询时沿前缀走到对应节点即可直接得到结果，不访问数据库。
+热度取收藏人数（favorite_count）。本进程内的修改由信号增量维护；其他进程写入后数据版本变化，
+下次查询时重建前缀树。
+"""
+import threading
+
+from .pinyin import normalize_pinyin_query
+from .snapshots import get_data_version
+
+# 每个节点保存的候选数量
+TOP_K = 10
+# 只对前若干个字符建立节点，控制内存占用；更长的查询在最深节点的候选中再过滤
+MAX_PREFIX = 12
+
+
+class TrieNode:
+    __slots__ = ('children', 'entries', 'top')
+
+    def __init__(self):
+        self.children = {}
+        # 以该节点结尾（或被截断到该节点）的键：景点id -> 热度
+        self.entries = {}
+        # 子树中热度最高的 TOP_K 个 (热度, 景点id)，按热度降序
+        self.top = []
+
+
+def _merge_top(candidates):
+    """合并候选 (热度, id)，同一景点只保留一次，返回前 TOP_K 个"""
+    best = {}
+    for weight, spot_id in candidates:
+        if weight > best.get(spot_id, float('-inf')):
+            best[spot_id] = weight
+    return sorted(((w, i) for i, w in best.items()), key=lambda item: (-item[0], item[1]))[:TOP_K]
+
+
+class SuggestIndex:
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.spots = {}  # 景点id -> (名称, 地址, 热度, 键列表)
+        self._lock = threading.RLock()
+        self.loaded = False
+        # 构建或最近一次增量更新时对应的数据版本
+        self.data_version = None
+
+    def __len__(self):
+        return len(self.spots)
+
+    @staticmethod
+    def normalize(text):
+        return (text or '').strip().lower()
+
+    def _keys_of(self, name, address, aliases):
+        keys = {self.normalize(name), self.normalize(address)}
+        keys.update(self.normalize(alias) for alias in aliases)
+        return [key for key in keys if key]
+
+    def _insert_key(self, key, spot_id, weight):
+        node = self.root
+        path = [node]
+        for char in key[:MAX_PREFIX]:
+            node = node.children.setdefault(char, TrieNode())
+            path.append(node)
+        node.entries[spot_id] = weight
+        for node in path:
+            node.top = _merge_top(node.top + [(weight, spot_id)])
+
+    def _remove_key(self, key, spot_id):
+        node = self.root
+        path = [node]
+        for char in key[:MAX_PREFIX]:
+            node = node.children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        node.entries.pop(spot_id, None)
+        # 自底向上重新计算受影响节点的候选，并删除空节点
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[depth]
+            candidates = [(w, i) for i, w in node.entries.items()]
+            for child in node.children.values():
+                candidates.extend(child.top)
+            node.top = _merge_top(candidates)
+            if depth and not node.top:
+                del path[depth - 1].children[key[depth - 1]]
+
+    def _insert(self, spot_id, name, address, weight, keys):
+        for key in keys:
+            self._insert_key(key, spot_id, weight)
+        self.spots[spot_id] = (name, address, weight, keys)
+
+    def add(self, spot_id, name, address, weight=None, aliases=()):
+        """
+        新增或更新景点；weight 为 None 时沿用已有热度
+        aliases: 名称的其他写法（拼音、首字母），同样参与前缀匹配
+        """
+        with self._lock:
+            old = self.spots.get(spot_id)
+            if weight is None:
+                weight = old[2] if old else 0
+            self.remove(spot_id)
+            self._insert(spot_id, name, address, weight, self._keys_of(name, address, aliases))
+
+    def set_weight(self, spot_id, weight):
+        """更新景点热度"""
+        with self._lock:
+            old = self.spots.get(spot_id)
+            if old is not None and old[2] != weight:
+                self.remove(spot_id)
+                self._insert(spot_id, old[0], old[1], weight, old[3])
+
+    def remove(self, spot_id):
+        with self._lock:
+            old = self.spots.pop(spot_id, None)
+            if old is None:
+                return
+            for key in old[3]:
+                self._remove_key(key, spot_id)
+
+    def build(self, rows, data_version=None):
+        """用 (id, 名称, 地址, 热度, 拼音, 首字母) 序列重建前缀树"""
+        with self._lock:
+            self.root = TrieNode()
+            self.spots = {}
+            for spot_id, name, address, weight, *aliases in rows:
+                self.add(spot_id, name, address, weight, aliases)
+            self.loaded = True
+            self.data_version = data_version
+
+    def _lookup(self, query):
+        """返回某个键以 query 开头的候选 (热度, id)"""
+        node = self.root
+        for char in query[:MAX_PREFIX]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if len(query) <= MAX_PREFIX:
+            return node.top
+        # 超出建树深度的部分需要再核对完整前缀
+        return [
+            (weight, spot_id) for weight, spot_id in node.top
+            if any(key.startswith(query) for key in self.spots[spot_id][3])
+        ]
+
+    def suggest(self, query, limit=TOP_K):
+        """返回名称、地址、拼音或首字母以 query 开头的景点，按热度降序"""
+        query = self.normalize(query)
+        if not query:
+            return []
+        # 原样匹配名称和地址（如 "chunxi rd"、"no. 1"）；像拼音的查询再按去掉空格和隔音符的形式匹配（如 "kuan zhai"）
+        queries = {query, normalize_pinyin_query(query)} - {''}
+        with self._lock:
+            candidates = []
+            for prefix in queries:
+                candidates.extend(self._lookup(prefix))
+            results = []
+            for _, spot_id in _merge_top(candidates)[:limit]:
+                name, address, _, _ = self.spots[spot_id]
+                results.append({'id': spot_id, 'name': name, 'address': address})
+            return results
+
+
+# 景点补全索引（进程级单例）
+suggest_index = SuggestIndex()
+
+
+def get_suggest_index():
+    """获取补全索引，首次查询或数据版本变化后（重新）构建"""
+    version = get_data_version()
+    if suggest_index.data_version != version:
+        with suggest_index._lock:
+            if suggest_index.data_version != version:
+                from .models import ScenicSpot
+                rows = ScenicSpot.objects.values_list(
+                    'id', 'name', 'address', 'favorite_count', 'name_pinyin', 'name_initials'
+                )
+                suggest_index.build(rows.iterator(), version)
+    return suggest_index
+
+
+def apply_suggest_change(previous, current, spot_id, spot=None):
+    """
+    景点保存/删除后增量更新本进程已构建的前缀树（由信号调用），spot 为 None 表示删除
+    前缀树不是基于 previous 版本构建的，或版本不是连续递增（期间有其他改动）时不做增量更新，下次查询时全量重建
+    """
+    with suggest_index._lock:
+        if suggest_index.data_version != previous or current != previous + 1:
+            return
+        if spot is None:
+            suggest_index.remove(spot_id)
+        else:
+            suggest_index.add(spot.id, spot.name, spot.address, aliases=(spot.name_pinyin, spot.name_initials))
+        suggest_index.data_version = current
@@ -1,3 +1,1227 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import brotli
+import mapbox_vector_tile
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .clustering import MAX_FEATURES, MAX_ZOOM, ClusterIndex
+from .datasets import CURRENT, build_cache, cache_is_fresh, cache_path, current_cache_dir, load_columns, read_pois
+from .density import get_density
+from .enrichment import enrich_spots
+from .favorites import get_favorite_ids, toggle_favorite
+from .geo import EARTH_RADIUS, distance_map, format_distance, haversine, to_planar
+from .models import POI, ScenicSpot
+from .pinyin import name_initials, name_pinyin, normalize_pinyin_query
+from .pois import POI_VERSION_KEY
+from .search import get_search_index, query_tokens, search_index, tokenize
+from .snapshots import bump_data_version, get_data_version
+from .spatial_index import SpatialGridIndex, get_spot_index, load_spot_index, spot_index
+from .streaming import FEATURES_PER_WRITE, iter_feature_collection
+from .suggest import MAX_PREFIX, TOP_K, SuggestIndex, get_suggest_index, suggest_index
+from .transit import TransitGraph, reachable_spots
+
+
+class ScenicSpotQueryCountTests(TestCase):
+    """已登录用户请求景点列表时，查询次数不随景点数量增长"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('tester', 'tester@example.com', 'password')
+        spots = [
+            ScenicSpot.objects.create(
+                name=f'景点{i}', latitude=30.6 + i * 0.001, longitude=104.0 + i * 0.001,
+                category='其他', address=f'成都市{i}号'
+            )
+            for i in range(30)
+        ]
+        for spot in spots[::3]:
+            spot.favorited_by.add(self.user)
+        load_spot_index()
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertQueriesConstant(self, url, params, page_sizes, expected):
+        for page_size in page_sizes:
+            cache.clear()
+            get_spot_index()
+            # 会话 + 用户 + 收藏id集合 + 景点
+            with self.assertNumQueries(expected):
+                response = self.client.get(url, {**params, 'page_size': page_size})
+            self.assertEqual(response.status_code, 200)
+
+    def test_list(self):
+        self.assertQueriesConstant('/api/tourism/scenic_spots/', {'cursor': ''}, (5, 25), 4)
+        # 页码分页多一次计数查询
+        self.assertQueriesConstant('/api/tourism/scenic_spots/', {}, (5, 25), 5)
+
+    def test_nearby(self):
+        params = {'lat': 30.6, 'lng': 104.0, 'radius': 10000}
+        self.assertQueriesConstant('/api/tourism/scenic_spots/nearby/', params, (5, 25), 4)
+
+    def test_favorites(self):
+        cache.clear()
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/tourism/scenic_spots/favorites/')
+        self.assertEqual(len(response.json()), 10)
+        self.assertTrue(all(spot['is_favorited'] for spot in response.json()))
+
+    def test_toggle_favorite_invalidates_cache(self):
+        spot = ScenicSpot.objects.exclude(favorited_by=self.user).first()
+        url = f'/api/tourism/scenic_spots/{spot.id}/is_favorited/'
+        self.assertFalse(self.client.get(url).json()['is_favorited'])
+        self.client.post(f'/api/tourism/scenic_spots/{spot.id}/toggle_favorite/')
+        self.assertTrue(self.client.get(url).json()['is_favorited'])
+
+
+class WithinPolygonTests(TestCase):
+    """多边形范围查询与数据库范围过滤结果一致，内环中的景点被排除"""
+
+    def setUp(self):
+        for i in range(10):
+            for j in range(10):
+                ScenicSpot.objects.create(
+                    name=f'景点{i}-{j}', latitude=30.6 + i * 0.01, longitude=104.0 + j * 0.01,
+                    category='其他', address='成都市'
+                )
+        load_spot_index()
+
+    def test_polygon_with_hole(self):
+        geometry = {'type': 'Polygon', 'coordinates': [
+            [[103.995, 30.595], [104.045, 30.595], [104.045, 30.645], [103.995, 30.645]],
+            [[104.015, 30.615], [104.025, 30.615], [104.025, 30.625], [104.015, 30.625], [104.015, 30.615]],
+        ]}
+        response = self.client.post('/api/tourism/scenic_spots/within/', {
+            'geometry': geometry, 'properties': ['name']
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        # 5×5 个景点减去内环中的 1 个
+        self.assertEqual(response.json()['count'], 24)
+        names = {feature['properties']['name'] for feature in response.json()['features']}
+        self.assertNotIn('景点2-2', names)
+
+    def test_invalid_geometry(self):
+        response = self.client.post('/api/tourism/scenic_spots/within/', {
+            'geometry': {'type': 'Point', 'coordinates': [104.0, 30.6]}
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RouteOptimizeTests(TestCase):
+    """优化后的访问顺序不比最近邻初始路线更长，并且覆盖全部景点"""
+
+    def test_optimize(self):
+        # 沿一条直线打乱顺序的景点，最优顺序即按经度排列
+        ids = [
+            ScenicSpot.objects.create(
+                name=f'景点{i}', latitude=30.6, longitude=104.0 + i * 0.01,
+                category='其他', address='成都市'
+            ).id
+            for i in (3, 0, 5, 1, 4, 2)
+        ]
+        response = self.client.post('/api/tourism/routes/optimize/?fields=id,longitude', {
+            'spot_ids': ids, 'start': {'lat': 30.6, 'lng': 103.99}
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        longitudes = [spot['longitude'] for spot in data['spots']]
+        self.assertEqual(longitudes, sorted(longitudes))
+        self.assertLessEqual(data['total_distance'], data['initial_distance'])
+        self.assertEqual(len(data['legs']), len(ids))
+
+    def test_itinerary_groups_nearby_spots(self):
+        # 两片相距较远的区域，每片3个景点，两天的行程各自只包含一片区域
+        for i in range(3):
+            for lat, lng in ((30.99, 103.60), (30.66, 104.07)):
+                ScenicSpot.objects.create(
+                    name=f'景点{lat}-{i}', latitude=lat + i * 0.005, longitude=lng,
+                    category='其他', address='成都市'
+                )
+        response = self.client.post('/api/tourism/scenic_spots/itinerary/', {
+            'days': 2, 'per_day': 3, 'budget': 'high'
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        days = response.json()['days']
+        self.assertEqual([len(day['spots']) for day in days], [3, 3])
+        for day in days:
+            self.assertEqual(len({round(spot['latitude'], 1) for spot in day['spots']}), 1)
+            self.assertLess(day['total_distance'], 2000)
+
+
+class TransitReachabilityTests(TestCase):
+    """远处的景点只有乘地铁才能在时间预算内到达"""
+
+    def test_reachable_by_metro(self):
+        near = ScenicSpot.objects.create(name='近处', latitude=30.6545, longitude=104.08, category='其他', address='成都市')
+        far = ScenicSpot.objects.create(name='远处', latitude=30.7345, longitude=104.08, category='其他', address='成都市')
+        load_spot_index()
+        # 一条南北向地铁线，两站相距约9公里
+        graph = TransitGraph.build([
+            ('A站', 'metro', 30.6535, 104.08, ['1号线']),
+            ('B站', 'metro', 30.7335, 104.08, ['1号线']),
+        ])
+        spot_ids, seconds, via = reachable_spots(graph, spot_index, 30.6535, 104.0805, 30 * 60)
+        self.assertEqual(spot_ids.tolist(), [near.id, far.id])
+        self.assertEqual(via.tolist(), [-1, 1])
+        spot_ids, _, _ = reachable_spots(graph, spot_index, 30.6535, 104.0805, 10 * 60)
+        self.assertEqual(spot_ids.tolist(), [near.id])
+
+
+class POILayerTests(TestCase):
+    """POI 图层按视野范围查询，导入或编辑后结果随数据版本更新"""
+
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            POI.objects.create(layer='hotpot', name=f'火锅{i}', latitude=30.6 + i * 0.01, longitude=104.0)
+        POI.objects.create(layer='hotels', name='酒店', latitude=30.6, longitude=104.0)
+
+    def test_bbox_and_layer(self):
+        response = self.client.get('/api/tourism/pois/', {'layer': 'hotpot', 'bbox': '103.9,30.595,104.1,30.625'})
+        self.assertEqual(response.status_code, 200)
+        names = [feature['properties']['name'] for feature in response.json()['features']]
+        self.assertEqual(names, ['火锅0', '火锅1', '火锅2'])
+
+    def test_limit_and_invalidation(self):
+        data = self.client.get('/api/tourism/pois/', {'layer': 'hotpot', 'limit': 2}).json()
+        self.assertTrue(data['truncated'])
+        self.assertEqual(len(data['features']), 2)
+        POI.objects.filter(layer='hotpot').first().delete()
+        data = self.client.get('/api/tourism/pois/', {'layer': 'hotpot', 'bbox': '103.9,30.5,104.1,30.7'}).json()
+        self.assertEqual(len(data['features']), 4)
+
+    def test_stream_with_bbox_and_limit(self):
+        params = {'layer': 'hotpot,hotels', 'bbox': '103.9,30.595,104.1,30.625', 'stream': 1}
+        response = self.client.get('/api/tourism/pois/', params)
+        names = [feature['properties']['name'] for feature in json.loads(b''.join(response.streaming_content))['features']]
+        self.assertEqual(names, ['火锅0', '火锅1', '火锅2', '酒店'])
+        response = self.client.get('/api/tourism/pois/', {**params, 'limit': 2})
+        names = [feature['properties']['name'] for feature in json.loads(b''.join(response.streaming_content))['features']]
+        self.assertEqual(names, ['火锅0', '火锅1'])
+
+
+class POICacheTests(TestCase):
+    """xlsx 转换为列式缓存，源文件变化后重新转换"""
+
+    def setUp(self):
+        from openpyxl import Workbook
+
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.settings_override = override_settings(POI_DATA_DIR=self.tmp, POI_CACHE_DIR=os.path.join(self.tmp, 'cache'))
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['名称', '地址', '经度_GCJ02', '纬度_GCJ02', '电话', '类型', '营业时间', '评分'])
+        sheet.append(['春熙路', '2号线;3号线', 104.08, 30.65, '[]', '地铁站', '', None])
+        sheet.append(['缺坐标', '', None, None, '', '', '', ''])
+        sheet.append(['天府广场', '1号线', 104.06, 30.66, '', '地铁站', '', 4.5])
+        self.path = os.path.join(self.tmp, 'metro_stations.xlsx')
+        workbook.save(self.path)
+
+    def test_columns_and_rebuild(self):
+        columns = load_columns('metro_stations')
+        self.assertIsInstance(columns['longitude'], np.memmap)
+        self.assertEqual(columns['longitude'].tolist(), [104.08, 104.06])
+        pois = read_pois('metro_stations')
+        self.assertEqual([poi['name'] for poi in pois], ['春熙路', '天府广场'])
+        self.assertEqual(pois[0]['phone'], '')
+        self.assertEqual([poi['rating'] for poi in pois], [None, 4.5])
+
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertFalse(cache_is_fresh('metro_stations'))
+        load_columns('metro_stations')
+        self.assertTrue(cache_is_fresh('metro_stations'))
+
+    def test_rebuild_publishes_new_version(self):
+        columns = load_columns('metro_stations')
+        first = current_cache_dir('metro_stations')
+        build_cache('metro_stations')
+        second = current_cache_dir('metro_stations')
+        self.assertNotEqual(first, second)
+        # 只保留指针和当前版本目录，已打开的旧内存映射仍可读取
+        self.assertEqual(sorted(os.listdir(cache_path('metro_stations'))), sorted([CURRENT, second.name]))
+        self.assertEqual(columns['latitude'].tolist(), [30.65, 30.66])
+
+        # 转换中途失败时不发布，指针仍指向原版本
+        with mock.patch('tourism.datasets.json.dump', side_effect=OSError('磁盘已满')):
+            with self.assertRaises(OSError):
+                build_cache('metro_stations')
+        self.assertEqual(current_cache_dir('metro_stations'), second)
+        self.assertEqual(sorted(os.listdir(cache_path('metro_stations'))), sorted([CURRENT, second.name]))
+        self.assertEqual(load_columns('metro_stations')['name'], ['春熙路', '天府广场'])
+
+    def test_reload_bumps_version_once(self):
+        call_command('load_pois', 'metro_stations', stdout=StringIO())
+        before = get_data_version(POI_VERSION_KEY)
+        call_command('load_pois', 'metro_stations', stdout=StringIO())
+        # 旧数据删除时不逐行触发信号，整个导入只递增一次版本
+        self.assertEqual(get_data_version(POI_VERSION_KEY), before + 1)
+        self.assertEqual(POI.objects.filter(layer='metro_stations').count(), 2)
+        # 服务进程有自己的缓存，也能从数据库读到新版本；导入结束后POI信号恢复
+        cache.clear()
+        self.assertEqual(get_data_version(POI_VERSION_KEY), before + 1)
+        POI.objects.create(layer='hotpot', name='火锅', latitude=30.6, longitude=104.0)
+        self.assertEqual(get_data_version(POI_VERSION_KEY), before + 2)
+
+
+class SpotEnrichmentTests(TestCase):
+    """景点与周边设施的空间连接结果保存在冗余字段中，列表接口直接返回"""
+
+    def setUp(self):
+        self.spot = ScenicSpot.objects.create(name='景点', latitude=30.6, longitude=104.0, category='其他')
+        # 纬度 0.001 度约 111 米
+        POI.objects.create(layer='metro_stations', name='近站', latitude=30.603, longitude=104.0)
+        POI.objects.create(layer='metro_stations', name='远站', latitude=30.608, longitude=104.0)
+        POI.objects.create(layer='hotpot', name='火锅', latitude=30.6, longitude=104.002)
+        POI.objects.create(layer='snacks', name='小吃', latitude=30.5995, longitude=104.0)
+        POI.objects.create(layer='hotels', name='酒店', latitude=30.6, longitude=104.0)
+
+    def test_enrich(self):
+        self.assertEqual(enrich_spots(), 1)
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.nearest_metro_name, '近站')
+        self.assertAlmostEqual(self.spot.nearest_metro_distance, 333.6, delta=1)
+        self.assertEqual((self.spot.metro_count_500, self.spot.metro_count_1000), (1, 2))
+        self.assertEqual(self.spot.nearest_food_name, '小吃')
+        self.assertEqual(self.spot.food_count_500, 2)
+        self.assertIsNone(self.spot.nearest_parking_poi)
+
+        cache.clear()
+        response = self.client.get('/api/tourism/scenic_spots/', {'fields': 'name,nearby_facilities'})
+        facilities = response.json()['results'][0]['nearby_facilities']
+        self.assertEqual(facilities['metro']['nearest']['name'], '近站')
+        self.assertIsNone(facilities['parking']['nearest'])
+        self.assertEqual(facilities['food']['count_1000'], 2)
+
+
+class DensityTests(TestCase):
+    """六边形网格密度：按分辨率和范围聚合，景点变化后增量更新"""
+
+    def setUp(self):
+        cache.clear()
+        for i in range(10):
+            ScenicSpot.objects.create(name=f'景点{i}', latitude=30.6 + i * 0.0001, longitude=104.0, category='其他')
+        ScenicSpot.objects.create(name='远处', latitude=30.9, longitude=104.3, category='其他')
+
+    def test_density(self):
+        data = self.client.get('/api/tourism/density/', {'layer': 'spots', 'res': 0}).json()
+        self.assertEqual(data['total'], 11)
+        self.assertEqual(sorted(data['count']), [1, 10])
+        self.assertEqual({len(data['lng']), len(data['lat']), len(data['count'])}, {2})
+
+        data = self.client.get('/api/tourism/density/', {'layer': 'spots', 'res': 4, 'bbox': '103.9,30.5,104.1,30.7'}).json()
+        self.assertEqual(data['total'], 10)
+        self.assertEqual(self.client.get('/api/tourism/density/', {'layer': 'spots', 'res': 9}).status_code, 400)
+
+        density = get_density('spots')
+        spot = ScenicSpot.objects.get(name='远处')
+        spot.latitude, spot.longitude = 30.6, 104.0
+        spot.save()
+        # 本进程的保存已增量更新到最新版本，查询时不需要重建
+        self.assertEqual(density.version, get_data_version())
+        data = self.client.get('/api/tourism/density/', {'layer': 'spots', 'res': 0}).json()
+        self.assertEqual(data['count'], [11])
+
+
+class CoordinateParamTests(TestCase):
+    """坐标和范围参数中的 nan、inf 返回400，不进入查询"""
+
+    def test_non_finite(self):
+        for params in ({'lat': 'nan', 'lng': '104'}, {'lat': '30.6', 'lng': 'inf'}):
+            self.assertEqual(self.client.get('/api/tourism/scenic_spots/nearest/', params).status_code, 400)
+        response = self.client.get('/api/tourism/scenic_spots/geojson/', {'bbox': '103.9,nan,104.1,30.7'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/tourism/pois/', {'layer': 'hotpot', 'bbox': '-inf,30.5,104.1,30.7'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FavoriteToggleTests(TestCase):
+    """收藏切换：再次请求即取消，收藏人数与收藏表一致，补全索引热度取更新后的人数"""
+
+    def setUp(self):
+        self.spot = ScenicSpot.objects.create(name='收藏测试', latitude=30.6, longitude=104.0, category='其他')
+        self.users = [User.objects.create_user(f'user{i}', password='password') for i in range(2)]
+
+    def assertCountConsistent(self, expected):
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.favorite_count, expected)
+        self.assertEqual(self.spot.favorited_by.count(), expected)
+
+    def test_toggle(self):
+        self.client.force_login(self.users[0])
+        url = f'/api/tourism/scenic_spots/{self.spot.id}/toggle_favorite/'
+        self.assertEqual(self.client.post(url).json()['status'], 'favorited')
+        self.assertCountConsistent(1)
+        self.assertEqual(self.client.post(url).json()['status'], 'unfavorited')
+        self.assertCountConsistent(0)
+        self.assertEqual(self.client.post(url).json()['status'], 'favorited')
+        self.assertCountConsistent(1)
+
+    def test_suggest_weight_uses_updated_count(self):
+        index = get_suggest_index()
+        stale = ScenicSpot.objects.get(pk=self.spot.pk)
+        toggle_favorite(ScenicSpot.objects.get(pk=self.spot.pk), self.users[0])
+        # stale 中的 favorite_count 仍为 0
+        toggle_favorite(stale, self.users[1])
+        self.assertCountConsistent(2)
+        self.assertEqual(index.spots[self.spot.id][2], 2)
+
+    def test_concurrent_insert_still_syncs_caches(self):
+        cache.clear()
+        index = get_suggest_index()
+        user = self.users[0]
+        self.assertEqual(get_favorite_ids(user), frozenset())
+        # 并发请求在本次删除之后插入了同一条收藏记录并增加了收藏人数，本次插入因唯一约束失败
+        ScenicSpot.favorited_by.through.objects.create(scenicspot_id=self.spot.id, user_id=user.id)
+        ScenicSpot.objects.filter(pk=self.spot.pk).update(favorite_count=1)
+        with mock.patch('django.db.models.query.QuerySet.delete', return_value=(0, {})):
+            self.assertTrue(toggle_favorite(self.spot, user))
+        self.assertCountConsistent(1)
+        self.assertEqual(get_favorite_ids(user), frozenset([self.spot.id]))
+        self.assertEqual(index.spots[self.spot.id][2], 1)
+
+
+class SpotTileTests(TestCase):
+    """矢量瓦片：缓存命中时不查询数据库，景点变化后换用新版本"""
+
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.settings_override = override_settings(TILE_CACHE_DIR=self.tmp)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.spot = ScenicSpot.objects.create(name='瓦片', latitude=30.6, longitude=104.0, category='其他')
+        # 包含 (104.0, 30.6) 的 z10 瓦片
+        self.url = '/api/tourism/scenic_spots/tiles/10/807/420.mvt'
+
+    def test_cached_tile(self):
+        with self.assertNumQueries(1):
+            first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.content)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).content, first.content)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.spot.name = '瓦片2'
+        self.spot.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        # 写入新版本的瓦片时删除旧版本目录
+        self.assertEqual(os.listdir(os.path.join(self.tmp, 'scenic_spots')), [response['ETag'].strip('"')])
+
+    def test_seeded_tiles_shared_with_server(self):
+        call_command('seed_tiles', '--min-zoom', '10', '--max-zoom', '10', stdout=StringIO())
+        # 服务进程有自己的缓存，只能从数据库读到 seed_tiles 使用的数据版本
+        cache.clear()
+        with mock.patch('tourism.tiles.encode_tile') as encode_tile:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+        encode_tile.assert_not_called()
+
+    def test_poi_tile(self):
+        POI.objects.create(layer='hotpot', name='火锅', latitude=30.6, longitude=104.0, rating=4.5)
+        response = self.client.get('/api/tourism/pois/tiles/hotpot/10/807/420.mvt')
+        self.assertEqual(response.status_code, 200)
+        features = mapbox_vector_tile.decode(response.content)['hotpot']['features']
+        self.assertEqual([feature['properties']['name'] for feature in features], ['火锅'])
+        self.assertEqual(self.client.get('/api/tourism/pois/tiles/unknown/10/807/420.mvt').status_code, 404)
+
+
+class SpotSearchTests(TestCase):
+    """进程内倒排索引：分词、相关度排序、多词同时命中，以及删除后的索引更新"""
+
+    def setUp(self):
+        cache.clear()
+        # 先创建描述中提到文殊院的景点，按id排序与按相关度排序的结果不同
+        self.street = ScenicSpot.objects.create(name='宽窄巷子', category='历史文化', address='青羊区', description='附近有文殊院')
+        self.temple = ScenicSpot.objects.create(name='文殊院', category='宗教文化', address='青羊区', description='佛教寺院')
+        self.park = ScenicSpot.objects.create(name='人民公园', category='休闲度假', address='青羊区', description='')
+        search_index.build(ScenicSpot.objects.all())
+
+    def search(self, query, **params):
+        response = self.client.get('/api/tourism/scenic_spots/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('文殊院 IFS2'), ['文', '殊', '院', '文殊', '殊院', 'ifs2'])
+        # 查询时两个字以上的汉字串只用二元组
+        self.assertEqual(query_tokens('文殊院 文'), ['文殊', '殊院', '文'])
+        self.assertEqual(query_tokens('，。'), [])
+
+    def test_ranking_and_all_tokens(self):
+        # 名称命中的权重高于描述命中
+        self.assertEqual([spot['name'] for spot in self.search('文殊院')['results']], ['文殊院', '宽窄巷子'])
+        # 多个查询词必须全部命中
+        self.assertEqual([spot['name'] for spot in self.search('青羊 公园')['results']], ['人民公园'])
+        self.assertEqual(self.search('文殊 公园')['results'], [])
+        # 前端搜索使用的 GeoJSON 接口同样按相关度排序
+        response = self.client.get('/api/tourism/scenic_spots/geojson/', {'search': '文殊院', 'properties': 'name'})
+        self.assertEqual([feature['properties']['name'] for feature in response.json()['features']], ['文殊院', '宽窄巷子'])
+        cache.clear()
+        response = self.client.get('/api/tourism/async/scenic_spots/geojson/', {'search': '文殊院', 'properties': 'name'})
+        self.assertEqual([feature['properties']['name'] for feature in response.json()['features']], ['文殊院', '宽窄巷子'])
+
+    def test_delete_removes_from_index(self):
+        self.temple.delete()
+        self.assertEqual([spot_id for spot_id, _ in get_search_index().search('文殊院')], [self.street.id])
+        self.assertEqual([spot['name'] for spot in self.search('文殊院')['results']], ['宽窄巷子'])
+
+    def test_pages_past_thousand_matches(self):
+        ScenicSpot.objects.bulk_create([
+            ScenicSpot(name=f'公园{i}', category='其他', address='成都市') for i in range(1100)
+        ])
+        search_index.build(ScenicSpot.objects.all())
+        data = self.search('公园', page=12, page_size=100)
+        # 命中结果不截断，总数和最后一页完整
+        self.assertEqual(data['count'], 1101)
+        self.assertEqual(len(data['results']), 1)
+        with self.assertNumQueries(2):
+            # 按相关度排好的id只读取当前页的景点
+            self.search('公园', page=2, page_size=100, fields='id')
+
+
+class SpotKeysetPaginationTests(TestCase):
+    """按门票排序翻页时，重复值和空值都不会漏掉或重复；篡改的游标返回400"""
+
+    def setUp(self):
+        prices = [None, '10', '10', None, '0', '10', None, '5', '10']
+        self.prices = {
+            ScenicSpot.objects.create(
+                name=f'景点{i}', category='其他', ticket_price=None if price is None else Decimal(price)
+            ).id: price
+            for i, price in enumerate(prices)
+        }
+
+    def page_through(self, ordering):
+        ids = []
+        url = f'/api/tourism/scenic_spots/?ordering={ordering}&page_size=2&fields=id&cursor='
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [spot['id'] for spot in response.json()['results']]
+            url = response.json()['next']
+        return ids
+
+    def test_ticket_price_both_directions(self):
+        priced = sorted((Decimal(price), pk) for pk, price in self.prices.items() if price is not None)
+        nulls = sorted(pk for pk, price in self.prices.items() if price is None)
+        # 升序时空值在最后，降序时在最前，同价按id
+        ascending = [pk for _, pk in priced] + nulls
+        self.assertEqual(self.page_through('ticket_price'), ascending)
+        self.assertEqual(self.page_through('-ticket_price'), ascending[::-1])
+
+    def test_page_number_by_default(self):
+        response = self.client.get('/api/tourism/scenic_spots/', {'ordering': '-ticket_price', 'page_size': 2, 'fields': 'id'})
+        data = response.json()
+        self.assertEqual(list(data), ['count', 'next', 'previous', 'results'])
+        self.assertEqual(data['count'], len(self.prices))
+        self.assertIn('page=2', data['next'])
+        self.assertIsNone(data['previous'])
+        # 页码分页同样按 (排序字段, id) 排序
+        ids, url = [], '/api/tourism/scenic_spots/?ordering=-ticket_price&page_size=2&fields=id'
+        while url:
+            data = self.client.get(url).json()
+            ids += [spot['id'] for spot in data['results']]
+            url = data['next']
+        self.assertEqual(ids, self.page_through('-ticket_price'))
+
+    def test_tampered_cursor(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        cursors = ['不是游标', encode('{"a": 1}'), encode('["10"]'), encode('["abc", 1]'), encode('["NaN", 1]'),
+                   encode('["Infinity", 1]'), encode('["1234567", 1]'), encode('[10, 1]'),
+                   encode('["10", 1e400]'), encode('["10", 99999999999999999999999]'), encode('["10", "1"]')]
+        for ordering in ('ticket_price', '-ticket_price'):
+            for cursor in cursors:
+                response = self.client.get('/api/tourism/scenic_spots/', {'ordering': ordering, 'cursor': cursor})
+                self.assertEqual(response.status_code, 400, cursor)
+        response = self.client.get('/api/tourism/scenic_spots/', {
+            'ordering': 'favorite_count', 'cursor': encode('[99999999999999999999999, 1]')
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+class SnapshotResponseTests(TestCase):
+    """GeoJSON 快照：弱 ETag、条件请求、按 Accept-Encoding 选择压缩版本，景点保存后失效"""
+    url = '/api/tourism/scenic_spots/geojson/'
+
+    def setUp(self):
+        cache.clear()
+        self.spot = ScenicSpot.objects.create(name='武侯祠', latitude=30.64, longitude=104.04, category='历史文化')
+
+    def get(self, **headers):
+        return self.client.get(self.url, {'properties': 'name'}, **headers)
+
+    def names(self, response):
+        return [feature['properties']['name'] for feature in json.loads(response.content)['features']]
+
+    def test_encoding_negotiation(self):
+        cases = [
+            ('br, gzip', 'br'),
+            ('gzip;q=0, br', 'br'),
+            ('br;q=0, gzip', 'gzip'),
+            ('GZIP', 'gzip'),
+            ('identity', None),
+            ('', None),
+        ]
+        decoders = {'br': brotli.decompress, 'gzip': gzip.decompress, None: lambda body: body}
+        for accept, encoding in cases:
+            response = self.get(HTTP_ACCEPT_ENCODING=accept)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get('Content-Encoding'), encoding, accept)
+            self.assertIn('Accept-Encoding', response['Vary'])
+            body = json.loads(decoders[encoding](response.content))
+            self.assertEqual([feature['properties']['name'] for feature in body['features']], ['武侯祠'])
+
+    def test_conditional_request(self):
+        response = self.get()
+        etag = response['ETag']
+        # 各压缩版本共用一个弱 ETag
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='gzip')['ETag'], etag)
+
+        for if_none_match in (etag, f'"other", {etag}', etag[2:], '*'):
+            response = self.get(HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(response.status_code, 304, if_none_match)
+            self.assertEqual(response['ETag'], etag)
+            self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='W/"other"').status_code, 200)
+
+    def test_invalidated_after_save(self):
+        etag = self.get()['ETag']
+        self.spot.name = '武侯祠博物馆'
+        self.spot.save()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.names(response), ['武侯祠博物馆'])
+
+
+class SuggestIndexTests(TestCase):
+    """补全前缀树：插入、删除、热度更新、候选剪枝、截断深度，以及信号驱动的更新"""
+
+    def ids(self, index, query):
+        return [result['id'] for result in index.suggest(query)]
+
+    def test_insert_remove_reweight(self):
+        index = SuggestIndex()
+        index.add(1, '宽窄巷子', '青羊区', 5, aliases=('kuanzhaixiangzi', 'kzxz'))
+        index.add(2, '宽巷子', '青羊区', 8)
+        index.add(3, '锦里', '武侯区', 1)
+        self.assertEqual(self.ids(index, '宽'), [2, 1])
+        self.assertEqual(self.ids(index, 'kuan zhai'), [1])
+        self.assertEqual(self.ids(index, 'KZ'), [1])
+        # 地址同样参与前缀匹配
+        self.assertEqual(self.ids(index, '青羊'), [2, 1])
+
+        index.set_weight(1, 10)
+        self.assertEqual(self.ids(index, '宽'), [1, 2])
+
+        index.remove(2)
+        self.assertEqual(self.ids(index, '宽'), [1])
+        self.assertNotIn('巷', index.root.children['宽'].children)
+        # 重新添加时不指定热度则沿用原有热度
+        index.add(1, '宽窄巷子景区', '青羊区')
+        self.assertEqual(index.spots[1][2], 10)
+
+    def test_top_k_pruning(self):
+        index = SuggestIndex()
+        for spot_id in range(TOP_K + 3):
+            index.add(spot_id, f'公园{spot_id}', '', spot_id)
+        expected = list(range(TOP_K + 2, 2, -1))
+        self.assertEqual(self.ids(index, '公园'), expected)
+        self.assertEqual(len(index.root.children['公'].top), TOP_K)
+        # 删除候选后，被剪掉的景点从子节点中补回
+        index.remove(TOP_K + 2)
+        self.assertEqual(self.ids(index, '公园'), list(range(TOP_K + 1, 1, -1)))
+
+    def test_max_prefix(self):
+        index = SuggestIndex()
+        prefix = 'a' * MAX_PREFIX
+        index.add(1, prefix + 'bc', '')
+        index.add(2, prefix + 'bd', '')
+        node, depth = index.root, 0
+        while node.children:
+            node = next(iter(node.children.values()))
+            depth += 1
+        self.assertEqual(depth, MAX_PREFIX)
+        # 超出建树深度的部分在候选中再核对
+        self.assertEqual(self.ids(index, prefix + 'bd'), [2])
+        self.assertEqual(sorted(self.ids(index, prefix + 'b')), [1, 2])
+        self.assertEqual(self.ids(index, prefix + 'x'), [])
+
+    def test_rename_and_delete_signals(self):
+        cache.clear()
+        spot = ScenicSpot.objects.create(name='宽窄巷子', address='青羊区', category='其他')
+        get_suggest_index()
+
+        spot.name = '锦里古街'
+        spot.save()
+        self.assertEqual(self.ids(suggest_index, '宽窄'), [])
+        self.assertEqual(self.ids(suggest_index, 'kuanzhai'), [])
+        self.assertEqual(self.ids(suggest_index, '锦里'), [spot.id])
+        response = self.client.get('/api/tourism/scenic_spots/suggest/', {'q': 'jinli'})
+        self.assertEqual([result['name'] for result in response.json()], ['锦里古街'])
+
+        spot.delete()
+        self.assertEqual(self.ids(suggest_index, '锦里'), [])
+        self.assertEqual(self.ids(suggest_index, '青羊'), [])
+        self.assertNotIn('锦', suggest_index.root.children)
+
+    def test_latin_prefix_with_spaces_and_digits(self):
+        index = SuggestIndex()
+        index.add(1, 'Chunxi Rd', '', 1)
+        index.add(2, '春熙路', 'No. 1 Chunxi Rd', 2, aliases=('chunxilu', 'cxl'))
+        self.assertEqual(self.ids(index, 'Chunxi Rd'), [1])
+        self.assertEqual(self.ids(index, 'no. 1'), [2])
+        # 拼音形式的查询同时按去掉空格后的形式匹配
+        self.assertEqual(self.ids(index, 'chunxi l'), [2])
+
+    def test_rebuilds_after_other_process_writes(self):
+        cache.clear()
+        get_suggest_index()
+        ScenicSpot.objects.bulk_create([ScenicSpot(name='锦里', address='武侯区', category='其他')])
+        self.assertEqual(self.ids(get_suggest_index(), '锦里'), [])
+        bump_data_version()
+        self.assertEqual(len(self.ids(get_suggest_index(), '锦里')), 1)
+
+
+class FacetTests(TestCase):
+    """分面计数随过滤条件变化，每个分面不应用它自身维度的筛选"""
+    url = '/api/tourism/scenic_spots/facets/'
+
+    def setUp(self):
+        cache.clear()
+        spots = [
+            ('历史文化', None, 104.0), ('历史文化', '0', 104.0), ('历史文化', '60', 104.0),
+            ('自然风光', '30', 104.0), ('自然风光', '150', 104.0), ('自然风光', '300', 105.0),
+            ('美食探索', '60', 104.0),
+        ]
+        for i, (category, price, lng) in enumerate(spots):
+            ScenicSpot.objects.create(
+                name=f'景点{i}', category=category, latitude=30.6, longitude=lng,
+                ticket_price=None if price is None else Decimal(price)
+            )
+
+    def facets(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        categories = {row['category']: row['count'] for row in data['categories']}
+        histogram = [bucket['count'] for bucket in data['price']['histogram']]
+        return data['total'], categories, data['price']['free'], data['price']['paid'], histogram
+
+    def test_summary(self):
+        self.assertEqual(self.facets(), (7, {'历史文化': 3, '自然风光': 3, '美食探索': 1}, 2, 5, [1, 2, 1, 1]))
+
+    def test_bbox_filter(self):
+        total, categories, free, paid, histogram = self.facets(bbox='103.9,30.5,104.1,30.7')
+        self.assertEqual((total, categories, free, paid, histogram),
+                         (6, {'历史文化': 3, '自然风光': 2, '美食探索': 1}, 2, 4, [1, 2, 1, 0]))
+
+    def test_category_excluded_from_own_facet(self):
+        total, categories, free, paid, histogram = self.facets(category='自然风光')
+        self.assertEqual(total, 3)
+        # 分类计数不应用分类筛选，价格分面只统计选中分类
+        self.assertEqual(categories, {'历史文化': 3, '自然风光': 3, '美食探索': 1})
+        self.assertEqual((free, paid, histogram), (0, 3, [1, 0, 1, 1]))
+
+    def test_price_excluded_from_own_facet(self):
+        total, categories, free, paid, histogram = self.facets(min_price=50, max_price=100)
+        self.assertEqual(total, 2)
+        # 价格分面不应用价格筛选，分类计数只统计价格范围内的景点
+        self.assertEqual(categories, {'历史文化': 1, '美食探索': 1})
+        self.assertEqual((free, paid, histogram), (2, 5, [1, 2, 1, 1]))
+
+    def test_combined_filters(self):
+        total, categories, free, paid, histogram = self.facets(
+            category='历史文化', min_price=50, bbox='103.9,30.5,104.1,30.7'
+        )
+        self.assertEqual(total, 1)
+        self.assertEqual(categories, {'历史文化': 1, '自然风光': 1, '美食探索': 1})
+        self.assertEqual((free, paid, histogram), (2, 1, [0, 1, 0, 0]))
+
+    def test_invalid_price(self):
+        for value in ('abc', 'nan', 'inf'):
+            self.assertEqual(self.client.get(self.url, {'min_price': value}).status_code, 400)
+
+
+class SpatialGridIndexTests(TestCase):
+    """网格索引的半径和范围查询与逐点计算结果一致，插入、移动、删除后同步更新"""
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.lats = rng.uniform(30.5, 30.8, 500)
+        self.lngs = rng.uniform(103.9, 104.2, 500)
+        self.index = SpatialGridIndex()
+        self.index.build(zip(range(500), self.lats.tolist(), self.lngs.tolist()))
+
+    def test_within_radius_matches_brute_force(self):
+        for radius in (300, 2000, 50000):
+            ids, distances = self.index.within_radius(30.65, 104.05, radius)
+            expected = haversine(30.65, 104.05, self.lats, self.lngs)
+            self.assertEqual(sorted(ids.tolist()), np.flatnonzero(expected <= radius).tolist())
+            np.testing.assert_allclose(distances, expected[ids])
+
+    def test_bbox_candidates(self):
+        bbox = (104.0, 30.6, 104.05, 30.7)
+        inside = ((self.lngs >= bbox[0]) & (self.lngs <= bbox[2]) & (self.lats >= bbox[1]) & (self.lats <= bbox[3]))
+        candidates = {pk for pk, _, _ in self.index.query_bbox(*bbox)}
+        self.assertTrue(set(np.flatnonzero(inside).tolist()) <= candidates)
+        # 只返回相交网格中的点
+        cell = self.index.cell_size
+        for pk in candidates:
+            self.assertTrue(bbox[1] - cell < self.lats[pk] < bbox[3] + cell)
+            self.assertTrue(bbox[0] - cell < self.lngs[pk] < bbox[2] + cell)
+        # 范围覆盖的网格比已占用网格多时改为遍历已占用网格，结果不变
+        everything = {pk for pk, _, _ in self.index.query_bbox(-180, -90, 180, 90)}
+        self.assertEqual(everything, set(range(500)))
+
+    def test_insert_move_remove(self):
+        version = self.index.version
+        self.index.insert(1000, 30.0, 103.0)
+        self.assertEqual(self.index.within_radius(30.0, 103.0, 10)[0].tolist(), [1000])
+        self.index.insert(1000, 31.0, 105.0)
+        self.assertEqual(self.index.within_radius(30.0, 103.0, 10)[0].tolist(), [])
+        self.assertEqual(self.index.within_radius(31.0, 105.0, 10)[0].tolist(), [1000])
+        self.index.remove(1000)
+        self.assertEqual(self.index.within_radius(31.0, 105.0, 10)[0].tolist(), [])
+        self.assertNotIn(self.index._cell_of(31.0, 105.0), self.index._cells)
+        self.assertEqual(len(self.index), 500)
+        self.assertEqual(self.index.version, version + 3)
+
+    def test_signals_update_spot_index(self):
+        cache.clear()
+        load_spot_index()
+        spot = ScenicSpot.objects.create(name='景点', latitude=30.6, longitude=104.0, category='其他')
+        self.assertEqual(spot_index.within_radius(30.6, 104.0, 10)[0].tolist(), [spot.id])
+        spot.latitude = 30.7
+        spot.save()
+        self.assertEqual(spot_index.within_radius(30.6, 104.0, 10)[0].tolist(), [])
+        spot.delete()
+        self.assertEqual(len(spot_index), 0)
+
+    def test_rebuilds_after_other_process_writes(self):
+        load_spot_index()
+        # 其他进程（管理命令、其他 worker）写入：本进程没有收到信号，只看到数据版本变化
+        spot = ScenicSpot(name='景点', latitude=30.6, longitude=104.0, category='其他')
+        ScenicSpot.objects.bulk_create([spot])
+        self.assertEqual(len(get_spot_index()), 0)
+        bump_data_version()
+        self.assertEqual(len(get_spot_index()), 1)
+
+
+class DistanceTests(TestCase):
+    """共享的批量距离计算：已知距离、数组广播，以及序列化器中的距离字段"""
+
+    def test_haversine(self):
+        self.assertEqual(haversine(30.6, 104.0, 30.6, 104.0), 0)
+        # 经线上1度的弧长
+        self.assertAlmostEqual(haversine(30.0, 104.0, 31.0, 104.0), EARTH_RADIUS * np.pi / 180, places=3)
+        self.assertAlmostEqual(haversine(0.0, 0.0, 0.0, 180.0), EARTH_RADIUS * np.pi, places=3)
+        # 一个点到坐标数组，与逐个计算一致
+        lats, lngs = np.array([30.6, 30.7, 31.0]), np.array([104.0, 104.1, 103.5])
+        distances = haversine(30.65, 104.05, lats, lngs)
+        self.assertEqual(distances.shape, (3,))
+        for i in range(3):
+            self.assertAlmostEqual(distances[i], haversine(30.65, 104.05, lats[i], lngs[i]))
+        # 成对计算（两个数组广播）
+        self.assertEqual(haversine(lats[:, None], lngs[:, None], lats, lngs).shape, (3, 3))
+
+    def test_planar_matches_haversine_in_city(self):
+        lats, lngs = np.array([30.60, 30.65, 30.70]), np.array([104.00, 104.08, 104.03])
+        points = to_planar(lats, lngs)
+        planar = np.hypot(*(points[1:] - points[0]).T)
+        np.testing.assert_allclose(planar, haversine(lats[0], lngs[0], lats[1:], lngs[1:]), rtol=1e-3)
+
+    def test_distance_map_and_format(self):
+        spots = [
+            ScenicSpot.objects.create(name=f'景点{i}', latitude=30.6 + i * 0.01, longitude=104.0, category='其他')
+            for i in range(3)
+        ]
+        distances = distance_map(spots, 30.6, 104.0)
+        self.assertEqual(set(distances), {spot.id for spot in spots})
+        self.assertEqual(distances[spots[0].id], 0)
+        self.assertAlmostEqual(distances[spots[2].id], 2 * EARTH_RADIUS * np.pi / 18000, places=3)
+        self.assertEqual(distance_map([], 30.6, 104.0), {})
+        self.assertEqual(format_distance(999.9), '999米')
+        self.assertEqual(format_distance(2224), '2.2公里')
+
+    def test_serializer_distance(self):
+        spot = ScenicSpot.objects.create(name='景点', latitude=30.61, longitude=104.0, category='其他')
+        params = {'lat': 30.6, 'lng': 104.0, 'fields': 'id,distance,distance_meters'}
+        listed = self.client.get('/api/tourism/scenic_spots/', params).json()['results'][0]
+        detail = self.client.get(f'/api/tourism/scenic_spots/{spot.id}/', params).json()
+        self.assertEqual(listed['distance'], '1.1公里')
+        self.assertAlmostEqual(listed['distance_meters'], 1111.9, delta=0.1)
+        self.assertEqual(detail['distance_meters'], listed['distance_meters'])
+        # 没有位置参数时不计算距离
+        self.assertIsNone(self.client.get(f'/api/tourism/scenic_spots/{spot.id}/').json()['distance'])
+
+
+class NearestSpotsTests(TestCase):
+    """KD树最近邻与逐点计算一致；附近景点按 (距离, id) 游标翻页，不漏不重"""
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.spots = [
+            ScenicSpot.objects.create(name=f'景点{i}', latitude=lat, longitude=lng, category='其他')
+            for i, (lat, lng) in enumerate(zip(rng.uniform(30.55, 30.75, 40), rng.uniform(103.95, 104.15, 40)))
+        ]
+        # 与第一个景点坐标相同，距离相等时按id排序
+        self.spots.append(ScenicSpot.objects.create(
+            name='同位置', latitude=self.spots[0].latitude, longitude=self.spots[0].longitude, category='其他'
+        ))
+        load_spot_index()
+        self.center = (30.65, 104.05)
+        self.distances = {
+            spot.id: float(haversine(*self.center, spot.latitude, spot.longitude)) for spot in self.spots
+        }
+
+    def expected_order(self, radius=float('inf')):
+        return [pk for pk, d in sorted(self.distances.items(), key=lambda item: (item[1], item[0])) if d <= radius]
+
+    def test_nearest(self):
+        ids, distances = spot_index.nearest(*self.center, 5)
+        self.assertEqual(ids.tolist(), self.expected_order()[:5])
+        np.testing.assert_allclose(distances, [self.distances[pk] for pk in ids.tolist()], atol=1e-3)
+
+        response = self.client.get('/api/tourism/scenic_spots/nearest/', {
+            'lat': self.center[0], 'lng': self.center[1], 'k': 3, 'fields': 'id,distance_meters'
+        })
+        self.assertEqual([spot['id'] for spot in response.json()], self.expected_order()[:3])
+        self.assertEqual(spot_index.nearest(*self.center, 100)[0].tolist(), self.expected_order())
+
+    def test_nearby_cursor_pages(self):
+        ids, meters = [], []
+        url = '/api/tourism/scenic_spots/nearby/'
+        params = {'lat': self.center[0], 'lng': self.center[1], 'radius': 10000, 'page_size': 4, 'fields': 'id,distance_meters'}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            results = response.json()['results']
+            ids += [spot['id'] for spot in results]
+            meters += [spot['distance_meters'] for spot in results]
+            url, params = response.json()['next'], None
+        self.assertEqual(ids, self.expected_order(10000))
+        self.assertEqual(meters, sorted(meters))
+
+    def test_tampered_cursor(self):
+        for raw in ('["NaN", 1]', '[1.0, 1e400]', '[1.0, 99999999999999999999999]', '[1.0, "x"]', '[1.0]'):
+            response = self.client.get('/api/tourism/scenic_spots/nearby/', {
+                'lat': 30.65, 'lng': 104.05, 'cursor': base64.urlsafe_b64encode(raw.encode()).decode()
+            })
+            self.assertEqual(response.status_code, 400, raw)
+
+
+class ClusterIndexTests(TestCase):
+    """分级聚合：低缩放级别合并相近景点，数量和分类计数守恒，要素过多时降级"""
+
+    def setUp(self):
+        # 相距约40公里的两组景点，每组内相距约100米，另有一个孤立景点
+        self.rows = [
+            (1, 104.000, 30.600, '历史文化', '甲1'), (2, 104.001, 30.600, '历史文化', '甲2'),
+            (3, 104.000, 30.601, '自然风光', '甲3'),
+            (4, 104.400, 30.600, '美食探索', '乙1'), (5, 104.401, 30.601, '美食探索', '乙2'),
+            (6, 104.200, 30.900, '其他', '丙'),
+        ]
+        self.index = ClusterIndex()
+        self.index.build(self.rows)
+        self.bbox = (103.5, 30.0, 105.0, 31.5)
+
+    def test_merge_levels(self):
+        zoom, features = self.index.get_clusters(self.bbox, 10)
+        self.assertEqual(zoom, 10)
+        clusters = sorted((f['properties'] for f in features if f['properties']['cluster']), key=lambda p: -p['count'])
+        self.assertEqual([(c['count'], c['categories']) for c in clusters], [
+            (3, {'历史文化': 2, '自然风光': 1}), (2, {'美食探索': 2}),
+        ])
+        single = [f['properties'] for f in features if not f['properties']['cluster']]
+        self.assertEqual(single, [{'cluster': False, 'id': 6, 'name': '丙', 'category': '其他'}])
+        # 聚合点坐标为成员坐标的平均值
+        first = next(f for f in features if f['properties'].get('count') == 3)
+        lng, lat = first['geometry']['coordinates']
+        self.assertAlmostEqual(lng, (104.000 + 104.001 + 104.000) / 3, places=6)
+        self.assertAlmostEqual(lat, (30.600 + 30.600 + 30.601) / 3, places=4)
+
+        # 最大缩放级别之上返回全部原始景点
+        zoom, features = self.index.get_clusters(self.bbox, MAX_ZOOM + 1)
+        self.assertEqual(sorted(f['properties']['id'] for f in features), [1, 2, 3, 4, 5, 6])
+        # 最低级别全部合并为一个聚合点
+        _, features = self.index.get_clusters(self.bbox, 0)
+        self.assertEqual([f['properties']['count'] for f in features], [6])
+
+    def test_counts_conserved(self):
+        for level in self.index.levels.values():
+            self.assertEqual(int(level.counts.sum()), len(self.rows))
+            self.assertEqual(level.category_counts.sum(axis=0).tolist(), [1, 2, 2, 1])
+            self.assertTrue((level.category_counts.sum(axis=1) == level.counts).all())
+
+    def test_max_features_fallback(self):
+        index = ClusterIndex()
+        index.build([
+            (i * 20 + j, 104.0 + i * 0.02, 30.5 + j * 0.02, '其他', '') for i in range(20) for j in range(20)
+        ])
+        zoom, features = index.get_clusters(self.bbox, MAX_ZOOM + 1)
+        self.assertLess(zoom, MAX_ZOOM + 1)
+        self.assertLessEqual(len(features), MAX_FEATURES)
+        self.assertEqual(sum(f['properties'].get('count', 1) for f in features), 400)
+
+    def test_endpoint_rebuilds_after_save(self):
+        params = {'bbox': '103.5,30.0,105.0,31.5', 'zoom': MAX_ZOOM + 1}
+        ScenicSpot.objects.create(name='甲', latitude=30.6, longitude=104.0, category='其他')
+        self.assertEqual(len(self.client.get('/api/tourism/scenic_spots/clusters/', params).json()['features']), 1)
+        ScenicSpot.objects.create(name='乙', latitude=30.7, longitude=104.1, category='其他')
+        features = self.client.get('/api/tourism/scenic_spots/clusters/', params).json()['features']
+        self.assertEqual(sorted(f['properties']['name'] for f in features), ['乙', '甲'])
+        self.assertEqual(self.client.get('/api/tourism/scenic_spots/clusters/', {'zoom': 'x'}).status_code, 400)
+
+    def test_endpoint_rebuilds_after_other_process_writes(self):
+        params = {'bbox': '103.5,30.0,105.0,31.5', 'zoom': MAX_ZOOM + 1}
+        ScenicSpot.objects.create(name='甲', latitude=30.6, longitude=104.0, category='其他')
+        self.assertEqual(len(self.client.get('/api/tourism/scenic_spots/clusters/', params).json()['features']), 1)
+        # 其他进程写入：本进程没有收到信号，只看到数据版本变化
+        ScenicSpot.objects.bulk_create([ScenicSpot(name='乙', latitude=30.7, longitude=104.1, category='其他')])
+        bump_data_version()
+        features = self.client.get('/api/tourism/scenic_spots/clusters/', params).json()['features']
+        self.assertEqual(sorted(f['properties']['name'] for f in features), ['乙', '甲'])
+
+
+class StreamingGeoJSONTests(TestCase):
+    """流式 GeoJSON 分段输出，拼接后与非流式结果一致"""
+    url = '/api/tourism/scenic_spots/geojson/'
+
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            ScenicSpot.objects.create(
+                name=f'景点{i}', latitude=30.6 + i * 0.01, longitude=104.0, category='其他' if i % 2 else '历史文化',
+                ticket_price=Decimal(i * 10)
+            )
+
+    def test_iter_feature_collection(self):
+        def to_feature(row):
+            return {'type': 'Feature', 'properties': {'id': row}}
+
+        for count, writes in ((0, 0), (1, 1), (FEATURES_PER_WRITE, 1), (FEATURES_PER_WRITE + 1, 2)):
+            chunks = list(iter_feature_collection(iter(range(count)), to_feature))
+            # 开头、结尾各一段，中间每 FEATURES_PER_WRITE 个要素一段
+            self.assertEqual(len(chunks), writes + 2)
+            data = json.loads(''.join(chunks))
+            self.assertEqual([feature['properties']['id'] for feature in data['features']], list(range(count)))
+
+    def features(self, response):
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return sorted(json.loads(body)['features'], key=lambda feature: feature['properties']['id'])
+
+    def test_stream_matches_snapshot(self):
+        for params in ({}, {'category': '其他', 'properties': 'id,name,ticket_price'}, {'bbox': '103.9,30.6,104.1,30.625'}):
+            streamed = self.client.get(self.url, {**params, 'stream': '1'})
+            self.assertTrue(streamed.streaming)
+            self.assertEqual(streamed['Content-Type'], 'application/json')
+            plain = self.client.get(self.url, {**params, 'stream': '0'})
+            self.assertFalse(plain.streaming)
+            self.assertEqual(self.features(streamed), self.features(plain))
+        self.assertEqual(len(self.features(self.client.get(self.url, {'category': '其他', 'stream': '1'}))), 2)
+
+    @override_settings(GEOJSON_STREAM_THRESHOLD=3)
+    def test_stream_above_threshold(self):
+        load_spot_index()
+        self.assertTrue(self.client.get(self.url).streaming)
+        self.assertTrue(self.client.get('/api/tourism/async/scenic_spots/geojson/').streaming)
+
+
+class SparseFieldsetTests(TestCase):
+    """fields/properties 参数只输出并只从数据库读取请求的字段"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('tester', 'tester@example.com', 'password')
+        self.spot = ScenicSpot.objects.create(
+            name='景点', latitude=30.6, longitude=104.0, category='其他', description='很长的描述' * 100
+        )
+        load_spot_index()
+
+    def test_list_fields(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tourism/scenic_spots/', {'fields': 'name,category'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'id': self.spot.id, 'name': '景点', 'category': '其他'}])
+        # 页码分页的计数查询之外，只有一次读取景点的查询
+        spot_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'tourism_scenicspot' in query['sql'] and 'COUNT(' not in query['sql']
+        ]
+        self.assertEqual(len(spot_queries), 1)
+        self.assertNotIn('description', spot_queries[0])
+        # 没有请求 is_favorited 时不读取收藏
+        self.assertFalse(any('favorited_by' in query['sql'] for query in queries.captured_queries))
+
+        response = self.client.get('/api/tourism/scenic_spots/', {'fields': 'name,is_favorited'})
+        self.assertEqual(response.json()['results'], [{'id': self.spot.id, 'name': '景点', 'is_favorited': False}])
+
+    def test_nearby_and_geojson(self):
+        response = self.client.get('/api/tourism/scenic_spots/nearby/', {
+            'lat': 30.6, 'lng': 104.0, 'fields': 'name,distance_meters'
+        })
+        self.assertEqual(response.json()['results'], [{'id': self.spot.id, 'name': '景点', 'distance_meters': 0.0}])
+        response = self.client.get('/api/tourism/scenic_spots/geojson/', {'properties': 'name'})
+        feature = response.json()['features'][0]
+        # id 始终输出
+        self.assertEqual(feature['properties'], {'id': self.spot.id, 'name': '景点'})
+        self.assertEqual(feature['geometry']['coordinates'], [104.0, 30.6])
+
+    def test_unknown_field(self):
+        for url in ('/api/tourism/scenic_spots/', '/api/tourism/scenic_spots/geojson/'):
+            response = self.client.get(url, {'fields': 'name,password'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('password', response.json()['fields'])
+
+
+class PinyinSearchTests(TestCase):
+    """按全拼或首字母前缀搜索景点"""
+
+    def setUp(self):
+        cache.clear()
+        self.street = ScenicSpot.objects.create(name='宽窄巷子', category='历史文化', address='青羊区')
+        self.temple = ScenicSpot.objects.create(name='文殊院', category='宗教文化', address='青羊区')
+        search_index.build(ScenicSpot.objects.all())
+
+    def names(self, query):
+        response = self.client.get('/api/tourism/scenic_spots/', {'search': query, 'fields': 'name'})
+        self.assertEqual(response.status_code, 200)
+        return [spot['name'] for spot in response.json()['results']]
+
+    def test_conversion(self):
+        self.assertEqual(name_pinyin('宽窄巷子'), 'kuanzhaixiangzi')
+        self.assertEqual(name_initials('宽窄巷子'), 'kzxz')
+        self.assertEqual(name_pinyin('IFS 国际金融中心'), 'ifsguojijinrongzhongxin')
+        self.assertEqual(normalize_pinyin_query(" Kuan Zhai'xiang "), 'kuanzhaixiang')
+        self.assertEqual(normalize_pinyin_query('宽窄'), '')
+        self.street.refresh_from_db()
+        self.assertEqual((self.street.name_pinyin, self.street.name_initials), ('kuanzhaixiangzi', 'kzxz'))
+
+    def test_search_by_pinyin(self):
+        self.assertEqual(self.names('kuanzhai'), ['宽窄巷子'])
+        self.assertEqual(self.names('Kuan Zhai'), ['宽窄巷子'])
+        self.assertEqual(self.names('kzxz'), ['宽窄巷子'])
+        self.assertEqual(self.names('wsy'), ['文殊院'])
+        # 只做前缀匹配
+        self.assertEqual(self.names('zhai'), [])
+        response = self.client.get('/api/tourism/scenic_spots/geojson/', {'search': 'wenshu', 'properties': 'name'})
+        self.assertEqual([feature['properties']['name'] for feature in response.json()['features']], ['文殊院'])
+
+    def test_rename_updates_pinyin(self):
+        self.street.name = '锦里'
+        self.street.save()
+        self.assertEqual(self.names('kuanzhai'), [])
+        self.assertEqual(self.names('jinli'), ['锦里'])
+
+    def test_scrape_fills_pinyin_in_bulk(self):
+        from .scraper import SimpleSpotScraper
+
+        attractions = [
+            (self.street.id, '锦里', '', '武侯区', 0, '古镇民俗', 104.05, 30.64, ''),
+            (900001, '大熊猫基地', '', '成华区', 55, '自然风光', 104.14, 30.73, ''),
+            (900002, '大熊猫基地', '', '成华区', 55, '自然风光', 104.14, 30.73, ''),
+        ]
+        scraper = SimpleSpotScraper()
+        with mock.patch.object(scraper, 'fetch_page', return_value={'attractionList': []}), \
+                mock.patch.object(scraper, 'parse_page', return_value=attractions), \
+                mock.patch('tourism.pinyin.name_pinyin', wraps=name_pinyin) as convert:
+            scraper.scrape(pages=1)
+        # 同名景点只转换一次，保存时 pre_save 不再重复转换
+        self.assertEqual(convert.call_count, 2)
+        self.assertEqual(
+            set(ScenicSpot.objects.filter(name='大熊猫基地').values_list('name_pinyin', 'name_initials')),
+            {('daxiongmaojidi', 'dxmjd')}
+        )
+        self.street.refresh_from_db()
+        self.assertEqual((self.street.name_pinyin, self.street.name_initials), ('jinli', 'jl'))
+
+
+class AsyncViewParityTests(TestCase):
+    """异步只读接口与同步接口在同一份数据上返回相同结果"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('tester', 'tester@example.com', 'password')
+        categories = ['历史文化', '美食探索', '自然风光']
+        self.spots = [
+            ScenicSpot.objects.create(
+                name=f'景点{i}', latitude=30.6 + i * 0.002, longitude=104.0, category=categories[i % 3],
+                address=f'成都市{i}号', ticket_price=Decimal(i)
+            )
+            for i in range(12)
+        ]
+        # 与前一个景点到中心点距离相同，检查同距离时的翻页顺序
+        self.spots.append(ScenicSpot.objects.create(
+            name='景点12', latitude=30.6 + 0.002, longitude=104.0, category='其他', address='成都市12号'
+        ))
+        for spot in self.spots[::4]:
+            spot.favorited_by.add(self.user)
+
+    def assertSameResponse(self, path, params=None):
+        sync = self.client.get(f'/api/tourism/{path}', params or {})
+        async_ = self.client.get(f'/api/tourism/async/{path}', params or {})
+        self.assertEqual(async_.status_code, sync.status_code)
+        self.assertEqual(async_.json(), sync.json())
+        return sync.json()
+
+    def test_nearby(self):
+        params = {'lat': 30.6, 'lng': 104.0, 'radius': 3000, 'page_size': 5}
+        for logged_in in (False, True):
+            if logged_in:
+                self.client.force_login(self.user)
+            # 沿各自的 next 链接逐页比较，直到最后一页
+            sync_url, async_url, query, pages = '/api/tourism/scenic_spots/nearby/', '/api/tourism/async/scenic_spots/nearby/', params, 0
+            while sync_url:
+                sync = self.client.get(sync_url, query).json()
+                async_ = self.client.get(async_url, query).json()
+                self.assertEqual(async_['results'], sync['results'])
+                sync_url, async_url, query = sync['next'], async_['next'], None
+                pages += 1
+            self.assertIsNone(async_url)
+            self.assertEqual(pages, 3)
+            self.assertSameResponse('scenic_spots/nearby/', {**params, 'page_size': 20, 'fields': 'id,name,distance'})
+        self.assertSameResponse('scenic_spots/nearby/', {'lat': 'x', 'lng': 104.0})
+        self.assertSameResponse('scenic_spots/nearby/', {'lat': 30.6, 'lng': 104.0, 'cursor': 'bad'})
+
+    def test_categories(self):
+        data = self.assertSameResponse('scenic_spots/categories/')
+        self.assertEqual(sorted(data), ['其他', '历史文化', '美食探索', '自然风光'])
+        ScenicSpot.objects.create(name='新景点', category='主题乐园')
+        self.assertIn('主题乐园', self.assertSameResponse('scenic_spots/categories/'))
+
+    def test_retrieve(self):
+        spot = self.spots[4]
+        self.assertSameResponse(f'scenic_spots/{spot.id}/')
+        self.assertSameResponse(f'scenic_spots/{spot.id}/', {'fields': 'id,name,is_favorited'})
+        self.client.force_login(self.user)
+        data = self.assertSameResponse(f'scenic_spots/{spot.id}/', {'lat': 30.61, 'lng': 104.0})
+        self.assertTrue(data['is_favorited'])
+        self.assertSameResponse('scenic_spots/999999/')
@@ -0,0 +1,190 @@
+"""
+矢量瓦片（Mapbox Vector Tile）
+
+按 Web 墨卡托 XYZ 瓦片编码景点和周边设施（POI 各图层）点位，生成的瓦片缓存在磁盘上。
+缓存目录按图层和数据版本（保存在数据库中、由信号递增的景点/POI 数据版本）区分，数据有增删改时自动换用新目录，
+写入新版本的第一个瓦片时删除旧版本目录。seed_tiles 命令与服务进程读到同一版本，预生成的瓦片可以直接使用。
+"""
+import logging
+import os
+import shutil
+import tempfile
+from math import atan, degrees, floor, log, pi, radians, sinh, tan, cos
+
+import mapbox_vector_tile
+import numpy as np
+from django.conf import settings
+
+from .models import POI, ScenicSpot
+from .pois import POI_VERSION_KEY
+from .snapshots import VERSION_KEY, get_data_version
+
+logger = logging.getLogger('tourism_tiles')
+
+# 瓦片内坐标范围
+TILE_EXTENT = 4096
+# 瓦片边缘缓冲（占瓦片宽度的比例），避免图标在瓦片交界处被裁切
+TILE_BUFFER = 64 / TILE_EXTENT
+MAX_ZOOM = 22
+SPOT_LAYER = 'scenic_spots'
+
+
+def tile_cache_dir():
+    return getattr(settings, 'TILE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'tile_cache'))
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_bounds(z, x, y):
+    """返回瓦片的经纬度范围 (minLng, minLat, maxLng, maxLat)"""
+    n = 2 ** z
+
+    def lat_of(row):
+        return degrees(atan(sinh(pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat_of(y + 1), (x + 1) / n * 360.0 - 180.0, lat_of(y)
+
+
+def tiles_in_bbox(bbox, z):
+    """遍历与经纬度范围相交的所有瓦片坐标 (x, y)"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    n = 2 ** z
+
+    def tile_x(lng):
+        return min(n - 1, max(0, floor((lng + 180.0) / 360.0 * n)))
+
+    def tile_y(lat):
+        lat = max(min(lat, 85.0511), -85.0511)
+        return min(n - 1, max(0, floor((1 - log(tan(radians(lat)) + 1 / cos(radians(lat))) / pi) / 2 * n)))
+
+    for x in range(tile_x(min_lng), tile_x(max_lng) + 1):
+        for y in range(tile_y(max_lat), tile_y(min_lat) + 1):
+            yield x, y
+
+
+def to_tile_pixels(lngs, lats, z, x, y):
+    """把经纬度数组投影为瓦片内像素坐标（y轴向下）"""
+    n = 2 ** z
+    lats = np.radians(np.clip(np.asarray(lats, dtype=np.float64), -85.0511, 85.0511))
+    world_x = (np.asarray(lngs, dtype=np.float64) + 180.0) / 360.0 * n
+    world_y = (1 - np.log(np.tan(lats) + 1 / np.cos(lats)) / pi) / 2 * n
+    px = np.rint((world_x - x) * TILE_EXTENT).astype(np.int64)
+    py = np.rint((world_y - y) * TILE_EXTENT).astype(np.int64)
+    return px, py
+
+
+def layer_data_version(layer=SPOT_LAYER):
+    """
+    图层数据版本（用作缓存目录名），任一景点/设施新增、删除或更新后都会变化
+    读取 snapshots 中由信号递增的数据版本（数据库中保存，本进程缓存几秒），不需要每次请求都统计整张表
+    """
+    return str(get_data_version(VERSION_KEY if layer == SPOT_LAYER else POI_VERSION_KEY))
+
+
+def spot_data_version():
+    """景点数据版本"""
+    return layer_data_version(SPOT_LAYER)
+
+
+def _layer_rows(layer, bbox):
+    """
+    瓦片范围内的 (id, 经度, 纬度, 属性字典) 行
+    景点图层输出名称、分类、门票；POI 图层输出名称、类型、评分
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    if layer == SPOT_LAYER:
+        queryset = ScenicSpot.objects.all()
+        fields = ('name', 'category', 'ticket_price')
+    else:
+        queryset = POI.objects.filter(layer=layer)
+        fields = ('name', 'poi_type', 'rating')
+    rows = queryset.filter(
+        latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng)
+    ).values_list('id', 'longitude', 'latitude', *fields)
+    for pk, lng, lat, *values in rows:
+        properties = {'id': pk}
+        for name, value in zip(fields, values):
+            if name == 'ticket_price':
+                value = float(value) if value else 0
+            elif value is None:
+                # MVT 属性不能为空值
+                continue
+            properties[name] = value
+        yield pk, lng, lat, properties
+
+
+def encode_tile(layer, z, x, y):
+    """编码单个瓦片中某个图层的点"""
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(z, x, y)
+    buffer_lng = (max_lng - min_lng) * TILE_BUFFER
+    buffer_lat = (max_lat - min_lat) * TILE_BUFFER
+    rows = list(_layer_rows(layer, (
+        min_lng - buffer_lng, min_lat - buffer_lat, max_lng + buffer_lng, max_lat + buffer_lat
+    )))
+    if not rows:
+        return b''
+
+    px, py = to_tile_pixels([row[1] for row in rows], [row[2] for row in rows], z, x, y)
+    features = [
+        {'id': pk, 'geometry': f'POINT({sx} {sy})', 'properties': properties}
+        for (pk, _, _, properties), sx, sy in zip(rows, px.tolist(), py.tolist())
+    ]
+    return mapbox_vector_tile.encode(
+        [{'name': layer, 'features': features}],
+        default_options={'extents': TILE_EXTENT, 'y_coord_down': True},
+    )
+
+
+def encode_spot_tile(z, x, y):
+    """编码单个瓦片中的景点"""
+    return encode_tile(SPOT_LAYER, z, x, y)
+
+
+def get_tile(layer, z, x, y, version=None):
+    """读取图层瓦片缓存，不存在时编码并写入磁盘"""
+    version = version or layer_data_version(layer)
+    layer_dir = os.path.join(tile_cache_dir(), layer)
+    path = os.path.join(layer_dir, version, str(z), str(x), f'{y}.mvt')
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    data = encode_tile(layer, z, x, y)
+    # 新版本的第一个瓦片：删除旧版本的缓存目录
+    new_version = not os.path.isdir(os.path.join(layer_dir, version))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if new_version:
+            purge_stale_tiles(version, layer)
+        # 先写临时文件再替换，避免并发请求读到写了一半的瓦片
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # 其他进程换用新版本时可能已删除本版本的目录，瓦片照常返回，只是不缓存
+        logger.warning(f"写入瓦片缓存失败: {e}")
+    return data
+
+
+def get_spot_tile(z, x, y, version=None):
+    """读取景点瓦片"""
+    return get_tile(SPOT_LAYER, z, x, y, version)
+
+
+def purge_stale_tiles(version=None, layer=SPOT_LAYER):
+    """删除图层旧数据版本的瓦片缓存目录，返回删除的目录数"""
+    version = version or layer_data_version(layer)
+    layer_dir = os.path.join(tile_cache_dir(), layer)
+    if not os.path.isdir(layer_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(layer_dir):
+        if name != version:
+            shutil.rmtree(os.path.join(layer_dir, name), ignore_errors=True)
+            removed += 1
+    return removed
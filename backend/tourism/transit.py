@@ -0,0 +1,239 @@
+"""
+公共交通可达范围
+
+用爬取的地铁站和公交站数据（见 datasets.py）构建交通网络：
+- 节点：地铁站、公交站
+- 乘车边：数据中只有每个站点经过哪些线路，没有站序，按每条线路上站点的最小生成树
+  近似线路走向，相邻站点之间按线路平均速度计算乘车时间
+- 步行换乘边：用KD树做空间连接，相距 TRANSFER_RADIUS 以内的站点之间可以步行换乘，
+  换乘时间包括步行时间和候车时间
+
+网络以 CSR 数组（indptr/indices/weights）保存，每个工作进程首次使用时构建一次。
+查询时从出发位置步行到附近站点，用有时间上限的 Dijkstra 求出时间预算内能到达的站点，
+再从这些站点步行到景点，得到每个景点的最短到达时间。
+"""
+import heapq
+import logging
+import threading
+
+import numpy as np
+from scipy.sparse.csgraph import minimum_spanning_tree
+from scipy.spatial import cKDTree
+
+from .datasets import load_columns
+from .geo import haversine, to_planar
+from .routing import distance_matrix
+
+logger = logging.getLogger('tourism_transit')
+
+# 步行速度（米/秒）和实际步行路程与直线距离之比
+WALK_SPEED = 1.2
+WALK_DETOUR = 1.3
+# 出发位置到站点、站点到景点的最大步行距离（米）
+ACCESS_RADIUS = 1000
+# 站点之间步行换乘的最大距离（米）
+TRANSFER_RADIUS = 500
+# 各交通方式：平均速度（米/秒，含停站）、平均候车时间（秒）、相邻站点最大间距（米）
+MODES = {
+    'metro': {'speed': 35 / 3.6, 'wait': 180, 'max_hop': 10000},
+    'bus': {'speed': 15 / 3.6, 'wait': 300, 'max_hop': 5000},
+}
+# 线路实际长度与站点直线距离之比
+LINE_DETOUR = 1.2
+
+
+def walk_seconds(distance):
+    return distance * WALK_DETOUR / WALK_SPEED
+
+
+def parse_lines(address):
+    """地址字段中是“;”分隔的线路名称，去掉停运线路"""
+    return [line.strip() for line in address.split(';') if line.strip() and '停运' not in line]
+
+
+class TransitGraph:
+    """交通网络：站点坐标 + CSR 邻接数组（边权为秒）"""
+
+    def __init__(self, names, modes, lats, lngs, indptr, indices, weights):
+        self.names = names
+        self.modes = modes
+        self.lats = lats
+        self.lngs = lngs
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.wait = np.array([MODES[mode]['wait'] for mode in modes], dtype=np.float64)
+        self._ref_lat = float(lats.mean()) if len(lats) else 0.0
+        self._tree = cKDTree(to_planar(lats, lngs, self._ref_lat)) if len(lats) else None
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    @classmethod
+    def build(cls, stations):
+        """用 [(名称, 交通方式, 纬度, 经度, [线路, ...]), ...] 构建交通网络"""
+        names = [station[0] for station in stations]
+        modes = [station[1] for station in stations]
+        lats = np.array([station[2] for station in stations], dtype=np.float64)
+        lngs = np.array([station[3] for station in stations], dtype=np.float64)
+        sources, targets, costs = [], [], []
+
+        # 乘车边：每条线路上的站点用最小生成树连接
+        lines = {}
+        for i, station in enumerate(stations):
+            for line in station[4]:
+                lines.setdefault((station[1], line), []).append(i)
+        for (mode, _), members in lines.items():
+            if len(members) < 2:
+                continue
+            members = np.array(members)
+            dist = distance_matrix(lats[members], lngs[members])
+            tree = minimum_spanning_tree(dist).tocoo()
+            keep = tree.data <= MODES[mode]['max_hop']
+            seconds = tree.data[keep] * LINE_DETOUR / MODES[mode]['speed']
+            u, v = members[tree.row[keep]], members[tree.col[keep]]
+            sources += [u, v]
+            targets += [v, u]
+            costs += [seconds, seconds]
+
+        # 步行换乘边：换乘到目标站点需要加上该站点的候车时间
+        if len(stations) > 1:
+            tree = cKDTree(to_planar(lats, lngs))
+            pairs = tree.query_pairs(TRANSFER_RADIUS, output_type='ndarray')
+            if len(pairs):
+                u, v = pairs[:, 0], pairs[:, 1]
+                walk = walk_seconds(haversine(lats[u], lngs[u], lats[v], lngs[v]))
+                wait = np.array([MODES[mode]['wait'] for mode in modes], dtype=np.float64)
+                sources += [u, v]
+                targets += [v, u]
+                costs += [walk + wait[v], walk + wait[u]]
+
+        return cls(names, modes, lats, lngs, *_to_csr(len(stations), sources, targets, costs))
+
+    def stations_near(self, lat, lng, radius):
+        """返回半径内的站点 (下标数组, 距离数组)"""
+        if self._tree is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        # 平面距离与球面距离在城市范围内略有差异，放宽查询半径后再按球面距离精确过滤
+        point = to_planar([lat], [lng], self._ref_lat)[0]
+        candidates = np.array(self._tree.query_ball_point(point, radius * 1.01), dtype=np.int64)
+        if not len(candidates):
+            return candidates, np.empty(0, dtype=np.float64)
+        distances = haversine(lat, lng, self.lats[candidates], self.lngs[candidates])
+        mask = distances <= radius
+        return candidates[mask], distances[mask]
+
+    def travel_times(self, lat, lng, budget):
+        """
+        从出发位置出发、在 budget 秒内能到达的站点
+        返回 {站点下标: 到达时间(秒)}，到达时间已包含初次候车时间
+        """
+        best = {}
+        heap = []
+        stations, distances = self.stations_near(lat, lng, ACCESS_RADIUS)
+        for station, seconds in zip(stations.tolist(), (walk_seconds(distances) + self.wait[stations]).tolist()):
+            if seconds <= budget and seconds < best.get(station, np.inf):
+                best[station] = seconds
+                heapq.heappush(heap, (seconds, station))
+
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        settled = set()
+        while heap:
+            seconds, station = heapq.heappop(heap)
+            if station in settled:
+                continue
+            settled.add(station)
+            for k in range(indptr[station], indptr[station + 1]):
+                target = int(indices[k])
+                arrival = seconds + weights[k]
+                if arrival <= budget and arrival < best.get(target, np.inf):
+                    best[target] = arrival
+                    heapq.heappush(heap, (arrival, target))
+        return best
+
+
+def _to_csr(count, sources, targets, costs):
+    """把边列表转换为 CSR 数组，同一对站点之间只保留最短的一条边"""
+    if not sources:
+        return np.zeros(count + 1, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    costs = np.concatenate(costs)
+    order = np.lexsort((costs, targets, sources))
+    sources, targets, costs = sources[order], targets[order], costs[order]
+    first = np.ones(len(sources), dtype=bool)
+    first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+    sources, targets, costs = sources[first], targets[first], costs[first]
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=count), out=indptr[1:])
+    return indptr, targets.astype(np.int64), costs.astype(np.float64)
+
+
+def reachable_spots(graph, index, lat, lng, budget):
+    """
+    在 budget 秒内可到达的景点（步行直达，或乘公共交通后步行到达）
+    返回 (景点id数组, 到达时间数组(秒), 下车站点下标数组(步行直达为-1))，按到达时间升序
+    """
+    best = {}
+
+    def relax(spot_ids, seconds, via):
+        for spot_id, arrival in zip(spot_ids.tolist(), seconds.tolist()):
+            if arrival <= budget and arrival < best.get(spot_id, (np.inf,))[0]:
+                best[spot_id] = (arrival, via)
+
+    # 步行直达
+    radius = min(ACCESS_RADIUS, budget * WALK_SPEED / WALK_DETOUR)
+    spot_ids, distances = index.within_radius(lat, lng, radius)
+    relax(spot_ids, walk_seconds(distances), -1)
+
+    # 乘公共交通到达站点后步行
+    for station, seconds in graph.travel_times(lat, lng, budget).items():
+        radius = min(ACCESS_RADIUS, (budget - seconds) * WALK_SPEED / WALK_DETOUR)
+        if radius <= 0:
+            continue
+        spot_ids, distances = index.within_radius(graph.lats[station], graph.lngs[station], radius)
+        relax(spot_ids, seconds + walk_seconds(distances), station)
+
+    if not best:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64)
+    ids = np.fromiter(best.keys(), dtype=np.int64, count=len(best))
+    seconds = np.fromiter((value[0] for value in best.values()), dtype=np.float64, count=len(best))
+    via = np.fromiter((value[1] for value in best.values()), dtype=np.int64, count=len(best))
+    order = np.lexsort((ids, seconds))
+    return ids[order], seconds[order], via[order]
+
+
+def load_transit_graph():
+    """读取地铁站和公交站数据构建交通网络，数据文件不存在时返回空网络"""
+    stations = []
+    for mode, dataset in (('metro', 'metro_stations'), ('bus', 'bus_stops')):
+        try:
+            columns = load_columns(dataset)
+        except (OSError, KeyError) as e:
+            logger.warning(f"读取{mode}站点数据失败: {e}")
+            continue
+        stations.extend(zip(
+            columns['name'], [mode] * len(columns['name']), columns['latitude'].tolist(),
+            columns['longitude'].tolist(), map(parse_lines, columns['address']),
+        ))
+    graph = TransitGraph.build(stations)
+    logger.info(f"交通网络构建完成，共 {len(graph)} 个站点、{graph.edge_count} 条边")
+    return graph
+
+
+_transit_graph = None
+_transit_lock = threading.Lock()
+
+
+def get_transit_graph():
+    """获取交通网络（进程级单例），首次使用时构建"""
+    global _transit_graph
+    if _transit_graph is None:
+        with _transit_lock:
+            if _transit_graph is None:
+                _transit_graph = load_transit_graph()
+    return _transit_graph
@@ -2,14 +2,35 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 # 暂时注释掉文档导入
 # from rest_framework.documentation import include_docs_urls
-from .views import ScenicSpotViewSet, UserRegisterView, UserLoginView
+from .views import (
+    DensityView, POITileView, POIViewSet, ScenicSpotViewSet, ScenicSpotTileView, RouteOptimizeView,
+    UserRegisterView, UserLoginView
+)
+from . import async_views
 
 # 创建路由器
 router = DefaultRouter()
 router.register(r'scenic_spots', ScenicSpotViewSet)
+router.register(r'pois', POIViewSet)
 
 # API路径
 urlpatterns = [
+    # 景点矢量瓦片
+    path('scenic_spots/tiles/<int:z>/<int:x>/<int:y>.mvt', ScenicSpotTileView.as_view(), name='scenic-spot-tile'),
+    path('pois/tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt', POITileView.as_view(), name='poi-tile'),
+
+    # 六边形网格密度（热力图）
+    path('density/', DensityView.as_view(), name='density'),
+
+    # 行程顺序优化
+    path('routes/optimize/', RouteOptimizeView.as_view(), name='route-optimize'),
+
+    # 只读接口的异步实现（ASGI 部署时使用，见 async_views.py）
+    path('async/scenic_spots/nearby/', async_views.nearby, name='async-scenic-spot-nearby'),
+    path('async/scenic_spots/geojson/', async_views.geojson, name='async-scenic-spot-geojson'),
+    path('async/scenic_spots/categories/', async_views.categories, name='async-scenic-spot-categories'),
+    path('async/scenic_spots/<int:pk>/', async_views.retrieve, name='async-scenic-spot-detail'),
+
     # 包含路由器生成的URL
     path('', include(router.urls)),
     
@@ -1,24 +1,106 @@
-from rest_framework import viewsets, filters, generics
-from django.db.models import Q, F
-from .models import ScenicSpot
-from .serializers import ScenicSpotSerializer, UserRegisterSerializer, UserLoginSerializer
+import numpy as np
+from rest_framework import viewsets, generics
+from rest_framework.views import APIView
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.conf import settings
+from django.db.models import Count, Q, F
+from .models import POI, ScenicSpot
+from .serializers import POISerializer, ScenicSpotSerializer, UserRegisterSerializer, UserLoginSerializer
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 from django.core.exceptions import ObjectDoesNotExist
 from .scraper import update_scenic_spots
-from math import radians, sin, cos, sqrt, atan2
+from .spatial_index import get_spot_index
+from .geo import distance_map, parse_bbox, parse_point, snap_bbox
+from .pagination import DistanceCursorPagination, SpotKeysetPagination
+from .clustering import get_cluster_index
+from .streaming import streaming_geojson_response
+from .snapshots import etag_matches, get_snapshot, snapshot_response
+from .search import SpotOrderingFilter, SpotSearchFilter, rank_ids, search_queryset, uses_postgres_search
+from .suggest import get_suggest_index
+from .facets import compute_facets, get_summary_facets, price_filter
+from .favorites import get_favorite_ids, get_popular_spot_ids, toggle_favorite
+from .polygons import candidate_points, district_counts, get_district, get_districts, parse_geometry, spots_within
+from .routing import optimize_order, plan_days
+from .transit import get_transit_graph, reachable_spots
+from .enrichment import ENRICHMENT_FIELDS
+from .density import DEFAULT_RESOLUTION, RESOLUTIONS, density_layers, get_density, layer_version_key
+from .datasets import DATASETS
+from .pois import POI_PROPERTIES, POI_VERSION_KEY, poi_feature_builder, poi_fields, poi_ids_in_bbox
+from .tiles import SPOT_LAYER, get_tile, is_valid_tile, layer_data_version
 from django.contrib.auth import authenticate
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+def requested_fields(params, allowed):
+    """
+    解析 fields/properties 参数（逗号分隔），返回需要输出的字段集合
+    未提供时返回 None，表示输出全部字段
+    """
+    value = params.get('fields') or params.get('properties')
+    if not value:
+        return None
+    fields = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        raise ValidationError({'fields': f'未知字段: {", ".join(sorted(unknown))}'})
+    fields.add('id')
+    return fields
+
+
 # 景点视图集
 class ScenicSpotViewSet(viewsets.ModelViewSet):
     queryset = ScenicSpot.objects.all()
     serializer_class = ScenicSpotSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [SpotSearchFilter, SpotOrderingFilter]
     search_fields = ['name', 'description', 'category', 'address']
-    ordering_fields = ['name', 'created_at', 'ticket_price']
+    ordering_fields = ['name', 'created_at', 'ticket_price', 'favorite_count']
     ordering = ['name']
+    pagination_class = SpotKeysetPagination
+
+    # geojson 可选择输出的属性
+    GEOJSON_PROPERTIES = ('id', 'name', 'description', 'category', 'address',
+                          'opening_hours', 'ticket_price', 'images')
+
+    def _requested_fields(self, allowed):
+        return requested_fields(self.request.query_params, allowed)
+
+    @staticmethod
+    def _project(queryset, fields):
+        """只从数据库读取请求的字段；坐标始终读取，用于计算距离"""
+        if not fields:
+            return queryset
+        concrete = {field.name for field in ScenicSpot._meta.concrete_fields}
+        only = (fields & concrete) | {'id', 'latitude', 'longitude'}
+        if 'nearby_facilities' in fields:
+            only |= set(ENRICHMENT_FIELDS)
+        return queryset.only(*only)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is None:
+            return context
+        if self.request.method == 'GET':
+            context['fields'] = self._requested_fields(ScenicSpotSerializer.Meta.fields)
+        # 当前用户的收藏id集合，序列化时不再逐个景点查询
+        fields = context.get('fields')
+        if self.request.user.is_authenticated and (not fields or 'is_favorited' in fields):
+            context['favorite_ids'] = get_favorite_ids(self.request.user)
+        return context
+
+    def get_serializer(self, *args, distances=None, **kwargs):
+        """
+        请求中带有用户位置时，一次性计算所有待序列化景点的距离并放入序列化器上下文
+        """
+        instance = args[0] if args else kwargs.get('instance')
+        if distances is None and instance is not None:
+            point = parse_point(self.request.query_params)
+            if point:
+                spots = instance if kwargs.get('many') else [instance]
+                distances = distance_map(spots, *point)
+        if distances is not None:
+            kwargs['context'] = {**self.get_serializer_context(), 'distances': distances}
+        return super().get_serializer(*args, **kwargs)
 
     @action(detail=False, methods=['post'])
     def update_data(self, request):
@@ -68,6 +150,66 @@ class ScenicSpotViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _preference_queryset(self, queryset):
+        """按请求体中的用户偏好（分类、预算）过滤景点"""
+        preferences = self.request.data.get('preferences', [])
+        budget = self.request.data.get('budget', 'medium')
+
+        if preferences:
+            queryset = queryset.filter(category__in=preferences)
+
+        if budget == 'low':
+            queryset = queryset.filter(Q(ticket_price__lte=100) | Q(ticket_price__isnull=True))
+        elif budget == 'medium':
+            queryset = queryset.filter(Q(ticket_price__lte=200) | Q(ticket_price__isnull=True))
+        return queryset
+
+    @action(detail=False, methods=['post'])
+    def itinerary(self, request):
+        """
+        根据用户偏好生成多日行程：景点按地理位置分成每天一组，组内按最短顺序排列
+        参数:
+        - preferences, budget: 与 filter 相同
+        - days: 天数，默认1，最多7
+        - per_day: 每天景点数，默认3，最多6
+        - start: 出发位置 {"lat": 纬度, "lng": 经度}，第一天从离出发位置最近的区域开始
+        返回每天的景点、每段距离和当天总距离（米）
+        """
+        try:
+            days = min(max(int(request.data.get('days', 1)), 1), 7)
+            per_day = min(max(int(request.data.get('per_day', 3)), 1), 6)
+        except (ValueError, TypeError):
+            return Response({'error': 'days和per_day必须是正整数'}, status=400)
+        start = request.data.get('start')
+        if start:
+            start = parse_point(start) if isinstance(start, dict) else None
+            if not start:
+                return Response({'error': '无效的出发位置start'}, status=400)
+
+        try:
+            # 优先安排收藏人数多的景点
+            spots = list(
+                self._preference_queryset(ScenicSpot.objects.all()).order_by('-favorite_count', 'id')[:days * per_day]
+            )
+            plan = plan_days(
+                [spot.latitude for spot in spots], [spot.longitude for spot in spots], days, start=start
+            )
+            result = []
+            for day, (order, legs) in enumerate(plan, start=1):
+                serializer = self.get_serializer([spots[i] for i in order.tolist()], many=True)
+                result.append({
+                    'day': day,
+                    'spots': serializer.data,
+                    'legs': [round(leg, 1) for leg in legs.tolist()],
+                    'total_distance': round(float(legs.sum()), 1),
+                })
+            return Response({
+                'days': result,
+                'total_distance': round(sum(day['total_distance'] for day in result), 1),
+            })
+        except Exception as e:
+            return Response({'error': f'生成行程时出错: {str(e)}'}, status=500)
+
     def get_queryset(self):
         """
         统一的查询过滤逻辑
@@ -77,18 +219,7 @@ class ScenicSpotViewSet(viewsets.ModelViewSet):
         
         # 从请求体获取用户偏好（用于路线规划）
         if self.request.method == 'POST' and self.action == 'filter':
-            preferences = self.request.data.get('preferences', [])
-            budget = self.request.data.get('budget', 'medium')
-            
-            if preferences:
-                queryset = queryset.filter(category__in=preferences)
-                
-            if budget == 'low':
-                queryset = queryset.filter(Q(ticket_price__lte=100) | Q(ticket_price__isnull=True))
-            elif budget == 'medium':
-                queryset = queryset.filter(Q(ticket_price__lte=200) | Q(ticket_price__isnull=True))
-            
-            return queryset[:15]  # 限制返回数量用于路线规划
+            return self._preference_queryset(queryset)[:15]  # 限制返回数量用于路线规划
         
         # URL 参数过滤（用于普通查询）
         category = self.request.query_params.get('category')
@@ -109,30 +240,40 @@ class ScenicSpotViewSet(viewsets.ModelViewSet):
             except ValueError:
                 pass
                 
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search) | 
-                Q(address__icontains=search) |
-                Q(category__icontains=search)
-            )
+        # search 参数由 SpotSearchFilter 通过全文索引处理
+
+        # 列表只读取请求的字段
+        if self.action == 'list':
+            queryset = self._project(queryset, self._requested_fields(ScenicSpotSerializer.Meta.fields))
         
         return queryset
 
+    def _ranked_spots_data(self, spot_ids, distances):
+        """按给定顺序读取并序列化景点，距离随上下文一并传入"""
+        spot_ids = spot_ids.tolist()
+        queryset = self._project(ScenicSpot.objects.all(), self._requested_fields(ScenicSpotSerializer.Meta.fields))
+        spots_by_id = queryset.in_bulk(spot_ids)
+        spots = [spots_by_id[spot_id] for spot_id in spot_ids if spot_id in spots_by_id]
+        serializer = self.get_serializer(
+            spots, many=True,
+            distances=dict(zip(spot_ids, distances.tolist()))
+        )
+        return serializer.data
+
     # 获取附近景点
     @action(detail=False, methods=['get'])
     def nearby(self, request):
         """
-        获取指定坐标附近的景点
+        获取指定坐标附近的景点，按距离由近到远分页返回
         参数:
         - lat: 纬度
         - lng: 经度
         - radius: 半径(米)，默认5000米
+        - page_size: 每页数量，默认10
+        - cursor: 翻页游标，取自上一页返回的 next
         """
         lat = request.query_params.get('lat')
         lng = request.query_params.get('lng')
-        radius = float(request.query_params.get('radius', 5000))  # 默认5公里
 
         if not lat or not lng:
             return Response({'error': '请提供经纬度参数'}, status=400)
@@ -140,34 +281,184 @@ class ScenicSpotViewSet(viewsets.ModelViewSet):
         try:
             lat = float(lat)
             lng = float(lng)
+            radius = float(request.query_params.get('radius', 5000))  # 默认5公里
             
-            # 将所有景点的距离计算出来
-            spots = []
-            for spot in ScenicSpot.objects.all():
-                # 使用Haversine公式计算距离
-                lat1, lon1 = radians(lat), radians(lng)
-                lat2, lon2 = radians(spot.latitude), radians(spot.longitude)
-                
-                # 地球半径（米）
-                R = 6371000
-                
-                dlat = lat2 - lat1
-                dlon = lon2 - lon1
-                
-                a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-                c = 2 * atan2(sqrt(a), sqrt(1-a))
-                distance = R * c
-                
-                if distance <= radius:
-                    spots.append(spot)
-            
-            serializer = self.get_serializer(spots, many=True)
-            return Response(serializer.data)
+            # 只计算与搜索圆相交网格中的候选景点，数据库只读取当前页
+            spot_ids, distances = get_spot_index().within_radius(lat, lng, radius)
+            paginator = DistanceCursorPagination()
+            spot_ids, distances = paginator.paginate_arrays(spot_ids, distances, request)
+            return paginator.get_paginated_response(self._ranked_spots_data(spot_ids, distances))
+        except ValidationError:
+            raise
         except (ValueError, TypeError) as e:
             return Response({'error': f'无效的经纬度格式: {str(e)}'}, status=400)
         except Exception as e:
             return Response({'error': f'查询附近景点时出错: {str(e)}'}, status=500)
 
+    # 获取公共交通可达的景点
+    @action(detail=False, methods=['get'])
+    def reachable(self, request):
+        """
+        获取从指定坐标出发，在给定时间内步行或乘地铁、公交可以到达的景点，按到达时间由短到长分页返回
+        参数:
+        - lat: 纬度
+        - lng: 经度
+        - minutes: 时间预算（分钟），默认30，最多120
+        - page_size: 每页数量，默认10
+        - cursor: 翻页游标，取自上一页返回的 next
+        每个景点附带 travel_minutes（预计到达时间）和 via（下车站点，步行直达时为空）
+        """
+        point = parse_point(request.query_params)
+        if not point:
+            return Response({'error': '请提供有效的经纬度参数'}, status=400)
+        try:
+            minutes = min(max(float(request.query_params.get('minutes', 30)), 1), 120)
+        except (ValueError, TypeError):
+            return Response({'error': 'minutes必须是数值'}, status=400)
+
+        try:
+            graph = get_transit_graph()
+            spot_ids, seconds, via = reachable_spots(graph, get_spot_index(), *point, minutes * 60)
+            via_by_id = dict(zip(spot_ids.tolist(), via.tolist()))
+            paginator = DistanceCursorPagination()
+            spot_ids, seconds = paginator.paginate_arrays(spot_ids, seconds, request)
+
+            spot_ids = spot_ids.tolist()
+            queryset = self._project(ScenicSpot.objects.all(), self._requested_fields(ScenicSpotSerializer.Meta.fields))
+            spots_by_id = queryset.in_bulk(spot_ids)
+            spots = [spots_by_id[spot_id] for spot_id in spot_ids if spot_id in spots_by_id]
+            data = self.get_serializer(spots, many=True).data
+            minutes_by_id = dict(zip(spot_ids, seconds.tolist()))
+            for item, spot in zip(data, spots):
+                station = via_by_id[spot.id]
+                item['travel_minutes'] = round(minutes_by_id[spot.id] / 60, 1)
+                item['via'] = graph.names[station] if station >= 0 else None
+            return paginator.get_paginated_response(data)
+        except ValidationError:
+            raise
+        except Exception as e:
+            return Response({'error': f'查询可达景点时出错: {str(e)}'}, status=500)
+
+    # 获取最近的k个景点
+    @action(detail=False, methods=['get'])
+    def nearest(self, request):
+        """
+        获取距离指定坐标最近的k个景点，按距离由近到远排列
+        参数:
+        - lat: 纬度
+        - lng: 经度
+        - k: 返回数量，默认10，最多100
+        """
+        point = parse_point(request.query_params)
+        if not point:
+            return Response({'error': '请提供有效的经纬度参数'}, status=400)
+
+        try:
+            k = min(max(int(request.query_params.get('k', 10)), 1), 100)
+        except (ValueError, TypeError):
+            return Response({'error': 'k必须是正整数'}, status=400)
+
+        try:
+            spot_ids, distances = get_spot_index().nearest(*point, k)
+            return Response(self._ranked_spots_data(spot_ids, distances))
+        except Exception as e:
+            return Response({'error': f'查询最近景点时出错: {str(e)}'}, status=500)
+
+    # 搜索框自动补全
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        返回名称或地址以输入内容开头的景点，按热度排序，只含 id、名称和地址
+        参数:
+        - q: 输入的前缀
+        - limit: 返回数量，默认10，最多10
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response([])
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 10)
+        except (ValueError, TypeError):
+            return Response({'error': 'limit必须是正整数'}, status=400)
+
+        try:
+            return Response(get_suggest_index().suggest(query, limit))
+        except Exception as e:
+            return Response({'error': f'获取搜索建议时出错: {str(e)}'}, status=500)
+
+    @staticmethod
+    def _geojson_queryset(search_query, category, bbox):
+        """按过滤条件构建GeoJSON查询集"""
+        # 构建基础查询集（不能直接迭代类属性 self.queryset，否则结果会被缓存）
+        spots = ScenicSpot.objects.all()
+        
+        # 应用搜索过滤（全文索引；PostgreSQL 上按相关度排序）
+        if search_query:
+            spots = search_queryset(spots, search_query)
+        
+        # 应用分类过滤
+        if category:
+            spots = spots.filter(category=category)
+
+        # 应用视野范围过滤（走经纬度复合索引的范围扫描）
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            spots = spots.filter(
+                latitude__range=(min_lat, max_lat),
+                longitude__range=(min_lng, max_lng)
+            )
+        return spots
+
+    @staticmethod
+    def _geojson_fields(properties):
+        """GeoJSON要素需要从数据库读取的字段：坐标 + 属性"""
+        return ('longitude', 'latitude') + tuple(properties)
+
+    @staticmethod
+    def _needs_python_ranking(search_query):
+        """非PostgreSQL数据库上的搜索结果需要按进程内索引的相关度在 Python 中排序"""
+        return bool(search_query) and not uses_postgres_search()
+
+    @classmethod
+    def _ranked_geojson_rows(cls, queryset, search_query, fields):
+        """读取 fields 对应的行，有搜索词时按相关度排序"""
+        if not cls._needs_python_ranking(search_query):
+            return queryset.values_list(*fields)
+        order = {spot_id: i for i, (spot_id, _) in enumerate(rank_ids(queryset, search_query))}
+        rows = sorted(queryset.values_list(*fields, 'id'), key=lambda row: order.get(row[-1], len(order)))
+        return [row[:-1] for row in rows]
+
+    @staticmethod
+    def _geojson_feature_builder(properties):
+        """返回把 _geojson_fields 顺序的一行数据转换为GeoJSON要素的函数"""
+        properties = tuple(properties)
+
+        def to_feature(row):
+            values = dict(zip(properties, row[2:]))
+            if 'ticket_price' in values:
+                values['ticket_price'] = float(values['ticket_price']) if values['ticket_price'] else 0
+            return {
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'Point',
+                    'coordinates': [row[0], row[1]]
+                },
+                'properties': values
+            }
+        return to_feature
+
+    def _geojson_payload(self, search_query, category, bbox, properties):
+        """按过滤条件构建GeoJSON特性集合"""
+        rows = self._ranked_geojson_rows(
+            self._geojson_queryset(search_query, category, bbox), search_query, self._geojson_fields(properties)
+        )
+        to_feature = self._geojson_feature_builder(properties)
+        return {
+            'type': 'FeatureCollection',
+            'features': [to_feature(row) for row in rows]
+        }
+
     # 获取所有景点的GeoJSON格式数据
     @action(detail=False, methods=['get'])
     def geojson(self, request):
@@ -176,74 +467,217 @@ class ScenicSpotViewSet(viewsets.ModelViewSet):
         可选参数:
         - category: 按分类过滤
         - search: 搜索关键词
+        - bbox: 视野范围 minLng,minLat,maxLng,maxLat，只返回范围内的景点
+        - zoom: 缩放级别，与bbox同时提供时把范围向外对齐到该级别的网格
+        - properties: 只输出指定属性（逗号分隔，如 id,name,category），默认输出全部属性
+        - stream: 为1时以流式响应逐批输出；景点总数超过 GEOJSON_STREAM_THRESHOLD 时默认流式输出
         """
         try:
             # 获取搜索参数
             search_query = request.query_params.get('search', '')
             category = request.query_params.get('category', '')
+            bbox = request.query_params.get('bbox')
+            zoom = request.query_params.get('zoom')
+            if bbox:
+                try:
+                    bbox = parse_bbox(bbox)
+                    if zoom:
+                        bbox = snap_bbox(bbox, int(zoom))
+                except ValueError as e:
+                    return Response({'error': f'无效的bbox或zoom参数: {str(e)}'}, status=400)
             
-            # 构建基础查询集
-            spots = self.queryset
-            
-            # 应用搜索过滤
-            if search_query:
-                spots = spots.filter(
-                    Q(name__icontains=search_query) |
-                    Q(description__icontains=search_query) |
-                    Q(address__icontains=search_query)
+            requested = self._requested_fields(self.GEOJSON_PROPERTIES)
+            properties = [name for name in self.GEOJSON_PROPERTIES if not requested or name in requested]
+
+            # 数据量大时逐批读取并流式输出，内存占用不随景点数量增长
+            stream = request.query_params.get('stream')
+            if stream is None:
+                threshold = getattr(settings, 'GEOJSON_STREAM_THRESHOLD', 5000)
+                use_stream = len(get_spot_index()) > threshold
+            else:
+                use_stream = stream.lower() in ('1', 'true', 'yes')
+            if use_stream:
+                return streaming_geojson_response(
+                    self._geojson_queryset(search_query, category, bbox),
+                    self._geojson_fields(properties),
+                    self._geojson_feature_builder(properties)
                 )
-            
-            # 应用分类过滤
-            if category:
-                spots = spots.filter(category=category)
-            
-            # 构建GeoJSON特性集合
-            features = []
-            for spot in spots:
-                feature = {
-                    'type': 'Feature',
-                    'geometry': {
-                        'type': 'Point',
-                        'coordinates': [spot.longitude, spot.latitude]
-                    },
-                    'properties': {
-                        'id': spot.id,
-                        'name': spot.name,
-                        'description': spot.description,
-                        'category': spot.category,
-                        'address': spot.address,
-                        'opening_hours': spot.opening_hours,
-                        'ticket_price': float(spot.ticket_price) if spot.ticket_price else 0,
-                        'images': spot.images
-                    }
-                }
-                features.append(feature)
-            
-            # 返回GeoJSON格式
-            return Response({
-                'type': 'FeatureCollection',
-                'features': features
-            })
+
+            # 数据未变化时直接返回缓存的快照（已预压缩）
+            snapshot = get_snapshot(
+                'geojson',
+                {'search': search_query, 'category': category, 'bbox': bbox, 'properties': properties},
+                lambda: self._geojson_payload(search_query, category, bbox, properties)
+            )
+            return snapshot_response(request, snapshot)
+        except ValidationError:
+            raise
         except Exception as e:
             import traceback
             print(f"获取GeoJSON数据时出错: {str(e)}")
             print(traceback.format_exc())
             return Response({'error': f'获取GeoJSON数据时出错: {str(e)}'}, status=500)
+
+    # 查询多边形范围内的景点
+    @action(detail=False, methods=['post'])
+    def within(self, request):
+        """
+        查询多边形范围内的景点，返回GeoJSON格式数据
+        参数:
+        - geometry: GeoJSON Polygon/MultiPolygon（也可以是Feature），如地图上绘制的区域
+        - district: 区县名称，以该区县边界作为查询范围（与geometry二选一）
+        - properties: 只输出指定属性（列表或逗号分隔），默认输出全部属性
+        - district_counts: 为true时在 districts 中返回范围内各区县的景点数量；
+          不提供geometry和district时统计全部景点
+        """
+        geometry = request.data.get('geometry')
+        district = request.data.get('district')
+        with_counts = bool(request.data.get('district_counts'))
+        if not geometry and not district and not with_counts:
+            return Response({'error': '请提供geometry或district参数'}, status=400)
+
+        try:
+            if geometry:
+                polygons = parse_geometry(geometry)
+            elif district:
+                polygons = get_district(district)
+                if polygons is None:
+                    return Response({'error': f'找不到区县: {district}'}, status=404)
+            else:
+                polygons = None
+        except ValueError as e:
+            return Response({'error': f'无效的geometry参数: {str(e)}'}, status=400)
+
+        properties = request.data.get('properties')
+        if isinstance(properties, list):
+            properties = ','.join(str(name) for name in properties)
+        requested = requested_fields({'properties': properties}, self.GEOJSON_PROPERTIES)
+        properties = [name for name in self.GEOJSON_PROPERTIES if not requested or name in requested]
+
+        try:
+            index = get_spot_index()
+            if polygons is None:
+                ids, lngs, lats = candidate_points(index, (-180.0, -90.0, 180.0, 90.0))
+            else:
+                ids, lngs, lats = spots_within(index, polygons)
+
+            data = {'type': 'FeatureCollection', 'count': len(ids)}
+            if polygons is None:
+                data['features'] = []
+            else:
+                # 范围判断在内存中完成，数据库只按id读取属性
+                rows = ScenicSpot.objects.filter(id__in=ids.tolist()).order_by('id').values_list(
+                    *self._geojson_fields(properties)
+                )
+                to_feature = self._geojson_feature_builder(properties)
+                data['features'] = [to_feature(row) for row in rows]
+            if with_counts:
+                data['districts'] = district_counts(get_districts(), lngs, lats)
+            return Response(data)
+        except Exception as e:
+            return Response({'error': f'查询范围内景点时出错: {str(e)}'}, status=500)
+
+    # 获取分级聚合后的景点
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        获取视野范围内按缩放级别聚合的景点
+        参数:
+        - bbox: 视野范围 minLng,minLat,maxLng,maxLat，默认整个成都
+        - zoom: 缩放级别，默认12
+        返回的聚合点包含数量和各分类数量，单个景点包含id、名称和分类
+        """
+        try:
+            bbox = request.query_params.get('bbox')
+            bbox = parse_bbox(bbox) if bbox else settings.LEAFLET_CONFIG['SPATIAL_EXTENT']
+            zoom = int(request.query_params.get('zoom', 12))
+        except ValueError as e:
+            return Response({'error': f'无效的bbox或zoom参数: {str(e)}'}, status=400)
+
+        try:
+            zoom, features = get_cluster_index().get_clusters(bbox, zoom)
+            return Response({
+                'type': 'FeatureCollection',
+                'zoom': zoom,
+                'features': features
+            })
+        except Exception as e:
+            return Response({'error': f'获取景点聚合数据时出错: {str(e)}'}, status=500)
+
     # 获取所有景点分类
     @action(detail=False, methods=['get'])
     def categories(self, request):
-        """获取所有景点分类"""
+        """获取所有景点分类（取自缓存的分面统计，按景点数降序）"""
         try:
-            categories = ScenicSpot.objects.values_list('category', flat=True).distinct()
-            return Response(list(categories))
+            return Response([row['category'] for row in get_summary_facets()['categories']])
         except Exception as e:
             return Response({'error': f'获取分类列表时出错: {str(e)}'}, status=500)
+
+    # 分面统计
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        返回各分类景点数、门票价格分段直方图和免费/收费数量
+        参数（可选，与 geojson 和景点列表相同）:
+        - search: 搜索关键词
+        - bbox: 视野范围 min_lng,min_lat,max_lng,max_lat
+        - category: 选中的分类（分类计数不应用该筛选）
+        - min_price、max_price: 选中的价格范围（价格分面不应用该筛选）
+        无过滤条件时直接返回缓存的汇总结果
+        """
+        search_query = request.query_params.get('search', '').strip()
+        category = request.query_params.get('category', '').strip()
+        bbox = request.query_params.get('bbox')
+        try:
+            bbox = parse_bbox(bbox) if bbox else None
+        except ValueError as e:
+            return Response({'error': f'无效的bbox参数: {str(e)}'}, status=400)
+        try:
+            prices = [request.query_params.get(name) for name in ('min_price', 'max_price')]
+            prices = [float(price) if price else None for price in prices]
+            if not all(price is None or np.isfinite(price) for price in prices):
+                raise ValueError(prices)
+        except ValueError:
+            return Response({'error': '无效的价格参数'}, status=400)
+
+        try:
+            if not (search_query or bbox or category or any(price is not None for price in prices)):
+                return Response(get_summary_facets())
+            return Response(compute_facets(
+                self._geojson_queryset(search_query, None, bbox), category, price_filter(*prices)
+            ))
+        except Exception as e:
+            return Response({'error': f'获取分面统计时出错: {str(e)}'}, status=500)
+    # 热门景点
+    @action(detail=False, methods=['get'])
+    def popular(self, request):
+        """
+        收藏人数最多的景点，按收藏人数降序
+        参数:
+        - limit: 返回数量，默认10，最多50
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except (ValueError, TypeError):
+            return Response({'error': 'limit必须是正整数'}, status=400)
+
+        try:
+            spot_ids = get_popular_spot_ids(limit)
+            queryset = self._project(ScenicSpot.objects.all(), self._requested_fields(ScenicSpotSerializer.Meta.fields))
+            spots_by_id = queryset.in_bulk(spot_ids)
+            spots = [spots_by_id[spot_id] for spot_id in spot_ids if spot_id in spots_by_id]
+            return Response(self.get_serializer(spots, many=True).data)
+        except ValidationError:
+            raise
+        except Exception as e:
+            return Response({'error': f'获取热门景点时出错: {str(e)}'}, status=500)
+
     # 获取景点详情
     def retrieve(self, request, *args, **kwargs):
         """重写retrieve方法，增加错误处理"""
         try:
             return super().retrieve(request, *args, **kwargs)
-        except ObjectDoesNotExist:
+        except (ObjectDoesNotExist, Http404):
             return Response({'error': '找不到指定的景点'}, status=404)
         except Exception as e:
             return Response({'error': f'获取景点详情时出错: {str(e)}'}, status=500)
@@ -252,16 +686,9 @@ class ScenicSpotViewSet(viewsets.ModelViewSet):
     def toggle_favorite(self, request, pk=None):
         """收藏或取消收藏景点"""
         spot = self.get_object()
-        user = request.user
-        
-        if spot.favorited_by.filter(id=user.id).exists():
-            # 如果已经收藏了，就取消收藏
-            spot.favorited_by.remove(user)
-            return Response({'status': 'unfavorited'})
-        else:
-            # 如果没有收藏，就添加收藏
-            spot.favorited_by.add(user)
+        if toggle_favorite(spot, request.user):
             return Response({'status': 'favorited'})
+        return Response({'status': 'unfavorited'})
     # 获取用户的收藏列表
     @action(detail=False, methods=['GET'], permission_classes=[IsAuthenticated])
     def favorites(self, request):
@@ -274,8 +701,237 @@ class ScenicSpotViewSet(viewsets.ModelViewSet):
     def is_favorited(self, request, pk=None):
         """检查当前景点是否已被用户收藏"""
         spot = self.get_object()
-        is_favorited = spot.favorited_by.filter(id=request.user.id).exists()
-        return Response({'is_favorited': is_favorited})
+        return Response({'is_favorited': spot.id in get_favorite_ids(request.user)})
+
+# 景点矢量瓦片视图
+class ScenicSpotTileView(APIView):
+    """返回 z/x/y 瓦片中的景点（Mapbox Vector Tile 格式），瓦片缓存在磁盘上"""
+
+    def get(self, request, z, x, y, layer=SPOT_LAYER):
+        if not is_valid_tile(z, x, y):
+            return Response({'error': '无效的瓦片坐标'}, status=404)
+        version = layer_data_version(layer)
+        etag = f'"{version}"'
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                data = get_tile(layer, z, x, y, version)
+            except Exception as e:
+                return Response({'error': f'生成矢量瓦片时出错: {str(e)}'}, status=500)
+            response = HttpResponse(data, content_type='application/vnd.mapbox-vector-tile')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, max-age=60'
+        return response
+
+# 周边设施矢量瓦片视图
+class POITileView(ScenicSpotTileView):
+    """返回 z/x/y 瓦片中某个 POI 图层的设施（Mapbox Vector Tile 格式，图层名即 POI 图层名称）"""
+
+    def get(self, request, layer, z, x, y):
+        if layer not in DATASETS:
+            return Response({'error': f'未知图层: {layer}'}, status=404)
+        return super().get(request, z, x, y, layer=layer)
+
+# 六边形网格密度视图
+class DensityView(APIView):
+    """
+    景点或周边设施的六边形网格密度（热力图）
+    参数:
+    - layer: spots（景点）或 POI 图层名称（hotpot、snacks、sichuan_food 等）
+    - res: 分辨率 0~4，六边形半径依次为 4km、2km、1km、500m、250m，默认2
+    - bbox: 可选，minLng,minLat,maxLng,maxLat；zoom: 可选，把 bbox 对齐到网格便于缓存
+    返回非空网格的中心坐标和数量，按列分别编码为数组：{"lng": [...], "lat": [...], "count": [...]}
+    """
+
+    def get(self, request):
+        layer = request.query_params.get('layer')
+        layers = density_layers()
+        if layer not in layers:
+            return Response({'error': f'请提供layer参数，可选: {", ".join(layers)}'}, status=400)
+        try:
+            resolution = int(request.query_params.get('res', DEFAULT_RESOLUTION))
+            if not 0 <= resolution < len(RESOLUTIONS):
+                raise ValueError(f'res必须在0到{len(RESOLUTIONS) - 1}之间')
+            bbox = request.query_params.get('bbox')
+            if bbox:
+                bbox = parse_bbox(bbox)
+                zoom = request.query_params.get('zoom')
+                if zoom:
+                    bbox = snap_bbox(bbox, int(zoom))
+        except ValueError as e:
+            return Response({'error': f'无效的res、bbox或zoom参数: {str(e)}'}, status=400)
+
+        def build_payload():
+            lats, lngs, counts = get_density(layer).cells(resolution, bbox or None)
+            return {
+                'layer': layer,
+                'res': resolution,
+                'cell_radius': RESOLUTIONS[resolution],
+                'total': int(counts.sum()),
+                'max': int(counts.max()) if len(counts) else 0,
+                'lng': np.round(lngs, 6).tolist(),
+                'lat': np.round(lats, 6).tolist(),
+                'count': counts.tolist(),
+            }
+
+        try:
+            snapshot = get_snapshot(
+                'density', {'layer': layer, 'res': resolution, 'bbox': bbox},
+                build_payload, version_key=layer_version_key(layer)
+            )
+            return snapshot_response(request, snapshot)
+        except Exception as e:
+            return Response({'error': f'计算密度时出错: {str(e)}'}, status=500)
+
+# 行程顺序优化视图
+class RouteOptimizeView(APIView):
+    """
+    计算访问一组景点的最短顺序（最近邻 + 2-opt/Or-opt 改进）
+    参数:
+    - spot_ids: 景点id列表
+    - start: 出发位置 {"lat": 纬度, "lng": 经度}，不提供时从任意景点出发
+    - return_to_start: 是否返回出发位置，默认false
+    - time_budget: 优化时间预算（毫秒），默认300，最多1000
+    - fields（查询参数）: 景点只输出指定字段（逗号分隔）
+    返回按访问顺序排列的景点，以及每一段的距离和总距离（米）
+    """
+    MAX_SPOTS = 1000
+
+    def post(self, request):
+        spot_ids = request.data.get('spot_ids')
+        if not isinstance(spot_ids, list) or not spot_ids:
+            return Response({'error': '请提供景点id列表spot_ids'}, status=400)
+        try:
+            spot_ids = list(dict.fromkeys(int(spot_id) for spot_id in spot_ids))
+        except (ValueError, TypeError):
+            return Response({'error': 'spot_ids必须是整数列表'}, status=400)
+        if len(spot_ids) > self.MAX_SPOTS:
+            return Response({'error': f'景点数量不能超过{self.MAX_SPOTS}'}, status=400)
+
+        start = request.data.get('start')
+        if start:
+            start = parse_point(start) if isinstance(start, dict) else None
+            if not start:
+                return Response({'error': '无效的出发位置start'}, status=400)
+        return_to_start = bool(request.data.get('return_to_start')) and bool(start)
+        try:
+            time_budget = min(max(float(request.data.get('time_budget', 300)), 10), 1000) / 1000
+        except (ValueError, TypeError):
+            return Response({'error': 'time_budget必须是数值'}, status=400)
+
+        fields = requested_fields(request.query_params, ScenicSpotSerializer.Meta.fields)
+        try:
+            spots_by_id = ScenicSpotViewSet._project(ScenicSpot.objects.all(), fields).in_bulk(spot_ids)
+            spots = [spots_by_id[spot_id] for spot_id in spot_ids if spot_id in spots_by_id]
+            order, legs, initial_length = optimize_order(
+                [spot.latitude for spot in spots], [spot.longitude for spot in spots],
+                start=start, return_to_start=return_to_start, time_budget=time_budget
+            )
+            spots = [spots[i] for i in order.tolist()]
+            serializer = ScenicSpotSerializer(spots, many=True, context={'request': request, 'fields': fields})
+            return Response({
+                'spots': serializer.data,
+                'legs': [round(leg, 1) for leg in legs.tolist()],
+                'total_distance': round(float(legs.sum()), 1),
+                'initial_distance': round(initial_length, 1),
+                'missing_ids': [spot_id for spot_id in spot_ids if spot_id not in spots_by_id],
+            })
+        except Exception as e:
+            return Response({'error': f'优化行程顺序时出错: {str(e)}'}, status=500)
+
+# 周边设施视图集
+class POIViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = POI.objects.all()
+    serializer_class = POISerializer
+
+    MAX_LIMIT = 5000
+
+    def list(self, request, *args, **kwargs):
+        """
+        获取周边设施的GeoJSON格式数据
+        参数:
+        - layer: 图层名称（如 hotels、hotpot、parking_lots），多个图层用逗号分隔
+        - bbox: 视野范围 minLng,minLat,maxLng,maxLat，只返回范围内的设施
+        - zoom: 缩放级别，与bbox同时提供时把范围向外对齐到该级别的网格
+        - limit: 最多返回数量，默认1000，最多5000；超出时返回的 truncated 为 true
+        - properties: 只输出指定属性（逗号分隔），默认输出全部属性
+        - stream: 为1时以流式响应逐批输出，可与bbox、limit同时使用，未指定limit时输出全部设施
+        """
+        layers = [layer.strip() for layer in request.query_params.get('layer', '').split(',') if layer.strip()]
+        if not layers:
+            return Response({'error': '请提供layer参数'}, status=400)
+        unknown = [layer for layer in layers if layer not in DATASETS]
+        if unknown:
+            return Response({'error': f'未知图层: {", ".join(unknown)}'}, status=400)
+
+        bbox = request.query_params.get('bbox')
+        zoom = request.query_params.get('zoom')
+        try:
+            if bbox:
+                bbox = parse_bbox(bbox)
+                if zoom:
+                    bbox = snap_bbox(bbox, int(zoom))
+            limit = min(max(int(request.query_params.get('limit', 1000)), 1), self.MAX_LIMIT)
+        except ValueError as e:
+            return Response({'error': f'无效的bbox、zoom或limit参数: {str(e)}'}, status=400)
+
+        requested = requested_fields(request.query_params, POI_PROPERTIES)
+        properties = [name for name in POI_PROPERTIES if not requested or name in requested]
+        fields = poi_fields(properties)
+        to_feature = poi_feature_builder(properties)
+
+        try:
+            stream = request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+            if stream:
+                queryset = POI.objects.filter(layer__in=layers)
+                if bbox:
+                    # 流式输出可能很大，不经过空间索引拼id列表，直接用图层 + 坐标的复合索引过滤
+                    min_lng, min_lat, max_lng, max_lat = bbox
+                    queryset = queryset.filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng))
+                queryset = queryset.order_by('id')
+                if 'limit' in request.query_params:
+                    queryset = queryset[:limit]
+                return streaming_geojson_response(queryset, fields, to_feature)
+
+            def build_payload():
+                if bbox:
+                    # 范围判断在空间索引中完成，数据库只按id读取
+                    ids = np.concatenate([poi_ids_in_bbox(layer, bbox) for layer in layers])
+                    ids.sort()
+                    total = len(ids)
+                    queryset = POI.objects.filter(id__in=ids[:limit].tolist())
+                else:
+                    queryset = POI.objects.filter(layer__in=layers)
+                    total = queryset.count()
+                rows = queryset.order_by('id').values_list(*fields)[:limit]
+                return {
+                    'type': 'FeatureCollection',
+                    'truncated': total > limit,
+                    'features': [to_feature(row) for row in rows],
+                }
+
+            snapshot = get_snapshot(
+                'pois',
+                {'layers': sorted(layers), 'bbox': bbox, 'limit': limit, 'properties': properties},
+                build_payload,
+                version_key=POI_VERSION_KEY
+            )
+            return snapshot_response(request, snapshot)
+        except ValidationError:
+            raise
+        except Exception as e:
+            return Response({'error': f'获取周边设施数据时出错: {str(e)}'}, status=500)
+
+    # 获取图层列表
+    @action(detail=False, methods=['get'])
+    def layers(self, request):
+        """获取所有图层及其设施数量"""
+        counts = dict(POI.objects.values_list('layer').annotate(count=Count('id')).order_by())
+        return Response([
+            {'layer': layer, 'label': label, 'count': counts.get(layer, 0)}
+            for layer, label in DATASETS.items()
+        ])
 
 # 用户注册视图  
 class UserRegisterView(generics.CreateAPIView):
@@ -87,14 +87,53 @@ export const scenicSpotApi = {
     return api.get(`/scenic_spots/geojson/?search=${encodeURIComponent(query)}`)
   },
   
-  // 获取附近景点
+  // 搜索框自动补全，只返回 id、名称和地址
+  suggest: (query: string) =>
+    api.get('/scenic_spots/suggest/', { params: { q: query } }),
+  
+  // 获取附近景点（按距离排序，分页返回 { next, results }）
   getNearby: (lat: number, lng: number, radius: number = 5000) => 
     api.get(`/scenic_spots/nearby/?lat=${lat}&lng=${lng}&radius=${radius}`),
+
+  // 获取公共交通（步行+地铁+公交）在给定分钟内可到达的景点，按到达时间排序
+  getReachable: (lat: number, lng: number, minutes: number = 30) =>
+    api.get('/scenic_spots/reachable/', { params: { lat, lng, minutes } }),
+
+  // 获取最近的k个景点
+  getNearest: (lat: number, lng: number, k: number = 10) =>
+    api.get(`/scenic_spots/nearest/?lat=${lat}&lng=${lng}&k=${k}`),
   
-  // 获取GeoJSON格式的景点数据
-  getGeoJson: () => {
+  // 获取GeoJSON格式的景点数据，可传入视野范围只获取可见景点
+  getGeoJson: (bbox?: [number, number, number, number], zoom?: number, properties?: string[]) => {
     console.log('获取GeoJSON数据')
-    return api.get('/scenic_spots/geojson/')
+    const params: Record<string, string | number> = {}
+    if (bbox) params.bbox = bbox.join(',')
+    if (bbox && zoom !== undefined) params.zoom = Math.round(zoom)
+    if (properties) params.properties = properties.join(',')
+    return api.get('/scenic_spots/geojson/', { params })
+  },
+  
+  // 查询多边形范围内的景点（GeoJSON Polygon/MultiPolygon），返回 GeoJSON
+  getWithin: (geometry: any, properties?: string[]) =>
+    api.post('/scenic_spots/within/', { geometry, properties }),
+
+  // 热门景点（按收藏人数排序）
+  getPopular: (limit: number = 10) =>
+    api.get('/scenic_spots/popular/', { params: { limit } }),
+  
+  // 分面统计：各分类数量、价格分段和免费/收费数量，可按搜索词、视野范围和已选中的分类/价格范围过滤
+  getFacets: (
+    search?: string,
+    bbox?: [number, number, number, number],
+    filters?: { category?: string; min_price?: number; max_price?: number }
+  ) => {
+    const params: Record<string, string> = {}
+    if (search) params.search = search
+    if (bbox) params.bbox = bbox.join(',')
+    if (filters?.category) params.category = filters.category
+    if (filters?.min_price !== undefined) params.min_price = String(filters.min_price)
+    if (filters?.max_price !== undefined) params.max_price = String(filters.max_price)
+    return api.get('/scenic_spots/facets/', { params })
   },
   
   // 获取单个景点详情
@@ -109,6 +148,10 @@ export const scenicSpotApi = {
     return api.post('/scenic_spots/update_data/', { page_count: pageCount })
   },
 
+  // 根据偏好生成多日行程：景点按地理位置分成每天一组，组内按最短顺序排列
+  itinerary: (preferences: any, perDay: number = 3) =>
+    api.post('/scenic_spots/itinerary/', { ...preferences, per_day: perDay }),
+
   // 根据偏好过滤景点
   filter: (preferences: any) => {
     console.log('过滤景点:', preferences)
@@ -116,6 +159,37 @@ export const scenicSpotApi = {
   }
 }
 
+// 周边设施（酒店、餐饮、交通站点等）图层API
+export const poiApi = {
+  // 获取图层的GeoJSON数据，可传入视野范围只获取可见设施
+  getLayer: (layer: string, bbox?: [number, number, number, number], limit: number = 1000) => {
+    const params: Record<string, string | number> = { layer, limit }
+    if (bbox) params.bbox = bbox.join(',')
+    return api.get('/pois/', { params })
+  },
+
+  // 获取所有图层及其设施数量
+  getLayers: () => api.get('/pois/layers/')
+}
+
+// 密度（热力图）相关API
+export const densityApi = {
+  // 获取六边形网格密度，layer 为 spots 或 POI 图层名称，res 为分辨率 0~4
+  // 返回 { cell_radius, max, lng: [...], lat: [...], count: [...] }
+  get: (layer: string, res: number = 2, bbox?: [number, number, number, number]) => {
+    const params: Record<string, string | number> = { layer, res }
+    if (bbox) params.bbox = bbox.join(',')
+    return api.get('/density/', { params })
+  }
+}
+
+// 行程相关API
+export const routeApi = {
+  // 计算访问一组景点的最短顺序，start 为出发位置
+  optimize: (spotIds: (number | string)[], start?: { lat: number, lng: number }, returnToStart: boolean = false) =>
+    api.post('/routes/optimize/', { spot_ids: spotIds, start, return_to_start: returnToStart })
+}
+
 // 调试信息
 console.log('API服务已初始化', {
   baseURL: api.defaults.baseURL,